@@ -96,6 +96,8 @@ class AbstractProductA(ABC):
     variants of the product must implement this interface.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def useful_function_a(self) -> str:
         pass
@@ -107,11 +109,15 @@ Concrete Products are created by corresponding Concrete Factories.
 
 
 class ConcreteProductA1(AbstractProductA):
+    __slots__ = ()
+
     def useful_function_a(self) -> str:
         return "The result of the product A1"
 
 
 class ConcreteProductA2(AbstractProductA):
+    __slots__ = ()
+
     def useful_function_a(self) -> str:
         return "The result of the product A2"
 
@@ -123,6 +129,8 @@ class AbstractProductB(ABC):
         of the same concrete variant.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def useful_function_b(self) -> None:
         """
@@ -153,6 +161,8 @@ class ConcreteProductB1(AbstractProductB):
     argument.
     """
 
+    __slots__ = ()
+
     def useful_function_b(self) -> str:
         return "The result of the product B1"
 
@@ -162,6 +172,8 @@ class ConcreteProductB1(AbstractProductB):
 
 
 class ConcreteProductB2(AbstractProductB):
+    __slots__ = ()
+
     def useful_function_b(self) -> str:
         return "The result of the product B2"
 
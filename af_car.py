@@ -2,33 +2,45 @@ from abc import ABC, abstractmethod
 
 
 class SUV(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def drive(self):
         pass
 
 
 class Sedan(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def drive(self):
         pass
 
 
 class WhiteSUV(SUV):
+    __slots__ = ()
+
     def drive(self):
         return "Riding a white SUV"
 
 
 class WhiteSedan(Sedan):
+    __slots__ = ()
+
     def drive(self):
         return "Riding a white Sedan"
 
 
 class DarkSUV(SUV):
+    __slots__ = ()
+
     def drive(self):
         return "Riding a dark SUV"
 
 
 class DarkSedan(Sedan):
+    __slots__ = ()
+
     def drive(self):
         return "Riding a dark Sedan"
 
@@ -3,12 +3,16 @@ from abc import ABC, abstractmethod
 
 # Abstract Products
 class Button(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def paint(self):
         pass
 
 
 class Checkbox(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def paint(self):
         pass
@@ -16,22 +20,30 @@ class Checkbox(ABC):
 
 # Concrete Products for Light Theme
 class LightButton(Button):
+    __slots__ = ()
+
     def paint(self):
         return "Rendering a light button"
 
 
 class LightCheckbox(Checkbox):
+    __slots__ = ()
+
     def paint(self):
         return "Rendering a light checkbox"
 
 
 # Concrete Products for Dark Theme
 class DarkButton(Button):
+    __slots__ = ()
+
     def paint(self):
         return "Rendering a dark button"
 
 
 class DarkCheckbox(Checkbox):
+    __slots__ = ()
+
     def paint(self):
         return "Rendering a dark checkbox"
 
@@ -0,0 +1,263 @@
+"""
+Async counterparts of the abstract factories.
+
+Real products are often things like database clients and HTTP sessions that
+need I/O before they are usable (connect, authenticate, warm a pool). With
+synchronous create methods a family is built one product at a time, so its
+setup latencies add up. Here the create methods are coroutines, and
+build_family() runs all of a family's create_* methods at once: building the
+family takes as long as its slowest product.
+
+Building is atomic. If one product fails to set up or is cancelled, or the
+build itself is cancelled, the products that were still being built are
+cancelled, the ones already built are closed (aclose() or close(), when they
+have one), and the error is raised.
+
+    family = await build_family(AsyncDarkThemeFactory())
+    family["button"].paint()
+
+warm_families() builds several families concurrently at startup.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from abc import ABC, abstractmethod
+
+from abstract_factory import (
+    AbstractProductA,
+    AbstractProductB,
+    ConcreteProductA1,
+    ConcreteProductA2,
+    ConcreteProductB1,
+    ConcreteProductB2,
+)
+from af_car import SUV, DarkSedan, DarkSUV, Sedan, WhiteSedan, WhiteSUV
+from af_example import (
+    Button,
+    Checkbox,
+    DarkButton,
+    DarkCheckbox,
+    LightButton,
+    LightCheckbox,
+)
+
+
+class AsyncAbstractFactory(ABC):
+    @abstractmethod
+    async def create_product_a(self) -> AbstractProductA:
+        pass
+
+    @abstractmethod
+    async def create_product_b(self) -> AbstractProductB:
+        pass
+
+
+class AsyncThemeFactory(ABC):
+    @abstractmethod
+    async def create_button(self) -> Button:
+        pass
+
+    @abstractmethod
+    async def create_checkbox(self) -> Checkbox:
+        pass
+
+
+class AsyncCarFactory(ABC):
+    @abstractmethod
+    async def create_suv(self) -> SUV:
+        pass
+
+    @abstractmethod
+    async def create_sedan(self) -> Sedan:
+        pass
+
+
+class SimulatedSetup:
+    """
+    Stands in for product setup I/O: each create_* method waits for the delay
+    configured for its product before returning it.
+    """
+
+    def __init__(self, **delays: float):
+        self.delays = delays
+
+    async def setup(self, product: str):
+        await asyncio.sleep(self.delays.get(product, 0.0))
+
+
+class AsyncConcreteFactory1(SimulatedSetup, AsyncAbstractFactory):
+    async def create_product_a(self) -> AbstractProductA:
+        await self.setup("product_a")
+        return ConcreteProductA1()
+
+    async def create_product_b(self) -> AbstractProductB:
+        await self.setup("product_b")
+        return ConcreteProductB1()
+
+
+class AsyncConcreteFactory2(SimulatedSetup, AsyncAbstractFactory):
+    async def create_product_a(self) -> AbstractProductA:
+        await self.setup("product_a")
+        return ConcreteProductA2()
+
+    async def create_product_b(self) -> AbstractProductB:
+        await self.setup("product_b")
+        return ConcreteProductB2()
+
+
+class AsyncLightThemeFactory(SimulatedSetup, AsyncThemeFactory):
+    async def create_button(self) -> Button:
+        await self.setup("button")
+        return LightButton()
+
+    async def create_checkbox(self) -> Checkbox:
+        await self.setup("checkbox")
+        return LightCheckbox()
+
+
+class AsyncDarkThemeFactory(SimulatedSetup, AsyncThemeFactory):
+    async def create_button(self) -> Button:
+        await self.setup("button")
+        return DarkButton()
+
+    async def create_checkbox(self) -> Checkbox:
+        await self.setup("checkbox")
+        return DarkCheckbox()
+
+
+class AsyncWhiteCarFactory(SimulatedSetup, AsyncCarFactory):
+    async def create_suv(self) -> SUV:
+        await self.setup("suv")
+        return WhiteSUV()
+
+    async def create_sedan(self) -> Sedan:
+        await self.setup("sedan")
+        return WhiteSedan()
+
+
+class AsyncDarkCarFactory(SimulatedSetup, AsyncCarFactory):
+    async def create_suv(self) -> SUV:
+        await self.setup("suv")
+        return DarkSUV()
+
+    async def create_sedan(self) -> Sedan:
+        await self.setup("sedan")
+        return DarkSedan()
+
+
+def product_names(factory) -> list[str]:
+    """
+    The products a factory makes: "button" for create_button() and so on.
+    """
+    return [
+        name[len("create_") :]
+        for name, _ in inspect.getmembers(type(factory), inspect.iscoroutinefunction)
+        if name.startswith("create_")
+    ]
+
+
+async def close_product(product):
+    close = getattr(product, "aclose", None) or getattr(product, "close", None)
+    if close is None:
+        return
+    result = close()
+    if inspect.isawaitable(result):
+        await result
+
+
+async def build_family(factory) -> dict[str, object]:
+    """
+    Run all of the factory's create_* coroutines concurrently and return the
+    products by name. On failure nothing is left half built.
+    """
+    tasks = {
+        name: asyncio.ensure_future(getattr(factory, f"create_{name}")())
+        for name in product_names(factory)
+    }
+    try:
+        await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+        failed = [
+            task
+            for task in tasks.values()
+            if task.done() and not task.cancelled() and task.exception()
+        ]
+        if failed:
+            raise failed[0].exception()
+        # A cancelled create task raises its CancelledError here.
+        return {name: task.result() for name, task in tasks.items()}
+    except BaseException:
+        # A failed or cancelled product, or build_family() itself cancelled
+        # from outside: close whatever was built before re-raising.
+        await _discard(tasks)
+        raise
+
+
+async def _discard(tasks: dict[str, asyncio.Future]):
+    for task in tasks.values():
+        task.cancel()
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for task in tasks.values():
+        if not task.cancelled() and task.exception() is None:
+            await close_product(task.result())
+
+
+async def warm_families(factories: dict[str, object]) -> dict[str, dict[str, object]]:
+    """
+    Build several families concurrently, e.g. at startup. If one family fails,
+    the families that were built are closed as well.
+    """
+    names = list(factories)
+    results = await asyncio.gather(
+        *(build_family(factories[name]) for name in names), return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        for result in results:
+            if not isinstance(result, BaseException):
+                for product in result.values():
+                    await close_product(product)
+        raise errors[0]
+    return dict(zip(names, results))
+
+
+async def build_sequentially(factory) -> dict[str, object]:
+    return {
+        name: await getattr(factory, f"create_{name}")()
+        for name in product_names(factory)
+    }
+
+
+def benchmark():
+    """
+    Build product families whose products take 100/200/300 ms to set up, one
+    product at a time and concurrently, then warm three families at once.
+    """
+    delays = dict(
+        product_a=0.1, product_b=0.3, button=0.2, checkbox=0.1, suv=0.3, sedan=0.2
+    )
+    for name, build in (
+        ("sequential", build_sequentially),
+        ("concurrent", build_family),
+    ):
+        start = time.perf_counter()
+        family = asyncio.run(build(AsyncConcreteFactory1(**delays)))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} family of {len(family)} built in {elapsed:.3f}s")
+
+    factories = {
+        "products": AsyncConcreteFactory2(**delays),
+        "theme": AsyncDarkThemeFactory(**delays),
+        "cars": AsyncWhiteCarFactory(**delays),
+    }
+    start = time.perf_counter()
+    families = asyncio.run(warm_families(factories))
+    elapsed = time.perf_counter() - start
+    print(f"warmed {len(families)} families in {elapsed:.3f}s, slowest product 0.300s")
+    print(families["theme"]["button"].paint(), "/", families["cars"]["suv"].drive())
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,354 @@
+"""
+Every `await redis.incr(key)` is its own request/response: one write to the
+socket, one read back, one trip through the event loop. For high-rate counters
+that per-command cost dominates, while Redis itself could take thousands of
+commands in a single pipeline.
+
+AutoPipeline collects the commands issued during one event-loop tick (or until
+`max_batch` of them are waiting) and writes them to the connection as one
+pipeline, in a single send. Each caller still awaits its own future and gets
+its own reply, so one failing command (INCR on a non-integer, for example) only
+fails its own caller.
+
+    writer = AutoPipeline(redis)
+    await asyncio.gather(*(writer.incr(f"hits:{page}") for page in pages))
+
+AutoPipeline writes to aioredis' connections directly, through private parts
+of aioredis 1.x (the version pinned in requirements.txt): the argument
+converters, ConnectionsPool.get_connection() and RedisConnection._buffered().
+_aioredis_internals() looks them up when an AutoPipeline is created and fails
+with a clear error on an aioredis without them.
+
+FakeRedisServer speaks enough of the Redis protocol (RESP) for the benchmark to
+run with real aioredis connections when no redis-server is around.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+import sys
+import time
+
+import aioredis
+import click
+
+from fetch import free_port
+
+
+class AutoPipeline:
+    def __init__(self, redis, max_batch: int = 1_000):
+        self.redis = redis
+        self.max_batch = max_batch
+        self.batches_sent = 0
+        self._converters = _aioredis_internals()
+        self._batch: list[tuple[bytes, tuple, asyncio.Future]] = []
+
+    def execute(self, command: str, *args) -> asyncio.Future:
+        """
+        Queue a raw Redis command (b"INCR", key) for the next pipeline and
+        return the future its result will be delivered to.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append((command, args, future))
+        if len(self._batch) >= self.max_batch:
+            self.flush()
+        elif len(self._batch) == 1:
+            # First command of this tick: send once everything else that is
+            # ready to run has had a chance to add its commands.
+            loop.call_soon(self.flush)
+        return future
+
+    def flush(self):
+        """
+        Write the waiting commands to one connection in a single buffer, the
+        way aioredis' own Pipeline does, but without its per-command wrapper
+        futures. Each reply is handed to its caller's future as it arrives.
+        """
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        # Commands whose caller has given up are not sent, and commands that
+        # cannot be encoded fail here: once a command is half written to the
+        # shared buffer, the frames after it are garbage to the server.
+        ready = []
+        for command, args, future in batch:
+            if future.done():
+                continue
+            error = _invalid(args, self._converters)
+            if error is not None:
+                future.set_exception(error)
+                continue
+            ready.append((command, args, future))
+        if not ready:
+            return
+        self.batches_sent += 1
+        conn = self._connection(ready[0][0])
+        if conn is None:
+            # Every pooled connection is busy: let the pool queue them.
+            for command, args, future in ready:
+                reply = asyncio.ensure_future(self.redis.execute(command, *args))
+                reply.add_done_callback(functools.partial(_deliver, future))
+            return
+        with conn._buffered():
+            for command, args, future in ready:
+                try:
+                    reply = conn.execute(command, *args)
+                except Exception as error:
+                    # A closed connection fails this command only. It raises
+                    # before anything is written to the buffer.
+                    if not future.done():
+                        future.set_exception(error)
+                    continue
+                reply.add_done_callback(functools.partial(_deliver, future))
+
+    def _connection(self, command: bytes):
+        conn = self.redis.connection
+        if hasattr(conn, "get_connection"):
+            # A ConnectionsPool: take a free connection, if there is one.
+            conn, _ = conn.get_connection(command)
+        return conn
+
+    async def set(self, key, value):
+        return await self.execute(b"SET", key, value)
+
+    async def incr(self, key):
+        return await self.execute(b"INCR", key)
+
+    async def incrby(self, key, increment: int):
+        return await self.execute(b"INCRBY", key, increment)
+
+    async def hset(self, key, field, value):
+        return await self.execute(b"HSET", key, field, value)
+
+    async def delete(self, key, *keys):
+        return await self.execute(b"DEL", key, *keys)
+
+
+def _aioredis_internals() -> dict:
+    """
+    Check for the private aioredis 1.x pieces AutoPipeline is built on and
+    return the converters table encode_command() uses, keyed by argument type.
+    """
+    try:
+        from aioredis.connection import RedisConnection
+        from aioredis.pool import ConnectionsPool
+        from aioredis.util import _converters
+    except ImportError as error:
+        raise RuntimeError(
+            f"AutoPipeline needs aioredis 1.x internals ({error}); "
+            f"aioredis {aioredis.__version__} is installed"
+        ) from error
+    missing = [
+        f"{cls.__name__}.{name}"
+        for cls, name in (
+            (RedisConnection, "_buffered"),
+            (ConnectionsPool, "get_connection"),
+        )
+        if not hasattr(cls, name)
+    ]
+    if missing:
+        raise RuntimeError(
+            f"AutoPipeline needs aioredis 1.x internals ({', '.join(missing)}); "
+            f"aioredis {aioredis.__version__} is installed"
+        )
+    return _converters
+
+
+def _invalid(args: tuple, converters: dict) -> TypeError | None:
+    # The argument types aioredis can encode, checked the way encode_command()
+    # looks them up.
+    for arg in args:
+        if type(arg) not in converters:
+            return TypeError(
+                f"Argument {arg!r} expected to be of bytearray, bytes, float, int, "
+                "or str type"
+            )
+    return None
+
+
+def _deliver(future: asyncio.Future, reply: asyncio.Future):
+    if future.done():
+        return
+    if reply.cancelled():
+        future.cancel()
+    elif reply.exception() is not None:
+        future.set_exception(reply.exception())
+    else:
+        future.set_result(reply.result())
+
+
+class FakeRedisServer:
+    """
+    A single-process, in-memory server for SET, GET, INCR, INCRBY, HSET, DEL,
+    PING, SELECT and FLUSHDB over RESP. Pipelined commands arrive in the same
+    read and are answered with a single write, as with a real server.
+    """
+
+    def __init__(self):
+        self.data: dict[bytes, object] = {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        buffer = bytearray()
+        try:
+            while data := await reader.read(64 * 1024):
+                buffer += data
+                commands = []
+                while (parsed := self.parse(buffer)) is not None:
+                    command, consumed = parsed
+                    commands.append(command)
+                    del buffer[:consumed]
+                if commands:
+                    # Everything that arrived together is answered together.
+                    writer.write(b"".join(map(self.dispatch, commands)))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def parse(buffer: bytearray) -> tuple[list[bytes], int] | None:
+        """
+        Parse one command (an array of bulk strings) from the front of
+        `buffer`. Returns the arguments and the bytes consumed, or None when
+        the command has not fully arrived yet.
+        """
+        end = buffer.find(b"\r\n")
+        if end == -1:
+            return None
+        args = []
+        position = end + 2
+        for _ in range(int(buffer[1:end])):
+            end = buffer.find(b"\r\n", position)
+            if end == -1:
+                return None
+            start = end + 2
+            stop = start + int(buffer[position + 1 : end])
+            if stop + 2 > len(buffer):
+                return None
+            args.append(bytes(buffer[start:stop]))
+            position = stop + 2
+        return args, position
+
+    def dispatch(self, command: list[bytes]) -> bytes:
+        name, args = command[0].upper(), command[1:]
+        if name in (b"PING", b"SELECT"):
+            return b"+PONG\r\n" if name == b"PING" else b"+OK\r\n"
+        if name == b"FLUSHDB":
+            self.data.clear()
+            return b"+OK\r\n"
+        if name == b"SET":
+            self.data[args[0]] = args[1]
+            return b"+OK\r\n"
+        if name == b"GET":
+            value = self.data.get(args[0])
+            if value is None:
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if name in (b"INCR", b"INCRBY"):
+            step = int(args[1]) if name == b"INCRBY" else 1
+            try:
+                value = int(self.data.get(args[0], b"0")) + step
+            except (TypeError, ValueError):
+                return b"-ERR value is not an integer or out of range\r\n"
+            self.data[args[0]] = b"%d" % value
+            return b":%d\r\n" % value
+        if name == b"HSET":
+            fields = self.data.setdefault(args[0], {})
+            added = 0
+            for field, value in zip(args[1::2], args[2::2]):
+                added += field not in fields
+                fields[field] = value
+            return b":%d\r\n" % added
+        if name == b"DEL":
+            return b":%d\r\n" % sum(
+                self.data.pop(key, None) is not None for key in args
+            )
+        return b"-ERR unknown command '%s'\r\n" % name
+
+
+def serve(port: int):
+    async def main():
+        server = await asyncio.start_server(FakeRedisServer().handle, "127.0.0.1", port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+async def connect(address: str, attempts: int = 100):
+    for _ in range(attempts):
+        try:
+            return await aioredis.create_redis(address)
+        except OSError:
+            await asyncio.sleep(0.05)
+    return await aioredis.create_redis(address)
+
+
+async def write_unbatched(redis, count: int, concurrency: int):
+    async def worker(offset: int):
+        for n in range(offset, count, concurrency):
+            await redis.incr(f"counter:{n % 1000}")
+
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+
+
+async def write_pipelined(redis, count: int, concurrency: int):
+    writer = AutoPipeline(redis)
+
+    async def worker(offset: int):
+        for n in range(offset, count, concurrency):
+            await writer.incr(f"counter:{n % 1000}")
+
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    click.secho(f"  ({writer.batches_sent} pipelines sent)", fg="green")
+
+
+async def benchmark_async(address: str, count: int, concurrency: int):
+    redis = await connect(address)
+    try:
+        for name, write in (
+            ("unbatched", write_unbatched),
+            ("pipelined", write_pipelined),
+        ):
+            start = time.perf_counter()
+            await write(redis, count, concurrency)
+            elapsed = time.perf_counter() - start
+            click.secho(
+                f"{name:<10} {count / elapsed:10.0f} writes/s ({elapsed:.2f}s)",
+                bold=True,
+                bg="white",
+                fg="blue",
+            )
+    finally:
+        redis.close()
+        await redis.wait_closed()
+
+
+def benchmark(
+    address: str | None = None, count: int = 1_000_000, concurrency: int = 500
+):
+    """
+    INCR `count` counters from `concurrency` tasks, one command per round trip
+    and auto-pipelined. Without an address a FakeRedisServer is started in a
+    separate process.
+    """
+    process = None
+    if address is None:
+        port = free_port()
+        process = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+        process.start()
+        address = f"redis://127.0.0.1:{port}"
+    try:
+        asyncio.run(benchmark_async(address, count, concurrency))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,265 @@
+"""
+Benchmark suite for the creational pattern modules: factory.py,
+factory_example.py, abstract_factory.py, af_car.py, af_example.py and
+singleton.py.
+
+Picking a pattern has a cost that is easy to overlook: ABC dispatch in Creator
+and AbstractFactory, __new__ overrides in Singleton and Example, f-string
+building in some_operation(). The suite measures, per module:
+- creation: nanoseconds to get a product from its creator/factory (or an
+  instance, for the singletons)
+- call: nanoseconds per call of the product's or creator's operation
+- memory: bytes per instance, from tracemalloc over many kept instances
+- import: milliseconds to import the module in a fresh interpreter
+
+Timings are the best of several repeats, which filters out most scheduler
+noise. Results are saved as JSON and compared with the baseline in
+.benchmarks/baseline.json, which is committed with the code; any metric that
+got worse by more than the threshold is flagged and the command exits with
+status 1, so it can gate CI. Timings depend on the machine, so record the
+baseline on the kind of machine that runs the check.
+
+    python benchmarks.py --save-baseline      # on the reference commit,
+    git add .benchmarks/baseline.json         # then commit the baseline
+    python benchmarks.py --threshold 0.10     # later: compare with it
+"""
+
+from __future__ import annotations
+
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Callable
+
+import click
+
+import abstract_factory
+import af_car
+import af_example
+import factory
+import factory_example
+import singleton
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, ".benchmarks", "baseline.json")
+MODULES = [
+    "factory",
+    "factory_example",
+    "abstract_factory",
+    "af_car",
+    "af_example",
+    "singleton",
+]
+
+
+def quiet(func: Callable) -> Callable:
+    """
+    Example prints from __new__ and __init__; keep that out of the timings.
+    """
+
+    def call():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+
+    return call
+
+
+def creations() -> dict[str, Callable]:
+    creator1 = factory.ConcreteCreator1()
+    helmet_creator = factory_example.HelmetCreator()
+    factory1 = abstract_factory.ConcreteFactory1()
+    white_cars = af_car.WhiteCarFactory()
+    light_theme = af_example.LightThemeFactory()
+    return {
+        "factory.ConcreteCreator1.factory_method": creator1.factory_method,
+        "factory_example.HelmetCreator.factory_method": helmet_creator.factory_method,
+        "abstract_factory.ConcreteFactory1.create_product_a": factory1.create_product_a,
+        "af_car.WhiteCarFactory.create_suv": white_cars.create_suv,
+        "af_example.LightThemeFactory.create_button": light_theme.create_button,
+        "singleton.Singleton": singleton.Singleton,
+        "singleton.ThreadSafeSingleton": singleton.ThreadSafeSingleton,
+    }
+
+
+def calls() -> dict[str, Callable]:
+    creator1 = factory.ConcreteCreator1()
+    helmet_creator = factory_example.HelmetCreator()
+    factory1 = abstract_factory.ConcreteFactory1()
+    product_a = factory1.create_product_a()
+    product_b = factory1.create_product_b()
+    suv = af_car.WhiteCarFactory().create_suv()
+    button = af_example.LightThemeFactory().create_button()
+    return {
+        "factory.Creator.some_operation": creator1.some_operation,
+        "factory_example.ArmourCreator.get_durability": helmet_creator.get_durability,
+        "abstract_factory.ConcreteProductB1.another_useful_function_b": (
+            lambda: product_b.another_useful_function_b(product_a)
+        ),
+        "af_car.WhiteSUV.drive": suv.drive,
+        "af_example.LightButton.paint": button.paint,
+    }
+
+
+def instances() -> dict[str, Callable]:
+    return {
+        "factory.ConcreteProduct1": factory.ConcreteProduct1,
+        "factory_example.Helmet": factory_example.Helmet,
+        "abstract_factory.ConcreteProductA1": abstract_factory.ConcreteProductA1,
+        "af_car.WhiteSUV": af_car.WhiteSUV,
+        "af_example.LightButton": af_example.LightButton,
+        "singleton.Example": quiet(singleton.Example),
+    }
+
+
+def time_per_call(func: Callable, repeat: int) -> float:
+    """
+    Best-of-`repeat` nanoseconds per call.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e9
+
+
+def bytes_per_instance(make: Callable, count: int = 10_000) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [make() for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0] - before - sys.getsizeof(kept)
+    tracemalloc.stop()
+    del kept
+    return size / count
+
+
+def import_time(module: str, repeat: int) -> float:
+    """
+    Best-of-`repeat` milliseconds to import `module` in a fresh interpreter.
+    """
+    script = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    best = float("inf")
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        best = min(best, float(output.split()[-1]))
+    return best * 1000
+
+
+def run_suite(repeat: int = 7) -> dict:
+    results: dict[str, dict[str, float]] = {
+        "creation_ns": {},
+        "call_ns": {},
+        "memory_bytes": {},
+        "import_ms": {},
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Module level demos and Example print; none of that belongs in the
+        # report.
+        for name, func in creations().items():
+            results["creation_ns"][name] = time_per_call(func, repeat)
+        for name, func in calls().items():
+            results["call_ns"][name] = time_per_call(func, repeat)
+        for name, make in instances().items():
+            results["memory_bytes"][name] = bytes_per_instance(make)
+    for module in MODULES:
+        results["import_ms"][module] = import_time(module, repeat)
+    return {
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare(
+    current: dict, baseline: dict, threshold: float
+) -> list[tuple[str, str, float]]:
+    """
+    Metrics that are more than `threshold` (a fraction) worse than the
+    baseline, as (group, name, relative change). Lower is better for all of
+    them.
+    """
+    regressions = []
+    for group, metrics in current["results"].items():
+        for name, value in metrics.items():
+            before = baseline["results"].get(group, {}).get(name)
+            if not before:
+                continue
+            change = value / before - 1
+            if change > threshold:
+                regressions.append((group, name, change))
+    return regressions
+
+
+def report(current: dict, baseline: dict | None):
+    for group, metrics in current["results"].items():
+        click.secho(group, bold=True)
+        for name, value in metrics.items():
+            line = f"  {name:<62} {value:10.1f}"
+            before = baseline and baseline["results"].get(group, {}).get(name)
+            if before:
+                line += f"  ({value / before - 1:+.1%})"
+            click.echo(line)
+
+
+@click.command()
+@click.option("--output", default=None, help="Write the results JSON here.")
+@click.option("--baseline", default=DEFAULT_BASELINE, show_default=True)
+@click.option(
+    "--save-baseline", is_flag=True, help="Store these results as the baseline."
+)
+@click.option(
+    "--threshold", default=0.10, show_default=True, help="Allowed slowdown, 0.10 = 10%."
+)
+@click.option("--repeat", default=7, show_default=True)
+def main(output, baseline, save_baseline, threshold, repeat):
+    """
+    Run the suite, compare it with the baseline and flag regressions.
+    """
+    current = run_suite(repeat)
+    stored = None
+    if os.path.exists(baseline) and not save_baseline:
+        with open(baseline) as file:
+            stored = json.load(file)
+    report(current, stored)
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(current, file, indent=2)
+    if save_baseline:
+        os.makedirs(os.path.dirname(baseline), exist_ok=True)
+        with open(baseline, "w") as file:
+            json.dump(current, file, indent=2)
+        click.secho(f"baseline saved to {baseline}", fg="green")
+        return
+    if stored is None:
+        click.secho(
+            "no baseline to compare with, run with --save-baseline", fg="yellow"
+        )
+        return
+
+    regressions = compare(current, stored, threshold)
+    for group, name, change in regressions:
+        click.secho(f"REGRESSION {group} {name}: {change:+.1%}", fg="red", bold=True)
+    if regressions:
+        sys.exit(1)
+    click.secho(f"no regressions above {threshold:.0%}", fg="green")
+
+
+if __name__ == "__main__":
+    main()
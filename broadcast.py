@@ -0,0 +1,404 @@
+"""
+Broadcasting messages to many WebSocket clients without letting the slow ones
+hold everybody else back.
+
+The obvious broadcast,
+
+    await asyncio.gather(*(ws.send(json.dumps(message)) for ws in clients))
+
+serializes the message once per client, and the next message cannot go out
+until the slowest client has taken this one: a single client on a bad network
+stalls the whole feed. Hub instead:
+- serializes each message once and hands the same string to every client
+- gives every client its own bounded buffer and its own writer task, so
+  publish() never waits for a client. A client whose socket is full only
+  blocks its own writer.
+- applies a slow-consumer policy when a client's buffer is full:
+    drop-oldest  discard the client's oldest pending message
+    coalesce     replace the pending message with the same key, e.g. the
+                 previous price of the same symbol. Without one, drop the
+                 oldest.
+    disconnect   close the connection (code 1008), so the client can
+                 reconnect and resynchronize
+
+Serve it with compression=None. websockets enables permessage-deflate by
+default, which compresses every message again for every client and keeps a
+compressor of a few hundred kilobytes per connection: exactly the per-client
+cost the hub is meant to avoid.
+
+    hub = Hub(buffer=64, policy="coalesce")
+    server = await websockets.serve(hub.handler, "127.0.0.1", 8765, compression=None)
+    hub.publish({"symbol": "ACME", "price": 12.5}, key="ACME")
+
+The benchmark connects thousands of clients to a local server in this process,
+a fraction of which read slowly, and compares the policies with the naive
+broadcast:
+
+    python broadcast.py --clients 5000 --slow 0.05
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import resource
+import socket
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Hashable
+
+import click
+import websockets
+from websockets.exceptions import ConnectionClosed
+
+from fetch import free_port
+from loadtest import tree_rss
+from stats import percentile
+
+POLICIES = ("drop-oldest", "coalesce", "disconnect")
+
+
+class Client:
+    """
+    One connection's pending messages, oldest first, and the task that writes
+    them out.
+    """
+
+    def __init__(self, websocket, buffer: int, policy: str):
+        self.websocket = websocket
+        self.buffer = buffer
+        self.policy = policy
+        self.pending: OrderedDict[Hashable, Any] = OrderedDict()
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def offer(self, payload, key: Hashable) -> bool:
+        """
+        Queue a message. False means the buffer is full and the policy is to
+        disconnect.
+        """
+        if self.policy == "coalesce" and key in self.pending:
+            # Keeps the old message's place in the queue, with the new value.
+            self.pending[key] = payload
+            self.coalesced += 1
+            return True
+        if len(self.pending) >= self.buffer:
+            if self.policy == "disconnect":
+                return False
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.pending[key] = payload
+        self.ready.set()
+        return True
+
+    async def write(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.pending:
+                _, payload = self.pending.popitem(last=False)
+                # Waits while the socket's write buffer is full: this is where
+                # a slow client's backlog builds up.
+                await self.websocket.send(payload)
+                self.sent += 1
+
+
+class Hub:
+    """
+    Fans published messages out to every connected client. Use handler() as
+    the websockets server's connection handler.
+    """
+
+    def __init__(
+        self,
+        buffer: int = 64,
+        policy: str = "drop-oldest",
+        dumps: Callable[[Any], str] = json.dumps,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(
+                f"policy must be one of {', '.join(POLICIES)}, not {policy!r}"
+            )
+        self.buffer = buffer
+        self.policy = policy
+        self.dumps = dumps
+        self.clients: set[Client] = set()
+        self.published = 0
+        self.disconnected = 0
+        # Counts of the clients that have gone, see stats().
+        self._closed = {"sent": 0, "dropped": 0, "coalesced": 0}
+        self._closing: set[asyncio.Task] = set()
+
+    async def handler(self, websocket, path: str = "/"):
+        client = Client(websocket, self.buffer, self.policy)
+        self.clients.add(client)
+        writer = asyncio.ensure_future(client.write())
+        try:
+            # Clients have nothing to say; this ends when the connection does.
+            async for _ in websocket:
+                pass
+        except ConnectionClosed:
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+            for name in self._closed:
+                self._closed[name] += getattr(client, name)
+
+    def publish(self, message, key: Hashable | None = None) -> int:
+        """
+        Queue a message for every client and return how many there were.
+        Strings and bytes are sent as they are, anything else is serialized
+        with `dumps` first. Messages with the same `key` replace each other
+        under the coalesce policy.
+        """
+        payload = message if isinstance(message, (str, bytes)) else self.dumps(message)
+        if key is None or self.policy != "coalesce":
+            # Every other message gets a key of its own.
+            key = object()
+        clients = self.clients
+        slow = [client for client in clients if not client.offer(payload, key)]
+        for client in slow:
+            self._disconnect(client)
+        self.published += 1
+        return len(clients)
+
+    def _disconnect(self, client: Client):
+        self.clients.discard(client)
+        self.disconnected += 1
+        # close() sends a close frame behind the backlog, and gives up after
+        # the connection's close_timeout.
+        task = asyncio.ensure_future(client.websocket.close(1008, "client too slow"))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def stats(self) -> dict[str, int]:
+        totals = dict(self._closed)
+        for client in self.clients:
+            for name in totals:
+                totals[name] += getattr(client, name)
+        return dict(
+            clients=len(self.clients),
+            published=self.published,
+            disconnected=self.disconnected,
+            **totals,
+        )
+
+
+class NaiveBroadcast:
+    """
+    The obvious broadcast, for comparison: every message is serialized and
+    sent to every client before publish() returns.
+    """
+
+    def __init__(self):
+        self.clients: set = set()
+        self.published = 0
+
+    async def handler(self, websocket, path: str = "/"):
+        self.clients.add(websocket)
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.clients.discard(websocket)
+
+    async def publish(self, message, key: Hashable | None = None) -> int:
+        clients = list(self.clients)
+        await asyncio.gather(
+            *(websocket.send(json.dumps(message)) for websocket in clients),
+            return_exceptions=True,
+        )
+        self.published += 1
+        return len(clients)
+
+    def stats(self) -> dict[str, int]:
+        return dict(clients=len(self.clients), published=self.published)
+
+
+async def _listen(
+    port: int, delay: float, latencies: list[float] | None, received: list[int]
+):
+    uri = f"ws://127.0.0.1:{port}"
+    options = {}
+    if delay:
+        # Slow clients take a message every `delay` seconds. A small receive
+        # buffer and queue make their backlog reach the server after a few
+        # messages rather than a few hundred kilobytes.
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2 ** 12)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+        options = dict(sock=sock, max_queue=1, read_limit=2 ** 12)
+    try:
+        async with websockets.connect(
+            uri, compression=None, close_timeout=1, **options
+        ) as websocket:
+            async for text in websocket:
+                now = time.perf_counter()
+                received[0] += 1
+                if delay:
+                    await asyncio.sleep(delay)
+                else:
+                    latencies.append(now - json.loads(text)["sent"])
+    except (ConnectionClosed, OSError):
+        pass
+
+
+async def _broadcast(
+    mode: str,
+    clients: int,
+    slow: float,
+    delay: float,
+    rate: float,
+    duration: float,
+    size: int,
+    buffer: int,
+    keys: int,
+) -> dict:
+    hub = NaiveBroadcast() if mode == "naive" else Hub(buffer, mode)
+
+    async def handler(websocket, path: str = "/"):
+        # Likewise a small send buffer on the server's side.
+        sock = websocket.transport.get_extra_info("socket")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 2 ** 12)
+        await hub.handler(websocket, path)
+
+    port = free_port()
+    server = await websockets.serve(
+        handler,
+        "127.0.0.1",
+        port,
+        compression=None,
+        write_limit=2 ** 12,
+        ping_interval=None,
+        backlog=1024,
+    )
+    latencies: list[float] = []
+    received = [0]
+    slow_clients = round(clients * slow)
+    baseline = tree_rss(os.getpid())
+    listeners = []
+    for n in range(clients):
+        is_slow = n < slow_clients
+        listeners.append(
+            asyncio.ensure_future(
+                _listen(
+                    port,
+                    delay if is_slow else 0,
+                    None if is_slow else latencies,
+                    received,
+                )
+            )
+        )
+        if n % 100 == 99:
+            # Let the handshakes through before the listen backlog overflows.
+            await asyncio.sleep(0.05)
+    while len(hub.clients) < clients:
+        await asyncio.sleep(0.05)
+    memory = (tree_rss(os.getpid()) - baseline) / clients
+
+    loop = asyncio.get_running_loop()
+    filler = "x" * size
+    start = loop.time()
+    seq = 0
+    while loop.time() < start + duration:
+        message = {"seq": seq, "sent": time.perf_counter(), "data": filler}
+        result = hub.publish(message, key=seq % keys)
+        if asyncio.iscoroutine(result):
+            await result
+        seq += 1
+        await asyncio.sleep(max(0.0, start + seq / rate - loop.time()))
+    elapsed = loop.time() - start
+    delivered = received[0]
+    stats = hub.stats()
+
+    server.close()
+    await server.wait_closed()
+    for listener in listeners:
+        listener.cancel()
+    await asyncio.gather(*listeners, return_exceptions=True)
+    return dict(
+        stats,
+        published_per_second=seq / elapsed,
+        delivered_per_second=delivered / elapsed,
+        p50=percentile(latencies, 50),
+        p99=percentile(latencies, 99),
+        memory=memory,
+    )
+
+
+def _measure(*args) -> dict:
+    # Runs in a fresh child process, so the memory a previous mode freed does
+    # not hide this one's. Every client is two sockets in this process.
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return asyncio.run(_broadcast(*args))
+
+
+@click.command()
+@click.option("--clients", default=2000, help="Connected clients.")
+@click.option("--slow", default=0.05, help="Fraction of clients that read slowly.")
+@click.option(
+    "--slow-delay",
+    "delay",
+    default=5.0,
+    help="Seconds a slow client takes per message.",
+)
+@click.option("--rate", default=2.0, help="Messages published per second.")
+@click.option("--duration", default=20.0, help="Seconds of publishing per mode.")
+@click.option("--size", default=2000, help="Bytes of filler per message.")
+@click.option("--buffer", default=8, help="Messages buffered per client.")
+@click.option("--keys", default=4, help="Distinct coalescing keys.")
+@click.option(
+    "--mode",
+    "modes",
+    multiple=True,
+    type=click.Choice(["naive", *POLICIES]),
+    default=["naive", *POLICIES],
+)
+def main(clients, slow, delay, rate, duration, size, buffer, keys, modes):
+    """
+    Broadcast to in-process WebSocket clients with each policy and report
+    throughput, the delivery latency of the fast clients and memory per
+    connection. The clients share this machine's CPUs with the server, so
+    keep clients * rate within what one process can deliver.
+    """
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if 2 * clients + 100 > hard:
+        raise click.UsageError(
+            f"{clients} clients need more than the {hard} open files allowed"
+        )
+    click.echo(
+        f"{clients} clients, {round(clients * slow)} slow, {rate:g} messages/s "
+        f"of {size} bytes for {duration:g}s"
+    )
+    for mode in modes:
+        with ProcessPoolExecutor(1) as pool:
+            result = pool.submit(
+                _measure, mode, clients, slow, delay, rate, duration, size, buffer, keys
+            ).result()
+        line = (
+            f"{mode:<12} published {result['published_per_second']:5.1f}/s  "
+            f"delivered {result['delivered_per_second']:6.0f}/s  "
+            f"latency p50 {result['p50'] * 1000:6.1f}ms "
+            f"p99 {result['p99'] * 1000:7.1f}ms  "
+            f"{result['memory'] / 1024:5.1f} KiB/connection"
+        )
+        if mode != "naive":
+            line += (
+                f"  dropped {result['dropped']} coalesced {result['coalesced']} "
+                f"disconnected {result['disconnected']}"
+            )
+        click.echo(line)
+    click.echo(
+        "Latencies are the fast clients'; memory counts both ends of a connection."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Cache-aside: look the value up in the cache first, and only on a miss compute
+it (query the database, call the slow service...) and store it for next time.
+
+Cache adds three things on top of a plain get/set against Redis:
+- TTLs, including negative caching: a computation that returns None is cached
+  for `negative_ttl` so a missing row is not looked up again on every request.
+  A `ttl` or `negative_ttl` of 0 turns caching off for those values.
+- Stampede protection: when a hot key expires, only one caller recomputes it.
+  Within a process the other callers await the same future; across processes a
+  short-lived Redis lock (SET NX) lets one winner compute while the rest poll
+  for its result. The lock holds a random token and is only released by its
+  holder, so a winner whose lock expired cannot release the next one's. A
+  caller that is cancelled mid-computation hands the key to one of its
+  waiters instead of cancelling them.
+- An in-process LRU tier in front of Redis that absorbs hot keys without a
+  network round trip. Its TTL is kept short so it never serves values much
+  staler than Redis would.
+
+    redis = await aioredis.create_redis_pool("redis://localhost")
+    cache = Cache(redis, ttl=60)
+
+    @cache.cached(ttl=300)
+    async def get_user(user_id): ...
+
+FakeRedis implements the subset of the aioredis 1.x interface Cache uses, in
+memory, for running without a redis-server.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import pickle
+import secrets
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+import aioredis
+import click
+
+from practice import sleep_for_five
+
+MISSING = object()
+# Stored in place of None so a cached "no result" can be told from a miss.
+NEGATIVE = b"\x00negative"
+# Deletes a lock only while it still holds the caller's token.
+UNLOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class LRU:
+    """
+    A small in-process cache with a maximum size and per-entry expiry.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+
+class Cache:
+    def __init__(
+        self,
+        redis,
+        ttl: float = 60,
+        negative_ttl: float = 5,
+        local_size: int = 1024,
+        local_ttl: float = 1,
+        lock_timeout: float = 10,
+        prefix: str = "cache:",
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local = LRU(local_size) if local_size else None
+        self.local_ttl = local_ttl
+        self.lock_timeout = lock_timeout
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float | None = None,
+    ) -> Any:
+        key = self.prefix + key
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not MISSING:
+                self.hits += 1
+                return value
+        raw = await self.redis.get(key)
+        if raw is not None:
+            self.hits += 1
+            return self._remember(key, self._decode(raw))
+        self.misses += 1
+        # Single flight within this process: late callers wait for the first.
+        inflight = self._inflight.get(key)
+        while inflight is not None:
+            value = await asyncio.shield(inflight)
+            if value is not MISSING:
+                return value
+            # The caller computing it was cancelled: the first waiter to get
+            # here takes over, the others wait for it.
+            inflight = self._inflight.get(key)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._fill(key, compute, ttl)
+        except Exception as error:
+            future.set_exception(error)
+            # Mark it retrieved, callers that were waiting get it themselves.
+            future.exception()
+            raise
+        except BaseException:
+            # Cancellation is this caller's own, not the waiters'.
+            future.set_result(MISSING)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _fill(self, key: str, compute, ttl: float | None) -> Any:
+        lock = "lock:" + key
+        token = secrets.token_bytes(16)
+        lock_ms = int(self.lock_timeout * 1000)
+        while not await self.redis.set(
+            lock, token, pexpire=lock_ms, exist=self.redis.SET_IF_NOT_EXIST
+        ):
+            # Another process is computing the key; wait for its result, or
+            # take over once its lock expires.
+            await asyncio.sleep(0.05)
+            raw = await self.redis.get(key)
+            if raw is not None:
+                return self._remember(key, self._decode(raw))
+        try:
+            # The previous holder may have stored the value just before
+            # releasing the lock we now hold.
+            raw = await self.redis.get(key)
+            if raw is not None:
+                return self._remember(key, self._decode(raw))
+            value = await compute()
+            if value is None:
+                raw, seconds = NEGATIVE, self.negative_ttl
+            else:
+                raw, seconds = pickle.dumps(value), self.ttl if ttl is None else ttl
+            if not seconds:
+                return value
+            await self.redis.set(key, raw, pexpire=int(seconds * 1000))
+        finally:
+            await self.redis.eval(UNLOCK, keys=[lock], args=[token])
+        return self._remember(key, value)
+
+    def _remember(self, key: str, value: Any) -> Any:
+        if self.local is not None:
+            self.local.set(key, value, self.local_ttl)
+        return value
+
+    @staticmethod
+    def _decode(raw: bytes) -> Any:
+        return None if raw == NEGATIVE else pickle.loads(raw)
+
+    async def invalidate(self, key: str):
+        key = self.prefix + key
+        if self.local is not None:
+            self.local.delete(key)
+        await self.redis.delete(key)
+
+    def cached(self, ttl: float | None = None, key: Callable[..., str] | None = None):
+        """
+        Decorator for coroutine functions. The cache key is built from the
+        function name and arguments unless `key` builds it instead.
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if key is not None:
+                    cache_key = key(*args, **kwargs)
+                else:
+                    cache_key = (
+                        f"{func.__module__}.{func.__qualname__}:{args!r}:{kwargs!r}"
+                    )
+                return await self.get_or_compute(
+                    cache_key, lambda: func(*args, **kwargs), ttl
+                )
+
+            return wrapper
+
+        return decorator
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for an aioredis 1.x connection pool, covering get, set
+    (with expire/pexpire and SET_IF_NOT_EXIST), delete, eval of the UNLOCK
+    script and close.
+    """
+
+    SET_IF_NOT_EXIST = "SET_IF_NOT_EXIST"
+    SET_IF_EXIST = "SET_IF_EXIST"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._data: dict[str, tuple[float | None, bytes]] = {}
+
+    async def _round_trip(self):
+        await asyncio.sleep(self.latency)
+
+    def _alive(self, key: str) -> bytes | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> bytes | None:
+        await self._round_trip()
+        return self._alive(key)
+
+    async def set(self, key, value, *, expire=0, pexpire=0, exist=None) -> bool:
+        await self._round_trip()
+        present = self._alive(key) is not None
+        if exist == self.SET_IF_NOT_EXIST and present:
+            return False
+        if exist == self.SET_IF_EXIST and not present:
+            return False
+        if isinstance(value, str):
+            value = value.encode()
+        ttl = pexpire / 1000 if pexpire else expire
+        self._data[key] = (time.monotonic() + ttl if ttl else None, value)
+        return True
+
+    async def delete(self, key: str, *keys: str) -> int:
+        await self._round_trip()
+        return sum(self._data.pop(k, None) is not None for k in (key, *keys))
+
+    async def eval(self, script: str, keys=(), args=()):
+        await self._round_trip()
+        if script != UNLOCK:
+            raise NotImplementedError("FakeRedis can only evaluate the UNLOCK script")
+        (lock,), (token,) = keys, args
+        if self._alive(lock) != token:
+            return 0
+        del self._data[lock]
+        return 1
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+async def slow_lookup(key: int) -> str:
+    await sleep_for_five()
+    return f"value-{key}"
+
+
+async def benchmark_async(
+    address: str | None = None, callers: int = 1_000, keys: int = 5
+):
+    if address:
+        redis = await aioredis.create_redis_pool(address)
+    else:
+        redis = FakeRedis(latency=0.0002)
+    cache = Cache(redis, ttl=60)
+    computed = 0
+
+    @cache.cached(key=lambda key: f"slow_lookup:{key}")
+    async def cached_lookup(key: int) -> str:
+        nonlocal computed
+        computed += 1
+        return await slow_lookup(key)
+
+    async def timed(lookup):
+        start = time.perf_counter()
+        await asyncio.gather(*(lookup(n % keys) for n in range(callers)))
+        return time.perf_counter() - start
+
+    try:
+        elapsed = await timed(slow_lookup)
+        click.secho(
+            f"uncached    {elapsed:.3f}s for {callers} calls ({callers} computed)",
+            bold=True,
+        )
+        for round_name in ("cold cache", "warm cache"):
+            computed = 0
+            elapsed = await timed(cached_lookup)
+            click.secho(
+                f"{round_name:<11} {elapsed:.3f}s for {callers} calls "
+                f"({computed} computed, "
+                f"hit rate so far {cache.hit_rate:.1%})",
+                bold=True,
+                bg="white",
+                fg="blue",
+            )
+    finally:
+        for key in range(keys):
+            await cache.invalidate(f"slow_lookup:{key}")
+        redis.close()
+        await redis.wait_closed()
+
+
+def benchmark(address: str | None = None):
+    """
+    Fire 1000 concurrent calls over 5 keys at sleep_for_five() uncached, then
+    through the cache cold and warm. Pass a redis:// address to use a real
+    server instead of FakeRedis.
+    """
+    asyncio.run(benchmark_async(address))
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,373 @@
+"""
+Loading the taxi and rice datasets of the ML crash course notebooks
+(ml/cc/exercises) quickly and in less memory.
+
+The notebooks run pd.read_csv() on the whole CSV every session, then pick their
+columns with .loc, so every number is parsed again and kept as int64/float64
+and every label as a Python string. load_dataset() reads a local CSV once:
+- only the columns of the schema are parsed, straight into float32/int32, and
+  labels (COMPANY, PAYMENT_TYPE, Class) into categoricals
+- the result is saved as one .npy file per column (categoricals as their codes)
+  in a cache directory keyed by the CSV's content hash and the schema, so an
+  edited file or a changed schema never reads a stale cache
+- later loads memory-map those files instead of parsing: the DataFrame wraps
+  the mapped arrays without copying them, and pages are only read from disk
+  (or the page cache) when a column is used
+
+    taxi = load_taxi("chicago_taxi_train.csv")
+    rice = load_rice("Rice_Cammeo_Osmancik.csv", mmap_mode="c")
+
+The maps are read-only by default. mmap_mode="c" makes them copy-on-write, for
+code that modifies the arrays in place; the changes stay in memory only.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+import numpy as np
+import pandas as pd
+
+# Bump when the cache layout changes, so old caches are not read.
+CACHE_VERSION = 1
+
+TAXI_URL = "https://download.mlcc.google.com/mledu-datasets/chicago_taxi_train.csv"
+RICE_URL = "https://download.mlcc.google.com/mledu-datasets/Rice_Cammeo_Osmancik.csv"
+
+# The columns each notebook uses, and the dtype each is stored as.
+TAXI_SCHEMA = {
+    "TRIP_MILES": "float32",
+    "TRIP_SECONDS": "int32",
+    "FARE": "float32",
+    "COMPANY": "category",
+    "PAYMENT_TYPE": "category",
+    "TIP_RATE": "float32",
+}
+RICE_SCHEMA = {
+    "Area": "int32",
+    "Perimeter": "float32",
+    "Major_Axis_Length": "float32",
+    "Minor_Axis_Length": "float32",
+    "Eccentricity": "float32",
+    "Convex_Area": "int32",
+    "Extent": "float32",
+    "Class": "category",
+}
+
+
+def default_cache_dir(path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(path)), ".dataset_cache")
+
+
+def file_digest(path: str, cache_dir: str) -> str:
+    """
+    BLAKE2 digest of the file's content. Hashing a large CSV takes a while, so
+    digests are remembered per (path, size, mtime) and only recomputed when
+    the file changes.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    index_path = os.path.join(cache_dir, "digests.json")
+    try:
+        with open(index_path) as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(path)
+    if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return entry[2]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    index[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(index_path + ".tmp", "w") as file:
+        json.dump(index, file)
+    os.replace(index_path + ".tmp", index_path)
+    return digest.hexdigest()
+
+
+def cache_key(path: str, schema: dict[str, str] | None, cache_dir: str) -> str:
+    schema_text = json.dumps([CACHE_VERSION, schema])
+    schema_hash = hashlib.blake2b(schema_text.encode(), digest_size=8).hexdigest()
+    return f"{file_digest(path, cache_dir)}-{schema_hash}"
+
+
+def downcast(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrink the dtypes pandas inferred: floats to float32, integers to int32
+    when they fit, and text to categoricals (a cached column has to be a plain
+    array, which Python strings are not).
+    """
+    columns = {}
+    for name, column in frame.items():
+        if pd.api.types.is_float_dtype(column):
+            column = column.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(column):
+            info = np.iinfo(np.int32)
+            if column.empty or (column.min() >= info.min and column.max() <= info.max):
+                column = column.astype(np.int32)
+        elif not pd.api.types.is_numeric_dtype(column):
+            column = column.astype("category")
+        columns[name] = column
+    return pd.DataFrame(columns)
+
+
+def read_csv(path: str, schema: dict[str, str] | None = None) -> pd.DataFrame:
+    """
+    Parse the CSV, only the schema's columns and directly into its dtypes. With
+    no schema every column is read and then downcast.
+    """
+    if schema is None:
+        return downcast(pd.read_csv(path))
+    frame = pd.read_csv(path, usecols=list(schema), dtype=schema)
+    return frame[list(schema)]
+
+
+def save_frame(frame: pd.DataFrame, directory: str):
+    """
+    Write one .npy file per column and a meta.json describing them. The
+    directory appears atomically, so a crash mid-write never leaves a
+    half-written cache behind.
+    """
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".staging-")
+    try:
+        columns = []
+        for n, (name, column) in enumerate(frame.items()):
+            entry = {"name": name, "file": f"{n}.npy"}
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                values = column.cat.codes.to_numpy()
+                entry["categories"] = column.cat.categories.tolist()
+                entry["ordered"] = bool(column.cat.ordered)
+            else:
+                values = column.to_numpy()
+            np.save(os.path.join(staging, entry["file"]), values)
+            columns.append(entry)
+        with open(os.path.join(staging, "meta.json"), "w") as file:
+            json.dump(
+                {"version": CACHE_VERSION, "rows": len(frame), "columns": columns}, file
+            )
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    try:
+        os.rename(staging, directory)
+    except OSError:
+        # Another process filled the same cache entry first; use theirs.
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+
+
+def load_frame(directory: str, mmap_mode: str | None = "r") -> pd.DataFrame:
+    """
+    Build a DataFrame over the memory-mapped columns of a cache directory,
+    without copying them (mmap_mode=None reads them into memory instead).
+    """
+    with open(os.path.join(directory, "meta.json")) as file:
+        meta = json.load(file)
+    columns = {}
+    for entry in meta["columns"]:
+        values = np.load(os.path.join(directory, entry["file"]), mmap_mode=mmap_mode)
+        if "categories" in entry:
+            values = pd.Categorical.from_codes(
+                values,
+                categories=entry["categories"],
+                ordered=entry["ordered"],
+                validate=False,
+            )
+        columns[entry["name"]] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_dataset(
+    path: str,
+    schema: dict[str, str] | None = None,
+    cache_dir: str | None = None,
+    mmap_mode: str | None = "r",
+) -> pd.DataFrame:
+    """
+    Load a local CSV, from the cache when it holds this file and schema, or
+    by parsing it once and filling the cache.
+    """
+    cache_dir = cache_dir or default_cache_dir(path)
+    directory = os.path.join(cache_dir, cache_key(path, schema, cache_dir))
+    if not os.path.exists(os.path.join(directory, "meta.json")):
+        save_frame(read_csv(path, schema), directory)
+    return load_frame(directory, mmap_mode)
+
+
+def load_taxi(path: str, **kwargs) -> pd.DataFrame:
+    """
+    The columns linear_regression_taxi.ipynb trains on. `path` is a local
+    copy of TAXI_URL.
+    """
+    return load_dataset(path, TAXI_SCHEMA, **kwargs)
+
+
+def load_rice(path: str, **kwargs) -> pd.DataFrame:
+    """
+    The columns binary_classification_rice.ipynb trains on. `path` is a local
+    copy of RICE_URL.
+    """
+    return load_dataset(path, RICE_SCHEMA, **kwargs)
+
+
+COMPANIES = [
+    "Flash Cab",
+    "Taxi Affiliation Services",
+    "Sun Taxi",
+    "City Service",
+    "Chicago Independents",
+    "Globe Taxi",
+    "Medallion Leasing",
+    "Blue Ribbon Taxi Association",
+    "Taxicab Insurance Agency Llc",
+    "Choice Taxi Association",
+]
+PAYMENT_TYPES = ["Credit Card", "Cash", "Mobile", "Prcard", "Unknown"]
+
+
+def taxi_frame(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Random rows shaped like chicago_taxi_train.csv: its six training columns
+    plus a few the notebook does not use.
+    """
+    miles = rng.gamma(1.5, 4.0, rows).round(2)
+    seconds = (miles * 150 + rng.normal(300, 120, rows)).clip(60).astype(int)
+    fare = (
+        (3.25 + miles * 2.25 + seconds / 36 * 0.2 + rng.normal(0, 3, rows))
+        .clip(3.25)
+        .round(2)
+    )
+    tip = (rng.random(rows) * 25).round(3)
+    return pd.DataFrame(
+        {
+            "TRIP_START_TIMESTAMP": "01/01/2022 12:00:00 AM",
+            "TRIP_SECONDS": seconds,
+            "TRIP_MILES": miles,
+            "TRIP_SPEED": (miles / seconds * 3600).round(1),
+            "PICKUP_COMMUNITY_AREA": rng.integers(1, 78, rows),
+            "FARE": fare,
+            "TIPS": (fare * tip / 100).round(2),
+            "TIP_RATE": tip,
+            "TRIP_TOTAL": (fare * (1 + tip / 100)).round(2),
+            "PAYMENT_TYPE": np.array(PAYMENT_TYPES)[
+                rng.integers(0, len(PAYMENT_TYPES), rows)
+            ],
+            "COMPANY": np.array(COMPANIES)[rng.integers(0, len(COMPANIES), rows)],
+        }
+    )
+
+
+def make_taxi_csv(path: str, rows: int, seed: int = 0, chunk_rows: int = 1_000_000):
+    """
+    Write `rows` rows of taxi_frame() to a CSV, a chunk at a time.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunk_rows):
+        taxi_frame(min(chunk_rows, rows - start), rng).to_csv(
+            path, mode="a" if start else "w", header=not start, index=False
+        )
+
+
+# Mean and standard deviation of each rice feature per class, roughly those of
+# Rice_Cammeo_Osmancik.csv.
+RICE_SHAPE = {
+    "Area": ((14163, 1296), (11550, 1040)),
+    "Perimeter": ((487.5, 22.2), (429.4, 20.1)),
+    "Major_Axis_Length": ((205.5, 10.4), (176.0, 9.6)),
+    "Minor_Axis_Length": ((88.8, 5.4), (84.1, 5.5)),
+    "Eccentricity": ((0.901, 0.014), (0.876, 0.018)),
+    "Convex_Area": ((14494, 1307), (11794, 1064)),
+    "Extent": ((0.650, 0.077), (0.671, 0.077)),
+}
+
+
+def rice_frame(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Random rows shaped like Rice_Cammeo_Osmancik.csv, about 43% Cammeo.
+    """
+    cammeo = rng.random(rows) < 0.43
+    columns = {}
+    for name, (
+        (cammeo_mean, cammeo_std),
+        (osmancik_mean, osmancik_std),
+    ) in RICE_SHAPE.items():
+        mean = np.where(cammeo, cammeo_mean, osmancik_mean)
+        std = np.where(cammeo, cammeo_std, osmancik_std)
+        values = rng.standard_normal(rows) * std + mean
+        columns[name] = (
+            values.round().astype(np.int32) if RICE_SCHEMA[name] == "int32" else values
+        )
+    columns["Class"] = pd.Categorical.from_codes(
+        np.where(cammeo, 0, 1).astype(np.int8), categories=["Cammeo", "Osmancik"]
+    )
+    return pd.DataFrame(columns)
+
+
+def _rss_kb() -> int:
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def _measure(mode: str, path: str, cache_dir: str) -> tuple[float, float, int, int]:
+    # Runs in a fresh child process, so RSS and its peak are this case's only.
+    start = time.perf_counter()
+    if mode == "pandas defaults":
+        frame = pd.read_csv(path).loc[:, list(TAXI_SCHEMA)]
+    elif mode == "typed csv":
+        frame = read_csv(path, TAXI_SCHEMA)
+    else:
+        frame = load_taxi(path, cache_dir=cache_dir)
+    loaded = time.perf_counter() - start
+    rss = _rss_kb()
+    start = time.perf_counter()
+    frame.select_dtypes("number").mean()
+    first_pass = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return loaded, first_pass, rss, peak
+
+
+def benchmark(rows: int = 10_000_000):
+    """
+    Load a synthetic `rows` row taxi CSV with pandas defaults, with the typed
+    reader, then from the cache (the cold load fills it, the warm load maps
+    it), reporting load time, RSS after loading, peak RSS, and the time of a
+    first pass over the numeric columns.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "taxi.csv")
+        start = time.perf_counter()
+        make_taxi_csv(path, rows)
+        print(
+            f"wrote {rows} rows ({os.path.getsize(path) / 2 ** 20:.0f} MiB) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        cache_dir = os.path.join(directory, "cache")
+        for mode in ("pandas defaults", "typed csv", "cold cache", "warm cache"):
+            with ProcessPoolExecutor(1) as pool:
+                loaded, first_pass, rss, peak = pool.submit(
+                    _measure, mode, path, cache_dir
+                ).result()
+            click.secho(
+                f"{mode:<16} load {loaded:7.2f}s  RSS {rss / 1024:6.0f} MiB  "
+                f"peak {peak / 1024:6.0f} MiB  first pass {first_pass:.3f}s",
+                bold=True,
+            )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -62,6 +62,13 @@ Pros and Cons
 
 from __future__ import annotations
 from abc import ABC, abstractmethod
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+import threading
+import time
+import tracemalloc
 
 
 class Creator(ABC):
@@ -111,10 +118,18 @@ class Product(ABC):
     The Product interface declares the operations that all concrete products must implement.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def operation(self) -> str:
         pass
 
+    def reset(self) -> None:
+        """
+        Called when a pooled product is handed back, so the next borrower gets it in a clean state. Products that keep per-use state override this.
+        """
+        pass
+
 
 """
 Concrete Products provide various implementations of the Product interface.
@@ -122,15 +137,153 @@ Concrete Products provide various implementations of the Product interface.
 
 
 class ConcreteProduct1(Product):
+    __slots__ = ()
+
     def operation(self) -> str:
         return "{Result of the ConcreteProduct1}"
 
 
 class ConcreteProduct2(Product):
+    __slots__ = ()
+
     def operation(self) -> str:
         return "{Result of the ConcreteProduct2}"
 
 
+"""
+Pooling: the Factory Method also lets a creator hand out existing products instead of building new ones. A pool keeps up to max_size products; acquire() returns an idle one or builds a new one while under the limit, and otherwise waits for one to be released. release() resets the product before it goes back to the pool.
+"""
+
+
+class ProductPool:
+    """
+    A bounded, thread-safe pool of products built by `factory` (usually a creator's factory_method). It records how many products it built and the high-water mark of products in use at once.
+    """
+
+    def __init__(self, factory, max_size: int = 8):
+        self.factory = factory
+        self.max_size = max_size
+        self.created = 0
+        self.in_use = 0
+        self.high_water_mark = 0
+        self._idle: deque[Product] = deque()
+        self._available = threading.Condition()
+
+    def acquire(self, timeout: float | None = None) -> Product:
+        with self._available:
+            # wait_for() keeps one deadline across wakeups, so a borrower that
+            # keeps losing the race to others still gives up after `timeout`.
+            if not self._available.wait_for(
+                lambda: self._idle or self.created < self.max_size, timeout
+            ):
+                raise TimeoutError("no product became available")
+            if self._idle:
+                product = self._idle.pop()
+            else:
+                # Reserve the slot under the lock so the pool never overshoots max_size, but build outside it so a slow factory does not hold up other borrowers.
+                self.created += 1
+                product = None
+            self.in_use += 1
+            self.high_water_mark = max(self.high_water_mark, self.in_use)
+        if product is None:
+            try:
+                product = self.factory()
+            except BaseException:
+                with self._available:
+                    self.created -= 1
+                    self.in_use -= 1
+                    self._available.notify()
+                raise
+        return product
+
+    def release(self, product: Product) -> None:
+        product.reset()
+        with self._available:
+            self.in_use -= 1
+            self._idle.append(product)
+            self._available.notify()
+
+    @contextmanager
+    def product(self, timeout: float | None = None):
+        product = self.acquire(timeout)
+        try:
+            yield product
+        finally:
+            self.release(product)
+
+
+class AsyncProductPool:
+    """
+    The same pool for coroutines: acquire() awaits instead of blocking the thread when every product is in use. Not thread-safe, use it from one event loop.
+    """
+
+    def __init__(self, factory, max_size: int = 8):
+        self.factory = factory
+        self.max_size = max_size
+        self.created = 0
+        self.in_use = 0
+        self.high_water_mark = 0
+        self._idle: asyncio.Queue | None = None
+
+    def _queue(self) -> asyncio.Queue:
+        # Created on first use so it binds to the loop that uses the pool, not whichever one was current when the pool was built.
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        return self._idle
+
+    async def acquire(self) -> Product:
+        idle = self._queue()
+        if idle.empty() and self.created < self.max_size:
+            self.created += 1
+            try:
+                product = self.factory()
+            except BaseException:
+                self.created -= 1
+                raise
+        else:
+            product = await idle.get()
+        self.in_use += 1
+        self.high_water_mark = max(self.high_water_mark, self.in_use)
+        return product
+
+    def release(self, product: Product) -> None:
+        if not self.in_use:
+            raise RuntimeError("release() without a matching acquire()")
+        product.reset()
+        self.in_use -= 1
+        self._queue().put_nowait(product)
+
+    @asynccontextmanager
+    async def product(self):
+        product = await self.acquire()
+        try:
+            yield product
+        finally:
+            self.release(product)
+
+
+class PooledCreator(Creator):
+    """
+    Mix in before a concrete creator to borrow products from a pool instead of calling the factory method on every operation: class PooledCreator1(PooledCreator, ConcreteCreator1).
+    """
+
+    def __init__(self, max_size: int = 8):
+        self.pool = ProductPool(self.factory_method, max_size)
+
+    def some_operation(self) -> str:
+        with self.pool.product() as product:
+            result = f"Creator: The same creator's code has just worked with {product.operation()}"
+        return result
+
+
+class PooledCreator1(PooledCreator, ConcreteCreator1):
+    pass
+
+
+class PooledCreator2(PooledCreator, ConcreteCreator2):
+    pass
+
+
 def client_code(creator: Creator) -> None:
     """
     The client code works with an instance of a concrete creator, albeit through its base interface. As long as the client keeps working with the creator via the base interface, you can pass it any creator's subclass.
@@ -142,6 +295,68 @@ def client_code(creator: Creator) -> None:
     )
 
 
+class ExpensiveProduct(Product):
+    """
+    Stands in for a product that is costly to build, such as a connection with its buffers.
+    """
+
+    built = 0
+
+    def __init__(self):
+        ExpensiveProduct.built += 1
+        self.buffer = bytearray(256 * 1024)
+        self.uses = 0
+
+    def operation(self) -> str:
+        self.uses += 1
+        self.buffer[self.uses % len(self.buffer)] = 1
+        return "{Result of the ExpensiveProduct}"
+
+    def reset(self) -> None:
+        self.uses = 0
+
+
+class ExpensiveCreator(Creator):
+    def factory_method(self) -> Product:
+        return ExpensiveProduct()
+
+
+class PooledExpensiveCreator(PooledCreator, ExpensiveCreator):
+    pass
+
+
+def benchmark(threads: int = 8, operations: int = 20_000) -> None:
+    """
+    Run some_operation() from several threads with and without pooling and compare products built, throughput and peak traced memory.
+    """
+    for name, creator in (
+        ("new product per call", ExpensiveCreator()),
+        ("pooled", PooledExpensiveCreator(max_size=threads)),
+    ):
+        ExpensiveProduct.built = 0
+
+        def work(_):
+            for _ in range(operations):
+                creator.some_operation()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(work, range(threads)))
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        work(None)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(
+            f"{name:<21} {threads * operations / elapsed:9.0f} ops/s  "
+            f"{ExpensiveProduct.built:6} products built  peak {peak / 1024:.0f} KiB"
+        )
+        if isinstance(creator, PooledCreator):
+            print(f"{'':<21} high-water mark {creator.pool.high_water_mark} of {creator.pool.max_size}")
+
+
 if __name__ == "__main__":
     print("App: Launched with the ConcreteCreator1.")
     client_code(ConcreteCreator1())
@@ -150,3 +365,9 @@ if __name__ == "__main__":
     print("App: Launched with the ConcreteCreator2.")
     client_code(ConcreteCreator2())
     print("\n")
+
+    print("App: Launched with the pooled ConcreteCreator1.")
+    client_code(PooledCreator1())
+    print("\n")
+
+    benchmark()
@@ -24,17 +24,23 @@ class PauldronCreator(ArmourCreator):
 
 
 class Armour(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def durability(self):
         pass
 
 
 class Helmet(Armour):
+    __slots__ = ()
+
     def durability(self):
         return f"Helmet durability: 300/300"
 
 
 class Pauldron(Armour):
+    __slots__ = ()
+
     def durability(self):
         return f"Pauldron durability: 400/400"
 
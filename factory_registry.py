@@ -0,0 +1,239 @@
+"""
+A registry of abstract factories, looked up by family name.
+
+client_code() and create_ui() need their caller to import and build a concrete
+factory, which means every product family is imported up front even when only
+one is used. FactoryRegistry turns that around:
+- A family is registered by name, either with the @register decorator on the
+  factory class, or as a "module:attribute" string (from a config mapping or
+  from package entry points) that is not imported yet.
+- get(name) is a single dict lookup. The first call for a family imports its
+  module and builds the factory; the instance is then cached, so later calls
+  cost the lookup only.
+
+    themes.get("dark").create_button().paint()
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import threading
+
+
+class FactoryRegistry:
+    def __init__(self, kind: str):
+        self.kind = kind
+        # name -> factory instance once resolved, or the class / "module:attr"
+        # target it will be built from.
+        self._table: dict[str, object] = {}
+        self._resolved: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str):
+        """
+        Class decorator: @themes.register("dark").
+        """
+
+        def decorator(factory_class):
+            self.add(name, factory_class)
+            return factory_class
+
+        return decorator
+
+    def add(self, name: str, target):
+        """
+        Register a factory class, or a "module:attribute" string naming one
+        which is only imported when the family is first used.
+        """
+        with self._lock:
+            self._table[name] = target
+            self._resolved.pop(name, None)
+
+    def load_config(self, config: dict[str, str] | str):
+        """
+        Register families from a {name: "module:attribute"} mapping, or from
+        a JSON file holding one.
+        """
+        if isinstance(config, str):
+            with open(config) as file:
+                config = json.load(file)
+        for name, target in config.items():
+            self.add(name, target)
+
+    def load_entry_points(self, group: str):
+        """
+        Register the families installed packages advertise in an entry point
+        group, without importing them.
+        """
+        # importlib.metadata is slow to import; only pay for it when used.
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=group):
+            self.add(entry_point.name, entry_point.value)
+
+    def get(self, name: str):
+        factory = self._resolved.get(name)
+        if factory is None:
+            factory = self._resolve(name)
+        return factory
+
+    def _resolve(self, name: str):
+        with self._lock:
+            factory = self._resolved.get(name)
+            if factory is not None:
+                return factory
+            try:
+                target = self._table[name]
+            except KeyError:
+                raise LookupError(
+                    f"no {self.kind} family named {name!r}, "
+                    f"known: {', '.join(sorted(self._table))}"
+                ) from None
+            if isinstance(target, str):
+                module_name, _, attribute = target.partition(":")
+                target = getattr(importlib.import_module(module_name), attribute)
+            factory = self._resolved[name] = target()
+            return factory
+
+    def names(self) -> list[str]:
+        return sorted(self._table)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._table
+
+
+# The families that ship with this repo. Nothing is imported until a family is
+# asked for by name.
+product_families = FactoryRegistry("product")
+product_families.load_config(
+    {
+        "1": "abstract_factory:ConcreteFactory1",
+        "2": "abstract_factory:ConcreteFactory2",
+    }
+)
+
+themes = FactoryRegistry("theme")
+themes.load_config(
+    {
+        "light": "af_example:LightThemeFactory",
+        "dark": "af_example:DarkThemeFactory",
+    }
+)
+
+car_families = FactoryRegistry("car")
+car_families.load_config(
+    {
+        "white": "af_car:WhiteCarFactory",
+        "dark": "af_car:DarkCarFactory",
+    }
+)
+
+
+def client_code(family: str) -> None:
+    from abstract_factory import client_code
+
+    client_code(product_families.get(family))
+
+
+def create_ui(theme: str) -> None:
+    from af_example import create_ui
+
+    create_ui(themes.get(theme))
+
+
+def create_car(family: str) -> None:
+    from af_car import create_car
+
+    create_car(car_families.get(family))
+
+
+FAMILY_MODULE = """
+from af_example import Button, Checkbox, ThemeFactory
+
+class Button{n}(Button):
+    def paint(self):
+        return "Rendering button {n}"
+
+class Checkbox{n}(Checkbox):
+    def paint(self):
+        return "Rendering checkbox {n}"
+
+class Factory{n}(ThemeFactory):
+    def create_button(self):
+        return Button{n}()
+
+    def create_checkbox(self):
+        return Checkbox{n}()
+"""
+
+EAGER = """
+import time
+start = time.perf_counter()
+factories = {{}}
+for n in range({count}):
+    module = __import__(f"family_{{n}}")
+    factories[str(n)] = getattr(module, f"Factory{{n}}")()
+ready = time.perf_counter()
+factories["0"].create_button().paint()
+print(ready - start, time.perf_counter() - ready)
+"""
+
+LAZY = """
+import time
+start = time.perf_counter()
+from factory_registry import FactoryRegistry
+registry = FactoryRegistry("theme")
+registry.load_config({{str(n): f"family_{{n}}:Factory{{n}}" for n in range({count})}})
+ready = time.perf_counter()
+registry.get("0").create_button().paint()
+print(ready - start, time.perf_counter() - ready)
+"""
+
+
+def benchmark(counts=(1, 200), repeat: int = 5):
+    """
+    Generate `count` theme family modules and time, in fresh interpreters,
+    importing them all up front against registering them lazily, then the
+    latency of the first factory call.
+    """
+    import os
+    import subprocess
+    import sys
+    import tempfile
+    import textwrap
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        for n in range(max(counts)):
+            with open(os.path.join(directory, f"family_{n}.py"), "w") as file:
+                file.write(textwrap.dedent(FAMILY_MODULE.format(n=n)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([directory, here]))
+        for count in counts:
+            for name, script in (("eager imports", EAGER), ("lazy registry", LAZY)):
+                startup, first_call = [], []
+                for _ in range(repeat):
+                    output = subprocess.run(
+                        [sys.executable, "-c", script.format(count=count)],
+                        env=env,
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                    ).stdout.split()
+                    startup.append(float(output[0]))
+                    first_call.append(float(output[1]))
+                print(
+                    f"{count:>4} families, {name:<14} "
+                    f"startup {min(startup) * 1000:7.2f}ms  "
+                    f"first call {min(first_call) * 1000:6.2f}ms"
+                )
+
+
+if __name__ == "__main__":
+    print("Client: Testing client code with the family named '1':")
+    client_code("1")
+    print("\n")
+    print("Creating UI with the theme named 'dark':")
+    create_ui("dark")
+    print()
+    benchmark()
@@ -0,0 +1,239 @@
+"""
+HTTP requests are the textbook I/O bound task: almost all of the time is spent
+waiting on the network. requests blocks the thread for each of them, while
+aiohttp lets one event loop keep thousands in flight.
+
+Most of the win comes from reusing one ClientSession for everything. Its
+TCPConnector is the connection pool: it keeps connections alive between
+requests, caches DNS lookups and caps how many connections are open overall and
+per host. Creating a session per request throws all of that away.
+
+FetchClient wraps one such session. Bodies are streamed in chunks instead of
+being read into memory in one go, every request has its own timeout, and a
+failed request is reported in its FetchResult instead of raising.
+
+    async with FetchClient(limit_per_host=50) as client:
+        results = await client.fetch_all(urls, concurrency=200)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import socket
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+import aiohttp
+import click
+import requests
+from aiohttp import web
+
+from runner import BoundedRunner
+from stats import percentile
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int | None
+    size: int
+    elapsed: float
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and self.status < 400
+
+
+class FetchClient:
+    def __init__(
+        self,
+        limit: int = 200,
+        limit_per_host: int = 50,
+        timeout: float = 10.0,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        chunk_size: int = 64 * 1024,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.chunk_size = chunk_size
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> FetchClient:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        if self._session is not None:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            raise RuntimeError("FetchClient is not started, use 'async with'")
+        return self._session
+
+    async def fetch(
+        self,
+        url: str,
+        timeout: float | None = None,
+        on_chunk: Callable[[bytes], None] | None = None,
+    ) -> FetchResult:
+        """
+        GET `url`, streaming the body chunk by chunk. Chunks are passed to
+        `on_chunk` when given, otherwise only their size is kept.
+        """
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        start = time.perf_counter()
+        size = 0
+        try:
+            async with self.session.get(url, **kwargs) as response:
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    size += len(chunk)
+                    if on_chunk is not None:
+                        on_chunk(chunk)
+                return FetchResult(
+                    url, response.status, size, time.perf_counter() - start
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            return FetchResult(
+                url, None, size, time.perf_counter() - start, repr(error)
+            )
+
+    async def fetch_all(
+        self, urls: Iterable[str], concurrency: int = 100, **kwargs
+    ) -> list[FetchResult]:
+        runner = BoundedRunner(concurrency)
+        results = await runner.run(
+            (lambda url=url: self.fetch(url, **kwargs)) for url in urls
+        )
+        return [result.value for result in results]
+
+
+def make_app(payload_size: int = 2_048, delay: float = 0.0) -> web.Application:
+    """
+    The local test server: /item/{n} answers with `payload_size` bytes after
+    `delay` seconds.
+    """
+    payload = b"x" * payload_size
+
+    async def item(request: web.Request) -> web.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        return web.Response(body=payload)
+
+    app = web.Application()
+    app.router.add_get("/item/{n}", item)
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(port: int, **kwargs):
+    web.run_app(make_app(**kwargs), host="127.0.0.1", port=port, print=None)
+
+
+def start_server(
+    target: Callable[..., None] = serve, **kwargs
+) -> tuple[multiprocessing.Process, str]:
+    """
+    Run the test server, target(port, **kwargs), in its own process, so it
+    does not share the GIL with the client being measured, and wait until it
+    accepts connections.
+    """
+    port = free_port()
+    process = multiprocessing.Process(
+        target=target, args=(port,), kwargs=kwargs, daemon=True
+    )
+    process.start()
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("test server did not start")
+            time.sleep(0.05)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def fetch_sequential(urls: list[str]) -> list[float]:
+    latencies = []
+    with requests.Session() as session:
+        for url in urls:
+            start = time.perf_counter()
+            session.get(url).content
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def fetch_pooled(urls: list[str], concurrency: int) -> list[float]:
+    async with FetchClient(limit=concurrency, limit_per_host=concurrency) as client:
+        results = await client.fetch_all(urls, concurrency=concurrency)
+    failed = sum(not result.ok for result in results)
+    if failed:
+        click.secho(f"  {failed} requests failed", fg="red")
+    return [result.elapsed for result in results]
+
+
+def benchmark(sizes=(100, 1_000, 10_000), concurrency: int = 100, delay: float = 0.005):
+    """
+    Fetch 100/1k/10k URLs from the local server with sequential requests calls
+    and with the pooled aiohttp client, reporting throughput and p99 latency.
+    """
+    process, base = start_server(delay=delay)
+    try:
+        for count in sizes:
+            urls = [f"{base}/item/{n}" for n in range(count)]
+            click.secho(f"{count} URLs", bold=True)
+            for name, run in (
+                ("requests", lambda: fetch_sequential(urls)),
+                ("aiohttp", lambda: asyncio.run(fetch_pooled(urls, concurrency))),
+            ):
+                start = time.perf_counter()
+                latencies = run()
+                elapsed = time.perf_counter() - start
+                click.secho(
+                    f"  {name:<9} {count / elapsed:8.0f} req/s  "
+                    f"p99={percentile(latencies, 99) * 1000:.1f}ms",
+                    bold=True,
+                    bg="white",
+                    fg="blue",
+                )
+    finally:
+        process.terminate()
+        process.join()
+
+
+if __name__ == "__main__":
+    benchmark()
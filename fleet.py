@@ -0,0 +1,236 @@
+"""
+A fleet of CarFactory vehicles stored as columns instead of objects.
+
+af_car.py models each vehicle as its own Python object. That is fine for a
+handful of cars, but a simulation that moves millions of them every step spends
+its time on per-object attribute lookups and float boxing. Fleet keeps every
+vehicle in one NumPy structured array (kind, colour family, position, heading,
+speed, odometer, state), so a simulation step is a few vectorized array
+operations over all vehicles at once.
+
+The products stay the source of truth for what a vehicle is: a fleet is filled
+from CarFactory families, and fleet[i] returns a VehicleView that answers
+drive() like the product it was built from.
+
+    fleet = Fleet.from_factories({WhiteCarFactory(): (1_000, 500)})
+    fleet.step(dt=1.0)
+    fleet[0].drive()  # "Riding a white SUV"
+"""
+
+from __future__ import annotations
+
+import math
+import time
+
+import numpy as np
+
+from af_car import (
+    CarFactory,
+    DarkCarFactory,
+    DarkSedan,
+    DarkSUV,
+    WhiteCarFactory,
+    WhiteSedan,
+    WhiteSUV,
+)
+from flyweight import intern
+
+SUV, SEDAN = 0, 1
+WHITE, DARK = 0, 1
+PARKED, DRIVING = 0, 1
+
+# (kind, colour) of every product class, and back.
+PRODUCT_CODES = {
+    WhiteSUV: (SUV, WHITE),
+    WhiteSedan: (SEDAN, WHITE),
+    DarkSUV: (SUV, DARK),
+    DarkSedan: (SEDAN, DARK),
+}
+PRODUCT_CLASSES = {codes: cls for cls, codes in PRODUCT_CODES.items()}
+
+# Cruising speed per kind, in metres per second.
+CRUISING_SPEED = np.array([25.0, 30.0], dtype=np.float32)
+
+VEHICLE = np.dtype(
+    [
+        ("kind", np.uint8),
+        ("colour", np.uint8),
+        ("state", np.uint8),
+        ("x", np.float32),
+        ("y", np.float32),
+        ("heading", np.float32),
+        ("speed", np.float32),
+        ("odometer", np.float64),
+    ]
+)
+
+
+class VehicleView:
+    """
+    One vehicle of a fleet. It reads and writes the fleet's arrays, and
+    delegates product behaviour to the (stateless, interned) product.
+    """
+
+    __slots__ = ("fleet", "index")
+
+    def __init__(self, fleet: Fleet, index: int):
+        self.fleet = fleet
+        self.index = index
+
+    @property
+    def record(self) -> np.void:
+        return self.fleet.vehicles[self.index]
+
+    @property
+    def product(self):
+        record = self.record
+        return intern(PRODUCT_CLASSES[int(record["kind"]), int(record["colour"])])
+
+    def drive(self) -> str:
+        return self.product.drive()
+
+    @property
+    def position(self) -> tuple[float, float]:
+        record = self.record
+        return float(record["x"]), float(record["y"])
+
+    @property
+    def odometer(self) -> float:
+        return float(self.record["odometer"])
+
+    def __repr__(self) -> str:
+        return f"<{type(self.product).__name__} #{self.index} at {self.position}>"
+
+
+class Fleet:
+    def __init__(self, vehicles: np.ndarray):
+        self.vehicles = vehicles
+
+    @classmethod
+    def from_factories(
+        cls, families: dict[CarFactory, tuple[int, int]], seed: int = 0
+    ) -> Fleet:
+        """
+        Build a fleet from {factory: (suvs, sedans)}. Each factory is asked
+        for one product of each kind to learn what it makes; the vehicles
+        themselves are only rows in the array.
+        """
+        rng = np.random.default_rng(seed)
+        total = sum(suvs + sedans for suvs, sedans in families.values())
+        vehicles = np.zeros(total, dtype=VEHICLE)
+        start = 0
+        for factory, counts in families.items():
+            for create, count in zip(
+                (factory.create_suv, factory.create_sedan), counts
+            ):
+                kind, colour = PRODUCT_CODES[type(create())]
+                rows = vehicles[start : start + count]
+                rows["kind"] = kind
+                rows["colour"] = colour
+                start += count
+        vehicles["state"] = DRIVING
+        vehicles["x"] = rng.uniform(-1e4, 1e4, total)
+        vehicles["y"] = rng.uniform(-1e4, 1e4, total)
+        vehicles["heading"] = rng.uniform(0, 2 * np.pi, total)
+        vehicles["speed"] = CRUISING_SPEED[vehicles["kind"]]
+        return cls(vehicles)
+
+    def __len__(self) -> int:
+        return len(self.vehicles)
+
+    def __getitem__(self, index: int) -> VehicleView:
+        if not -len(self) <= index < len(self):
+            raise IndexError("vehicle index out of range")
+        return VehicleView(self, index % len(self))
+
+    def count(self, kind: int | None = None, colour: int | None = None) -> int:
+        mask = np.ones(len(self), dtype=bool)
+        if kind is not None:
+            mask &= self.vehicles["kind"] == kind
+        if colour is not None:
+            mask &= self.vehicles["colour"] == colour
+        return int(mask.sum())
+
+    def step(self, dt: float = 1.0):
+        """
+        Move every driving vehicle along its heading for `dt` seconds.
+        """
+        v = self.vehicles
+        distance = np.where(
+            v["state"] == DRIVING, v["speed"] * np.float32(dt), np.float32(0)
+        )
+        v["x"] += distance * np.cos(v["heading"])
+        v["y"] += distance * np.sin(v["heading"])
+        v["odometer"] += distance
+
+    def park(self, mask: np.ndarray):
+        self.vehicles["state"][mask] = PARKED
+
+
+class Vehicle:
+    """
+    The per-object representation the benchmark compares against.
+    """
+
+    __slots__ = ("product", "driving", "x", "y", "heading", "speed", "odometer")
+
+    def __init__(self, product, x, y, heading, speed):
+        self.product = product
+        self.driving = True
+        self.x, self.y, self.heading, self.speed = x, y, heading, speed
+        self.odometer = 0.0
+
+
+def step_objects(vehicles: list[Vehicle], dt: float, cos, sin):
+    for vehicle in vehicles:
+        if vehicle.driving:
+            distance = vehicle.speed * dt
+            vehicle.x += distance * cos(vehicle.heading)
+            vehicle.y += distance * sin(vehicle.heading)
+            vehicle.odometer += distance
+
+
+def benchmark(size: int = 5_000_000, steps: int = 5):
+    """
+    Step a `size` vehicle fleet `steps` times as Python objects and as
+    columns.
+    """
+    quarter = size // 4
+    families = {
+        WhiteCarFactory(): (quarter, quarter),
+        DarkCarFactory(): (quarter, size - 3 * quarter),
+    }
+    start = time.perf_counter()
+    fleet = Fleet.from_factories(families)
+    print(
+        f"built a {len(fleet)} vehicle fleet in {time.perf_counter() - start:.2f}s "
+        f"({fleet.vehicles.nbytes / 2 ** 20:.0f} MiB)"
+    )
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        fleet.step(1.0)
+    vectorized = (time.perf_counter() - start) / steps
+
+    v = fleet.vehicles
+    objects = [
+        Vehicle(intern(PRODUCT_CLASSES[kind, colour]), x, y, heading, speed)
+        for kind, colour, x, y, heading, speed in zip(
+            *(
+                v[field].tolist()
+                for field in ("kind", "colour", "x", "y", "heading", "speed")
+            )
+        )
+    ]
+    start = time.perf_counter()
+    for _ in range(steps):
+        step_objects(objects, 1.0, math.cos, math.sin)
+    per_object = (time.perf_counter() - start) / steps
+
+    print(f"per-object step {per_object:.3f}s")
+    print(f"vectorized step {vectorized:.3f}s ({per_object / vectorized:.0f}x faster)")
+    print(fleet[0], fleet[0].drive(), f"{fleet[0].odometer:.0f} m")
+
+
+if __name__ == "__main__":
+    benchmark()
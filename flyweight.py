@@ -0,0 +1,141 @@
+"""
+Flyweight: share one instance of an object instead of creating many identical
+ones.
+
+The products in this repo (Helmet, ConcreteProductA1, WhiteSUV, LightButton...)
+hold no state: every instance of a class behaves exactly the same. Building a
+new one on every factory call only costs an allocation and, later, garbage
+collection. Two changes cut that cost:
+- The product classes declare `__slots__ = ()`, so an instance has no
+  per-object __dict__ and shrinks to a bare object header.
+- flyweight(FactoryClass) returns a factory whose factory_method/create_*
+  methods hand out one interned product per class, built on first use.
+
+    factory = flyweight(LightThemeFactory)()
+    factory.create_button() is factory.create_button()  # True
+
+Interning is only safe for products without instance state, so products that
+do carry state (anything with a __dict__ or non-empty slots) are returned as
+built, never shared.
+"""
+
+from __future__ import annotations
+
+import functools
+import gc
+import sys
+import time
+import tracemalloc
+
+_interned: dict[tuple, object] = {}
+
+
+def intern(cls, *args):
+    """
+    The shared instance of cls(*args): built on the first call, reused after.
+    The arguments must be hashable.
+    """
+    key = (cls, args)
+    product = _interned.get(key)
+    if product is None:
+        product = _interned.setdefault(key, cls(*args))
+    return product
+
+
+def is_stateless(product) -> bool:
+    if getattr(product, "__dict__", None) is not None:
+        return False
+    return all(
+        not getattr(klass, "__slots__", ())
+        for klass in type(product).__mro__
+        if klass is not object
+    )
+
+
+def intern_product(product):
+    """
+    Swap a freshly built product for the interned instance of its class, if the
+    product is stateless.
+    """
+    if not is_stateless(product):
+        return product
+    return _interned.setdefault((type(product), ()), product)
+
+
+def _interning(method):
+    cache: dict[type, object] = {}
+
+    @functools.wraps(method)
+    def create(self):
+        product = cache.get(type(self))
+        if product is None:
+            product = intern_product(method(self))
+            if is_stateless(product):
+                cache[type(self)] = product
+        return product
+
+    return create
+
+
+@functools.lru_cache(maxsize=None)
+def flyweight(factory_class: type) -> type:
+    """
+    A subclass of a creator or abstract factory whose factory_method and
+    create_* methods return interned products.
+    """
+    namespace = {
+        name: _interning(getattr(factory_class, name))
+        for name in dir(factory_class)
+        if name == "factory_method" or name.startswith("create_")
+    }
+    return type(f"Flyweight{factory_class.__name__}", (factory_class,), namespace)
+
+
+def benchmark(count: int = 10_000_000, memory_count: int = 1_000_000):
+    """
+    Create and use `count` LightButtons three ways: a dict-based class laid out
+    like the products were before __slots__, the slotted product, and the
+    flyweight factory. Memory is traced over `memory_count` kept products.
+    """
+    from af_example import Button, LightButton, LightThemeFactory
+
+    class DictLightButton(Button):
+        # No __slots__ on this subclass, so instances get a __dict__ like
+        # every product did before.
+        def paint(self):
+            return "Rendering a light button"
+
+    class DictLightThemeFactory(LightThemeFactory):
+        def create_button(self):
+            return DictLightButton()
+
+    cases = (
+        ("dict products", DictLightThemeFactory()),
+        ("slotted products", LightThemeFactory()),
+        ("flyweight", flyweight(LightThemeFactory)()),
+    )
+    print(
+        f"LightButton: {sys.getsizeof(DictLightButton())} B with __dict__, "
+        f"{sys.getsizeof(LightButton())} B slotted"
+    )
+    for name, factory in cases:
+        create = factory.create_button
+        start = time.perf_counter()
+        for _ in range(count):
+            create().paint()
+        elapsed = time.perf_counter() - start
+
+        gc.collect()
+        tracemalloc.start()
+        kept = [create() for _ in range(memory_count)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        print(
+            f"{name:<17} {count / elapsed / 1e6:6.2f}M products/s  "
+            f"{size / memory_count:6.1f} B per kept product"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,338 @@
+"""
+An async inference service for the rice classifier that batches requests.
+
+The rice notebook calls model.predict() once, on the whole test set. A service
+gets one grain per request instead, and calling predict() once per request
+pays the model's fixed per-call cost (framework dispatch, input conversion,
+kernel launches) for a single row. MicroBatcher gathers the rows of concurrent
+requests into one predict() call:
+- a batch closes `max_wait` seconds after its first row arrives, or as soon as
+  it holds `max_batch` rows
+- predict() runs in the model's own thread, so the event loop keeps accepting
+  requests, and while one batch is being predicted the next one fills up. Under
+  load the batches grow by themselves.
+- every caller gets its own row's probability, and the class it thresholds to
+
+    GET  /predict?Area=15231&Perimeter=525.6&...
+    POST /predict  {"Area": 15231, "Perimeter": 525.6, ...}
+    ->   {"probability": 0.93, "class": "Cammeo"}
+
+The service is configured through the environment, so Hypercorn can import it:
+
+    INFERENCE_MODEL=rice.json INFERENCE_BATCHING=1 \\
+        hypercorn inference:app --bind 127.0.0.1:5002
+
+INFERENCE_MAX_BATCH and INFERENCE_MAX_WAIT_MS tune the batches. The model file
+is written by Classifier.save(); train_rice() trains one on synthetic data.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import click
+import numpy as np
+from quart import Quart, jsonify, request
+
+import datasets
+import loadtest
+from preprocessing import RICE_FEATURES, Dataset, ZScore, shuffle_split
+from sweep import ExperimentSettings, train
+
+
+class Classifier:
+    """
+    A trained single Dense unit with its z-score statistics. `overhead`
+    seconds are spent on every predict() call, to stand in for the fixed
+    per-call cost of a framework model.
+    """
+
+    def __init__(
+        self,
+        features: list[str],
+        weights: list[float],
+        bias: float,
+        scaler: ZScore,
+        threshold: float = 0.5,
+        classes: tuple[str, str] = ("Osmancik", "Cammeo"),
+        overhead: float = 0.0,
+    ):
+        self.features = list(features)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.float32(bias)
+        self.mean = np.array([scaler.mean[name] for name in features], dtype=np.float32)
+        self.std = np.array([scaler.std[name] for name in features], dtype=np.float32)
+        self.scaler = scaler
+        self.threshold = threshold
+        self.classes = tuple(classes)
+        self.overhead = overhead
+
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Probability of the positive class for each row of raw features.
+        """
+        if self.overhead:
+            time.sleep(self.overhead)
+        z = ((rows - self.mean) / self.std) @ self.weights + self.bias
+        return 1 / (1 + np.exp(-z))
+
+    def label(self, probability: float) -> str:
+        return self.classes[probability > self.threshold]
+
+    def row(self, values: dict) -> np.ndarray:
+        return np.array(
+            [float(values[name]) for name in self.features], dtype=np.float32
+        )
+
+    def save(self, path: str):
+        with open(path, "w") as file:
+            json.dump(
+                {
+                    "features": self.features,
+                    "weights": self.weights.tolist(),
+                    "bias": float(self.bias),
+                    "scaler": json.loads(self.scaler.to_json()),
+                    "threshold": self.threshold,
+                    "classes": list(self.classes),
+                },
+                file,
+            )
+
+    @classmethod
+    def load(cls, path: str, overhead: float = 0.0) -> Classifier:
+        with open(path) as file:
+            spec = json.load(file)
+        spec["scaler"] = ZScore(**spec["scaler"])
+        return cls(**spec, overhead=overhead)
+
+
+def train_rice(
+    rows: int = 20_000, epochs: int = 10, threshold: float = 0.35
+) -> Classifier:
+    """
+    Train a classifier on synthetic rice data, like the notebook's all
+    features experiment.
+    """
+    frame = datasets.rice_frame(rows, np.random.default_rng(0))
+    data = Dataset.from_frame(frame, RICE_FEATURES, "Class", positive="Cammeo")
+    train_split, _, _ = shuffle_split(data, seed=100)
+    scaler = ZScore().fit(train_split)
+    scaler.transform(data)
+    settings = ExperimentSettings(0.001, epochs, 100, RICE_FEATURES, threshold)
+    experiment = train(
+        settings, train_split.inputs(), train_split.labels, classifier=True
+    )
+    model = experiment.model
+    return Classifier(RICE_FEATURES, model.weights, model.bias, scaler, threshold)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], np.ndarray],
+        max_batch: int = 64,
+        max_wait: float = 0.002,
+    ):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        # One thread: the model handles one call at a time.
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="model")
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.batches = 0
+        self.rows = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+    async def submit(self, row: np.ndarray) -> float:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def _collect(self) -> list[tuple[np.ndarray, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            # Rows that are already waiting, e.g. queued during the previous
+            # predict(), join without waiting for the window.
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [item for item in await self._collect() if not item[1].done()]
+            if not batch:
+                continue
+            rows = np.stack([row for row, _ in batch])
+            try:
+                probabilities = await loop.run_in_executor(
+                    self.executor, self.predict, rows
+                )
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), probability in zip(batch, probabilities.tolist()):
+                if not future.done():
+                    future.set_result(probability)
+
+
+app = Quart("inference")
+
+
+@app.before_serving
+async def load_model():
+    model = Classifier.load(
+        os.environ["INFERENCE_MODEL"],
+        overhead=float(os.environ.get("INFERENCE_OVERHEAD_MS", 0)) / 1000,
+    )
+    app.config["model"] = model
+    if os.environ.get("INFERENCE_BATCHING", "1") == "1":
+        batcher = MicroBatcher(
+            model.predict,
+            max_batch=int(os.environ.get("INFERENCE_MAX_BATCH", 64)),
+            max_wait=float(os.environ.get("INFERENCE_MAX_WAIT_MS", 2)) / 1000,
+        )
+        batcher.start()
+        app.config["batcher"] = batcher
+    else:
+        app.config["executor"] = ThreadPoolExecutor(1, thread_name_prefix="model")
+
+
+@app.after_serving
+async def stop_batcher():
+    if "batcher" in app.config:
+        await app.config["batcher"].stop()
+    else:
+        app.config["executor"].shutdown(wait=True)
+
+
+@app.route("/predict", methods=["GET", "POST"])
+async def predict():
+    model: Classifier = app.config["model"]
+    values = await request.get_json() if request.method == "POST" else request.args
+    try:
+        row = model.row(values)
+    except (KeyError, TypeError, ValueError):
+        return (
+            jsonify(error=f"expected numeric features {', '.join(model.features)}"),
+            400,
+        )
+    if "batcher" in app.config:
+        probability = await app.config["batcher"].submit(row)
+    else:
+        loop = asyncio.get_running_loop()
+        probabilities = await loop.run_in_executor(
+            app.config["executor"], model.predict, row[None, :]
+        )
+        probability = float(probabilities[0])
+    return jsonify(probability=probability, **{"class": model.label(probability)})
+
+
+@app.route("/stats")
+async def stats():
+    batcher = app.config.get("batcher")
+    if batcher is None:
+        return jsonify(batching=False)
+    return jsonify(
+        batching=True,
+        batches=batcher.batches,
+        rows=batcher.rows,
+        mean_batch=batcher.rows / max(batcher.batches, 1),
+    )
+
+
+@click.command()
+@click.option(
+    "--concurrency", "levels", multiple=True, type=int, default=[1, 16, 64, 256]
+)
+@click.option(
+    "--overhead-ms",
+    "overheads",
+    multiple=True,
+    type=float,
+    default=[0.0, 2.0],
+    help="Simulated fixed cost per predict() call; repeat to compare several.",
+)
+@click.option("--duration", default=5.0, help="Seconds per concurrency level.")
+def main(levels, overheads, duration):
+    """
+    Load test the service with per-request and micro-batched predictions.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = os.path.join(directory, "rice.json")
+        train_rice().save(model_path)
+        row = datasets.rice_frame(1, np.random.default_rng(1)).iloc[0]
+        query = "&".join(f"{name}={row[name]}" for name in RICE_FEATURES)
+        for overhead in overheads:
+            for batching in ("0", "1"):
+                env = dict(
+                    os.environ,
+                    INFERENCE_MODEL=model_path,
+                    INFERENCE_BATCHING=batching,
+                    INFERENCE_OVERHEAD_MS=str(overhead),
+                )
+                process, base = loadtest.launch(
+                    lambda port: [
+                        sys.executable,
+                        "-m",
+                        "hypercorn",
+                        "inference:app",
+                        "--bind",
+                        f"127.0.0.1:{port}",
+                    ],
+                    "inference",
+                    env,
+                )
+                mode = "micro-batched" if batching == "1" else "per-request"
+                click.secho(f"{mode}, {overhead:g}ms per predict() call", bold=True)
+                try:
+                    for concurrency in levels:
+                        loadtest.run_level(
+                            process, f"{base}/predict?{query}", concurrency, duration
+                        )
+                    if batching == "1":
+                        with urllib.request.urlopen(f"{base}/stats") as response:
+                            stats = json.load(response)
+                        click.echo(
+                            f"  {stats['rows']} rows in "
+                            f"{stats['batches']} predict() calls, "
+                            f"{stats['mean_batch']:.1f} rows per call"
+                        )
+                finally:
+                    process.terminate()
+                    process.wait()
+
+
+if __name__ == "__main__":
+    main()
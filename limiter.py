@@ -0,0 +1,493 @@
+"""
+Concurrency limits that find their own value.
+
+BoundedRunner and FetchClient take a fixed cap on requests in flight, and any
+fixed value is wrong most of the time: below what the upstream can serve it
+leaves throughput on the table, above it the extra requests queue up in the
+upstream, inflating latency until they time out or are turned away, and the
+upstream's capacity changes under load anyway. The limiters here move the cap
+while they run:
+- AIMDLimiter grows the limit by one per round trip's worth of successful
+  requests and multiplies it by `backoff` when a request fails or takes longer
+  than `latency_threshold`, like TCP's congestion window.
+- GradientLimiter compares every request's latency with a long-term average.
+  While they agree the limit grows by a small queue allowance; when latency
+  rises the limit shrinks in proportion, before anything has failed.
+- FixedLimiter keeps its limit, for comparison.
+
+Every policy has `await policy.run(job)`, where `job` is a zero argument
+callable returning an awaitable, and compose() nests them, the first one
+outermost. A retry then goes through the rate and concurrency limits again:
+
+    policy = compose(Retry(attempts=3), TokenBucket(rate=200), GradientLimiter())
+    await asyncio.gather(
+        *(policy.run(lambda url=url: get(session, url)) for url in urls)
+    )
+
+The limiters treat timeouts and connection errors as overload signals, along
+with Overloaded: raise it for responses that mean "slow down", like 429 and
+503, so they count (and are retried) too. Other exceptions are the
+application's business and leave the limit alone; pass `errors` to change
+which ones count.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+import click
+from aiohttp import web
+
+from fetch import start_server
+from stats import percentile
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class Overloaded(Exception):
+    """
+    The upstream asked us to slow down, e.g. with a 429 or 503.
+    """
+
+
+# The exceptions the limiters take to mean the upstream is overloaded.
+OVERLOAD_ERRORS: tuple[type[BaseException], ...] = (
+    Overloaded,
+    asyncio.TimeoutError,
+    ConnectionError,
+    aiohttp.ClientConnectionError,
+)
+
+
+class Limiter:
+    """
+    Admits up to `limit` jobs at a time, first come first served, and passes
+    every finished job's latency and outcome to _update(). A job counts as
+    dropped when it raises one of `errors`.
+    """
+
+    def __init__(
+        self,
+        limit: float = 10,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        errors: tuple[type[BaseException], ...] = OVERLOAD_ERRORS,
+    ):
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.errors = errors
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Cancelled after release() handed us the slot: pass it on.
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def release(self, latency: float | None, dropped: bool):
+        """
+        Free a slot. `latency` is None for jobs that were cancelled, which say
+        nothing about the upstream.
+        """
+        self.in_flight -= 1
+        if latency is not None:
+            self._update(latency, dropped)
+            self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _update(self, latency: float, dropped: bool):
+        pass
+
+    async def run(self, job: Job) -> Any:
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            result = await job()
+        except self.errors:
+            self.release(time.perf_counter() - start, dropped=True)
+            raise
+        except Exception:
+            # The upstream answered; the error is the application's.
+            self.release(time.perf_counter() - start, dropped=False)
+            raise
+        except BaseException:
+            self.release(None, dropped=True)
+            raise
+        self.release(time.perf_counter() - start, dropped=False)
+        return result
+
+
+class FixedLimiter(Limiter):
+    pass
+
+
+class AIMDLimiter(Limiter):
+    def __init__(
+        self,
+        limit: float = 10,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        backoff: float = 0.9,
+        latency_threshold: float | None = None,
+        errors: tuple[type[BaseException], ...] = OVERLOAD_ERRORS,
+    ):
+        super().__init__(limit, min_limit, max_limit, errors)
+        self.backoff = backoff
+        self.latency_threshold = latency_threshold
+
+    def _update(self, latency: float, dropped: bool):
+        if dropped or (
+            self.latency_threshold is not None and latency > self.latency_threshold
+        ):
+            self.limit *= self.backoff
+        elif self.in_flight + 1 >= self.limit / 2:
+            # Only grow while the limit is actually in use: a limit nobody
+            # reaches says nothing about what the upstream can take.
+            self.limit += 1 / self.limit
+
+
+class GradientLimiter(Limiter):
+    """
+    After Netflix's Gradient2. Once per window of `limit` requests, about one
+    round trip, the window's average latency (short) is compared with a slow
+    moving average of the windows before it (long), and the limit moves
+    towards limit * gradient + sqrt(limit), where the gradient is
+    tolerance * long / short clamped to [0.5, 1]. The sqrt(limit) term keeps
+    probing for more capacity while latency is flat.
+    """
+
+    def __init__(
+        self,
+        limit: float = 10,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        smoothing: float = 0.2,
+        windows: int = 600,
+        tolerance: float = 1.5,
+        errors: tuple[type[BaseException], ...] = OVERLOAD_ERRORS,
+    ):
+        super().__init__(limit, min_limit, max_limit, errors)
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self._alpha = 2 / (windows + 1)
+        self.long_latency: float | None = None
+        self._count = 0
+        self._total = 0.0
+        self._dropped = False
+
+    def _update(self, latency: float, dropped: bool):
+        self._count += 1
+        self._total += latency
+        self._dropped |= dropped
+        if self._count < self.limit:
+            return
+        short = self._total / self._count
+        dropped = self._dropped
+        self._count, self._total, self._dropped = 0, 0.0, False
+        if self.long_latency is None:
+            self.long_latency = short
+        else:
+            self.long_latency += self._alpha * (short - self.long_latency)
+            if self.long_latency > 2 * short:
+                # The upstream got much faster: forget the old level sooner.
+                self.long_latency *= 0.95
+        if dropped:
+            gradient = 0.5
+        else:
+            gradient = max(0.5, min(1.0, self.tolerance * self.long_latency / short))
+        if gradient == 1.0 and self.in_flight + 1 < self.limit / 2:
+            # Only grow while the limit is actually in use.
+            return
+        target = self.limit * gradient + math.sqrt(self.limit)
+        self.limit += self.smoothing * (target - self.limit)
+
+
+class TokenBucket:
+    """
+    At most `rate` jobs per second on average and `burst` at once. Jobs that
+    find the bucket empty reserve the next token and sleep until it is due,
+    so waiters go in order and nobody polls.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate / 10)
+        self.tokens = self.burst
+        self._updated: float | None = None
+
+    async def acquire(self):
+        now = time.monotonic()
+        if self._updated is not None:
+            self.tokens = min(
+                self.burst, self.tokens + (now - self._updated) * self.rate
+            )
+        self._updated = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            try:
+                await asyncio.sleep(-self.tokens / self.rate)
+            except asyncio.CancelledError:
+                # Give the reserved token back for the next job to use.
+                self.tokens += 1
+                raise
+
+    async def run(self, job: Job) -> Any:
+        await self.acquire()
+        return await job()
+
+
+class Retry:
+    """
+    Run a job up to `attempts` times while it raises one of `retry_on`,
+    sleeping a random time between 0 and base * 2**attempt (at most `cap`)
+    in between: "full jitter", so clients that failed together do not come
+    back together.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base: float = 0.05,
+        cap: float = 2.0,
+        retry_on: tuple[type[BaseException], ...] = (
+            Overloaded,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+        ),
+        seed: int | None = None,
+    ):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.retry_on = retry_on
+        self._random = random.Random(seed)
+        self.retries = 0
+
+    async def run(self, job: Job) -> Any:
+        for attempt in range(self.attempts):
+            try:
+                return await job()
+            except self.retry_on:
+                if attempt == self.attempts - 1:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(
+                    self._random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+                )
+
+
+class Chain:
+    def __init__(self, *policies):
+        self.policies = policies
+
+    async def run(self, job: Job) -> Any:
+        for policy in reversed(self.policies):
+            job = functools.partial(policy.run, job)
+        return await job()
+
+
+def compose(*policies) -> Chain:
+    """
+    One policy out of several: compose(a, b).run(job) is
+    a.run(lambda: b.run(job)).
+    """
+    return Chain(*policies)
+
+
+def make_app(
+    schedule: list[tuple[float, int]], service_time: float = 0.1, max_queue: int = 20
+) -> web.Application:
+    """
+    An upstream whose capacity changes over time: /item serves `capacity`
+    requests at a time, each taking about `service_time` seconds, with
+    `capacity` following `schedule`, (seconds since the first request,
+    capacity) pairs. Up to `max_queue` more requests wait for a slot; beyond
+    that the answer is 503 straight away.
+    """
+    waiting: deque[asyncio.Future] = deque()
+    state = {"start": None, "busy": 0}
+    rng = random.Random(0)
+
+    def capacity() -> int:
+        elapsed = time.monotonic() - state["start"]
+        return [value for at, value in schedule if at <= elapsed][-1]
+
+    def hand_over():
+        while waiting and state["busy"] < capacity():
+            waiter = waiting.popleft()
+            if not waiter.done():
+                state["busy"] += 1
+                waiter.set_result(None)
+
+    async def item(request: web.Request) -> web.Response:
+        if state["start"] is None:
+            state["start"] = time.monotonic()
+        if state["busy"] < capacity() and not waiting:
+            state["busy"] += 1
+        elif len(waiting) >= max_queue:
+            return web.Response(status=503)
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            waiting.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    state["busy"] -= 1
+                    hand_over()
+                raise
+        try:
+            await asyncio.sleep(service_time * rng.uniform(0.8, 1.2))
+        finally:
+            state["busy"] -= 1
+            hand_over()
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/item", item)
+    return app
+
+
+def serve(port: int, **kwargs):
+    web.run_app(make_app(**kwargs), host="127.0.0.1", port=port, print=None)
+
+
+async def drive(
+    url: str, policy, limiter: Limiter, duration: float, workers: int = 300
+) -> dict:
+    """
+    `workers` loops sending requests through `policy` for `duration` seconds.
+    Returns the latencies of the successful requests, the number of requests
+    that failed for good, the limit every 0.5s and the time it all took.
+    """
+    latencies: list[float] = []
+    failures = 0
+    limits: list[float] = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=5)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+        async def request():
+            start = time.perf_counter()
+            async with session.get(url) as response:
+                await response.read()
+                if response.status in (429, 503):
+                    raise Overloaded(response.status)
+            latencies.append(time.perf_counter() - start)
+
+        async def worker():
+            nonlocal failures
+            while loop.time() < deadline:
+                try:
+                    await policy.run(request)
+                except (Overloaded, aiohttp.ClientError, asyncio.TimeoutError):
+                    failures += 1
+
+        async def sample():
+            while True:
+                limits.append(limiter.limit)
+                await asyncio.sleep(0.5)
+
+        start = loop.time()
+        sampler = asyncio.ensure_future(sample())
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        sampler.cancel()
+        elapsed = loop.time() - start
+    return {
+        "latencies": latencies,
+        "failures": failures,
+        "limits": limits,
+        "elapsed": elapsed,
+    }
+
+
+def benchmark(
+    schedule=((0, 20), (10, 5), (20, 40)),
+    service_time: float = 0.1,
+    fixed=(5, 40),
+):
+    """
+    Drive the changing-capacity server through fixed and adaptive limits, with
+    three jittered attempts per request, and report throughput, p99 latency,
+    failed requests and the average limit during each capacity phase.
+    """
+    duration = schedule[-1][0] + 10
+    limiters = {
+        f"fixed {limit}": lambda limit=limit: FixedLimiter(limit) for limit in fixed
+    }
+    limiters["aimd"] = lambda: AIMDLimiter(latency_threshold=2 * service_time)
+    limiters["gradient"] = lambda: GradientLimiter()
+    phases = ", ".join(f"{capacity} from {at}s" for at, capacity in schedule)
+    click.secho(
+        f"upstream capacity {phases}; {service_time * 1000:.0f}ms per request, "
+        f"{duration}s per run",
+        bold=True,
+    )
+    for name, make in limiters.items():
+        process, base = start_server(
+            serve, schedule=list(schedule), service_time=service_time
+        )
+        try:
+            limiter = make()
+            retry = Retry(seed=0)
+            result = asyncio.run(
+                drive(f"{base}/item", compose(retry, limiter), limiter, duration)
+            )
+        finally:
+            process.terminate()
+            process.join()
+        latencies = result["latencies"]
+        limits = result["limits"]
+        bounds = [int(at * 2) for at, _ in schedule] + [len(limits)]
+        averages = " / ".join(
+            f"{sum(limits[a:b]) / max(b - a, 1):.0f}"
+            for a, b in zip(bounds, bounds[1:])
+        )
+        click.secho(
+            f"  {name:<10} {len(latencies) / result['elapsed']:6.1f} req/s  "
+            f"p50={percentile(latencies, 50) * 1000:6.1f}ms "
+            f"p99={percentile(latencies, 99) * 1000:6.1f}ms  "
+            f"{result['failures']:5d} failed, {retry.retries:5d} retries  "
+            f"limit {averages}",
+            bold=True,
+            bg="white",
+            fg="blue",
+        )
+    capacity = sum(
+        value / service_time * (end - at)
+        for (at, value), end in zip(
+            schedule, [at for at, _ in schedule[1:]] + [duration]
+        )
+    )
+    click.echo(f"  the upstream's capacity averages {capacity / duration:.1f} req/s")
+
+
+if __name__ == "__main__":
+    benchmark()
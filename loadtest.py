@@ -0,0 +1,185 @@
+"""
+Load generator for service.py. It starts a server in a subprocess, then drives
+it with an aiohttp client at increasing concurrency: each level keeps exactly
+`concurrency` requests in flight for `duration` seconds and reports
+requests/sec, latency percentiles and the resident memory of the server (all of
+its worker processes together).
+
+    python loadtest.py --framework flask --framework quart --workers 1 --workers 4
+
+Memory is read from /proc, so this part of the report is Linux only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Callable
+
+import aiohttp
+import click
+
+from fetch import free_port
+from stats import percentile
+
+
+def server_command(framework: str, port: int, workers: int) -> list[str]:
+    if framework == "flask":
+        return [sys.executable, "service.py", "flask", "--port", str(port)]
+    return [
+        sys.executable,
+        "-m",
+        "hypercorn",
+        "service:quart_app",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--workers",
+        str(workers),
+    ]
+
+
+def start_server(framework: str, workers: int) -> tuple[subprocess.Popen, str]:
+    return launch(lambda port: server_command(framework, port, workers), framework)
+
+
+def launch(
+    command: Callable[[int], list[str]], name: str, env: dict | None = None
+) -> tuple[subprocess.Popen, str]:
+    """
+    Start command(port) on a free port and wait until it accepts connections.
+    """
+    port = free_port()
+    process = subprocess.Popen(
+        command(port),
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 20
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError(f"{name} server did not start")
+            time.sleep(0.1)
+
+
+def tree_rss(pid: int) -> int:
+    """
+    Resident memory in bytes of `pid` and all of its descendants.
+    """
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pending.extend(int(child) for child in children.read().split())
+        except FileNotFoundError:
+            continue
+    return total
+
+
+async def drive(url: str, concurrency: int, duration: float) -> tuple[list[float], int]:
+    """
+    Keep `concurrency` requests in flight for `duration` seconds. Returns the
+    latencies of the successful requests and the number of failures.
+    """
+    latencies: list[float] = []
+    failures = 0
+    deadline = time.monotonic() + duration
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+        async def user():
+            nonlocal failures
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    async with session.get(url) as response:
+                        await response.read()
+                        if response.status != 200:
+                            failures += 1
+                            continue
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    failures += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies, failures
+
+
+def run_level(process: subprocess.Popen, url: str, concurrency: int, duration: float):
+    start = time.perf_counter()
+    latencies, failures = asyncio.run(drive(url, concurrency, duration))
+    elapsed = time.perf_counter() - start
+    rss = tree_rss(process.pid)
+    click.secho(
+        f"  c={concurrency:<5} {len(latencies) / elapsed:8.0f} req/s  "
+        f"p50={percentile(latencies, 50) * 1000:7.1f}ms "
+        f"p95={percentile(latencies, 95) * 1000:7.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:7.1f}ms  "
+        f"rss={rss / 2 ** 20:6.1f}MB" + (f"  failures={failures}" if failures else ""),
+        fg="red" if failures else None,
+    )
+
+
+@click.command()
+@click.option(
+    "--framework",
+    "frameworks",
+    multiple=True,
+    type=click.Choice(["flask", "quart"]),
+    default=["flask", "quart"],
+)
+@click.option(
+    "--workers",
+    "worker_counts",
+    multiple=True,
+    type=int,
+    default=[1],
+    help="Hypercorn worker processes; repeat to compare several.",
+)
+@click.option(
+    "--concurrency",
+    "levels",
+    multiple=True,
+    type=int,
+    default=[1, 10, 50, 100, 250, 500],
+)
+@click.option("--path", default="/fanout?ms=20&n=3")
+@click.option("--duration", default=5.0, help="Seconds per concurrency level.")
+def main(frameworks, worker_counts, levels, path, duration):
+    """
+    Load test the service at increasing concurrency.
+    """
+    for framework in frameworks:
+        # The Flask server is one process with a thread per request; workers
+        # only apply to Hypercorn.
+        for workers in worker_counts if framework == "quart" else [1]:
+            process, base = start_server(framework, workers)
+            click.secho(f"{framework} ({workers} workers) {path}", bold=True)
+            try:
+                for concurrency in levels:
+                    run_level(process, base + path, concurrency, duration)
+            finally:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+A blocked event loop is the failure mode async code is most prone to: one
+callback doing CPU work or a blocking call stalls every other task, and a single
+wall-clock delta around asyncio.run() cannot show it.
+
+LoopMonitor measures it from two sides:
+- A heartbeat task sleeps for `interval` and records how late it woke up. That
+  lateness is the loop lag, and it goes into a histogram for p50/p99.
+- A watchdog thread watches the heartbeat. If the loop has not come back for
+  longer than `threshold` it grabs the stack of the loop thread and, on a best
+  effort basis, the name of the task that is currently running, so the report
+  shows who blocked the loop.
+
+Neither side touches individual callbacks, which is what keeps it cheap enough
+to leave on under load (asyncio's own debug mode wraps every callback instead).
+
+    async with LoopMonitor():
+        await main()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+
+import click
+
+
+class LagHistogram:
+    """
+    Log-bucketed histogram: each bucket is `growth` times wider than the last,
+    so recording is O(1) and percentiles are accurate to within that factor.
+    """
+
+    def __init__(self, smallest: float = 1e-5, growth: float = 1.1):
+        self.smallest = smallest
+        self.log_growth = math.log(growth)
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, value: float):
+        if value <= self.smallest:
+            bucket = 0
+        else:
+            bucket = int(math.log(value / self.smallest) / self.log_growth) + 1
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                upper = self.smallest * math.exp(bucket * self.log_growth)
+                return min(upper, self.max)
+        return self.max
+
+
+@dataclass
+class SlowCallback:
+    task: str
+    duration: float
+    stack: str
+
+
+def running_task(loop: asyncio.AbstractEventLoop) -> str:
+    """
+    Name of the task `loop` is running, for reports made from another thread.
+    Best effort: asyncio.current_task() only works on the loop's own thread,
+    so this reads asyncio's private table of current tasks without a lock. On
+    versions without that table every stall is reported as "<callback>".
+    """
+    current = getattr(asyncio.tasks, "_current_tasks", {})
+    try:
+        task = current.get(loop)
+        if task is None:
+            return "<callback>"
+        return f"{task.get_name()} ({task.get_coro().__qualname__})"
+    except Exception:
+        # The task finished while we were looking at it.
+        return "<callback>"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = LagHistogram()
+        self.slow_callbacks: list[SlowCallback] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._last_beat = 0.0
+        self._heartbeat: asyncio.Task | None = None
+        self._stopped = threading.Event()
+        self._watchdog: threading.Thread | None = None
+        self._current: SlowCallback | None = None
+
+    async def __aenter__(self) -> LoopMonitor:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+        self.report()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopped.set()
+        # Account for a heartbeat that is overdue because the loop is still
+        # catching up with a stall.
+        overdue = time.monotonic() - self._last_beat - self.interval
+        if overdue > 0:
+            self.lag.record(overdue)
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join()
+        if self._current is not None:
+            # Stopped right after a stall, before the heartbeat got to run.
+            self._current.duration = time.monotonic() - self._last_beat
+            self._current = None
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lag.record(max(0.0, now - expected))
+            self._last_beat = now
+            if self._current is not None:
+                # The stall is over: now we know how long it really was.
+                self._current.duration = now - expected + self.interval
+                self._current = None
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat
+            if stalled < self.threshold + self.interval or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            self._current = SlowCallback(running_task(self._loop), stalled, stack)
+            self.slow_callbacks.append(self._current)
+
+    def report(self):
+        click.secho(
+            f"loop lag over {self.lag.count} samples: "
+            f"p50={self.lag.percentile(50) * 1000:.2f}ms "
+            f"p99={self.lag.percentile(99) * 1000:.2f}ms "
+            f"max={self.lag.max * 1000:.2f}ms",
+            bold=True,
+            bg="white",
+            fg="blue",
+        )
+        for slow in self.slow_callbacks:
+            click.secho(
+                f"loop blocked for {slow.duration * 1000:.1f}ms by {slow.task}",
+                fg="red",
+            )
+            click.echo(slow.stack)
+
+
+async def monitored(coro, **kwargs):
+    """
+    Run `coro` under a LoopMonitor and print the summary when it finishes:
+    asyncio.run(monitored(main())).
+    """
+    async with LoopMonitor(**kwargs):
+        return await coro
+
+
+async def busy_workload(tasks: int = 2_000, rounds: int = 50):
+    async def worker():
+        for _ in range(rounds):
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(worker() for _ in range(tasks)))
+
+
+def benchmark(repeat: int = 5):
+    """
+    Time a workload of many short tasks with and without the monitor, and show
+    that a blocking call is reported with the offending coroutine.
+    """
+
+    def best_of(make):
+        best = math.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            asyncio.run(make())
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    async def with_monitor():
+        monitor = LoopMonitor(interval=0.01)
+        monitor.start()
+        await busy_workload()
+        await monitor.stop()
+
+    plain = best_of(busy_workload)
+    watched = best_of(with_monitor)
+    click.secho(
+        f"without monitor {plain:.3f}s, with monitor {watched:.3f}s "
+        f"({(watched / plain - 1) * 100:+.1f}% overhead)",
+        bold=True,
+    )
+
+    async def blocking():
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)
+
+    asyncio.run(monitored(blocking(), interval=0.01, threshold=0.1))
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -16,6 +16,10 @@ import asyncio
 from datetime import datetime
 import click
 
+from loop_monitor import monitored
+from runner import BoundedRunner
+from tracing import traced
+
 
 # async function can be chained
 # async def my_function():
@@ -40,10 +44,12 @@ import click
 """
 
 
+@traced
 async def sleep_for_five():
     await asyncio.sleep(5)
 
 
+@traced
 async def sleep_for_three_then_five():
     await asyncio.sleep(3)
     await sleep_for_five()
@@ -51,9 +57,18 @@ async def sleep_for_three_then_five():
 
 async def main():
     # asyncio.gather is used to run multiple coroutines at once
-    await asyncio.gather(sleep_for_three_then_five(), sleep_for_five())
-
-
-start = datetime.now()
-asyncio.run(main())
-click.secho(f"{datetime.now() - start}", bold=True, bg="white", fg="blue")
+    # await asyncio.gather(sleep_for_three_then_five(), sleep_for_five())
+    # BoundedRunner does the same but caps how many run at once, cancels the
+    # rest if one fails and reports each coroutine's own timing
+    runner = BoundedRunner(limit=2)
+    jobs = [sleep_for_three_then_five, sleep_for_five]
+    for result in await runner.run(jobs):
+        click.secho(f"{jobs[result.index].__name__}: {result.elapsed:.3f}s", fg="green")
+
+
+if __name__ == "__main__":
+    start = datetime.now()
+    # monitored() samples event loop lag alongside main() and reports any
+    # coroutine that blocked the loop once main() returns
+    asyncio.run(monitored(main()))
+    click.secho(f"{datetime.now() - start}", bold=True, bg="white", fg="blue")
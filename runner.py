@@ -0,0 +1,166 @@
+"""
+asyncio.gather() schedules every coroutine it is given at once. That is fine for
+the two coroutines in practice.py, but with tens of thousands of them every task
+(and every socket or buffer it opens) is alive at the same time, and when one of
+them fails the others keep running in the background.
+
+BoundedRunner keeps at most `limit` tasks in flight, pulling new work from the
+(possibly lazy) iterable only when a slot frees up. Results are streamed back in
+completion order together with their timings, and the first failure cancels the
+whole group before the exception is re-raised.
+
+    runner = BoundedRunner(limit=100)
+    async for result in runner.stream(fetch(url) for url in urls):
+        print(result.index, result.value, result.elapsed)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Collection, Iterable, Union
+
+import click
+
+Job = Union[Awaitable[Any], Callable[[], Awaitable[Any]]]
+
+
+@dataclass
+class TaskResult:
+    """
+    The outcome of one job: its position in the input, its return value and
+    when it started and finished (time.perf_counter() seconds).
+    """
+
+    index: int
+    value: Any
+    started: float
+    finished: float
+
+    @property
+    def elapsed(self) -> float:
+        return self.finished - self.started
+
+
+class BoundedRunner:
+    def __init__(self, limit: int = 100):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+
+    async def stream(self, jobs: Iterable[Job]) -> AsyncIterator[TaskResult]:
+        """
+        Run the jobs with at most `limit` of them in flight and yield their
+        results as they complete. A job is either an awaitable or a zero
+        argument callable returning one, so callers can defer creating the
+        coroutine until there is room for it.
+        """
+        source = enumerate(jobs)
+        pending: set[asyncio.Task] = set()
+        try:
+            while True:
+                for index, job in source:
+                    pending.add(asyncio.ensure_future(self._timed(index, job)))
+                    if len(pending) >= self.limit:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Surface a failure before handing out any sibling results, so
+                # the group is cancelled as early as possible. Fetching every
+                # exception marks them all as retrieved, not just the first.
+                errors = [
+                    task.exception()
+                    for task in done
+                    if not task.cancelled() and task.exception() is not None
+                ]
+                if errors:
+                    raise errors[0]
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            # Coroutines that were created but never scheduled would otherwise
+            # warn about never being awaited. Only a collection is known to end:
+            # a generator may not, so it is closed instead of drained.
+            if isinstance(jobs, Collection):
+                for _, job in source:
+                    if inspect.iscoroutine(job):
+                        job.close()
+            else:
+                close = getattr(jobs, "close", None)
+                if close is not None:
+                    close()
+
+    async def run(self, jobs: Iterable[Job]) -> list[TaskResult]:
+        """
+        Like asyncio.gather(): wait for every job and return the results in
+        input order.
+        """
+        results = []
+        async with aclosing(self.stream(jobs)) as stream:
+            async for result in stream:
+                results.append(result)
+        results.sort(key=lambda result: result.index)
+        return results
+
+    @staticmethod
+    async def _timed(index: int, job: Job) -> TaskResult:
+        started = time.perf_counter()
+        value = await (job() if callable(job) else job)
+        return TaskResult(index, value, started, time.perf_counter())
+
+
+async def tiny_job():
+    await asyncio.sleep(0.001)
+
+
+async def run_sequential(count: int):
+    for _ in range(count):
+        await tiny_job()
+
+
+async def run_gather(count: int):
+    await asyncio.gather(*(tiny_job() for _ in range(count)))
+
+
+async def run_bounded(count: int, limit: int = 1000):
+    await BoundedRunner(limit).run(tiny_job for _ in range(count))
+
+
+def benchmark(sizes=(10, 1_000, 100_000), sequential_max: int = 1_000):
+    """
+    Compare sequential awaiting, an unbounded gather and the bounded runner on
+    1ms sleeps. The sequential run is skipped above `sequential_max` jobs since
+    it would take count * 1ms.
+    """
+    for count in sizes:
+        click.secho(f"{count} tasks", bold=True)
+        for name, strategy in (
+            ("sequential", run_sequential),
+            ("gather", run_gather),
+            ("bounded", run_bounded),
+        ):
+            if name == "sequential" and count > sequential_max:
+                click.secho(f"  {name:<10} skipped", fg="yellow")
+                continue
+            start = time.perf_counter()
+            asyncio.run(strategy(count))
+            click.secho(
+                f"  {name:<10} {time.perf_counter() - start:.3f}s",
+                bold=True,
+                bg="white",
+                fg="blue",
+            )
+
+
+if __name__ == "__main__":
+    benchmark()
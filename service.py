@@ -0,0 +1,108 @@
+"""
+The same small I/O bound service written twice, to compare the two models:
+
+- flask_app is synchronous. Each request holds a thread while it waits, so the
+  number of requests in flight is capped by the number of threads.
+- quart_app is the async twin, served by Hypercorn. A request that is waiting
+  only holds a suspended coroutine, so one worker process can keep thousands in
+  flight.
+
+Endpoints (the waits stand in for database queries and upstream calls):
+    /health              answer straight away
+    /query?ms=20         one simulated query taking `ms` milliseconds
+    /fanout?ms=20&n=3    `n` simulated queries: one after another in Flask,
+                         concurrently in Quart
+
+`ms` and `n` must be non-negative integers; anything else is a 400.
+
+    python service.py flask --port 5000
+    hypercorn service:quart_app --bind 127.0.0.1:5001 --workers 4
+"""
+
+import asyncio
+import time
+
+import click
+from flask import Flask, jsonify, request
+from quart import Quart
+from quart import jsonify as quart_jsonify
+from quart import request as quart_request
+from werkzeug.exceptions import BadRequest
+
+flask_app = Flask("sync_service")
+quart_app = Quart("async_service")
+
+
+def query_args(args) -> tuple[float, int]:
+    try:
+        ms, count = int(args.get("ms", 20)), int(args.get("n", 3))
+    except ValueError:
+        ms = count = -1
+    if ms < 0 or count < 0:
+        raise BadRequest("ms and n must be non-negative integers")
+    return ms / 1000, count
+
+
+@flask_app.route("/health")
+def flask_health():
+    return jsonify(status="ok")
+
+
+@flask_app.route("/query")
+def flask_query():
+    delay, _ = query_args(request.args)
+    time.sleep(delay)
+    return jsonify(rows=1, waited=delay)
+
+
+@flask_app.route("/fanout")
+def flask_fanout():
+    delay, count = query_args(request.args)
+    for _ in range(count):
+        time.sleep(delay)
+    return jsonify(rows=count, waited=delay * count)
+
+
+@quart_app.route("/health")
+async def quart_health():
+    return quart_jsonify(status="ok")
+
+
+@quart_app.route("/query")
+async def quart_query():
+    delay, _ = query_args(quart_request.args)
+    await asyncio.sleep(delay)
+    return quart_jsonify(rows=1, waited=delay)
+
+
+@quart_app.route("/fanout")
+async def quart_fanout():
+    delay, count = query_args(quart_request.args)
+    await asyncio.gather(*(asyncio.sleep(delay) for _ in range(count)))
+    return quart_jsonify(rows=count, waited=delay)
+
+
+@click.command()
+@click.argument("framework", type=click.Choice(["flask", "quart"]))
+@click.option("--port", default=5000)
+@click.option("--threads/--no-threads", default=True, help="Threaded Flask server.")
+def main(framework, port, threads):
+    """
+    Serve one of the apps on 127.0.0.1 in a single process. Use the hypercorn
+    command line for several Quart workers.
+    """
+    if framework == "flask":
+        from werkzeug.serving import run_simple
+
+        run_simple("127.0.0.1", port, flask_app, threaded=threads)
+    else:
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        config = Config()
+        config.bind = [f"127.0.0.1:{port}"]
+        asyncio.run(serve(quart_app, config))
+
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,21 @@
 	+ The singleton object is initialized only when it's requested for the first time.
 	- The pattern requires special treatment in a multithreaded environment so that multiple threads won't create a singleton object several times.
 	- It may be difficult to unit test the client code of the Singleton because many test frameworks rely on inheritance when producing mock objects. Since the constructor of the singleton class is private and overriding static methods is impossible in most languages, you will need to think of a creative way to mock the singleton. Or just don't write the test, Or don't use the Singleton pattern
+
+	Thread safety
+
+	Singleton below checks `cls._instance is None` without a lock: two threads can both see None and both create an instance. ThreadSafeSingleton takes a lock around the check (double-checked locking), but only while the instance does not exist yet, so later accesses cost a dictionary lookup. Creation never awaits, so asyncio tasks cannot interleave inside it either.
+
+	A multiton is the keyed variant: one instance per key (per config, per host...). Multiton keeps them in a WeakValueDictionary, so an instance nobody holds any more is evicted instead of being cached forever.
 """
+import asyncio
+import threading
+import time
+import timeit
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+
 class Singleton:
 	_instance = None
 	
@@ -39,6 +53,64 @@ class Singleton:
 			cls._instance = super().__new__(cls)
 		return cls._instance
 
+class SingletonMeta(type):
+	"""
+	Creates each class's instance at most once. Doing it in the metaclass's __call__ rather than __new__ also keeps __init__ from running again on every call, which matters when __init__ builds a connection pool.
+	"""
+
+	def __init__(cls, name, bases, namespace):
+		super().__init__(name, bases, namespace)
+		cls._instance = None
+		cls._instance_lock = threading.Lock()
+
+	def __call__(cls, *args, **kwargs):
+		# Fast path: once the instance exists no lock is taken.
+		instance = cls._instance
+		if instance is None:
+			with cls._instance_lock:
+				# Another thread may have created it while we waited.
+				instance = cls._instance
+				if instance is None:
+					instance = super().__call__(*args, **kwargs)
+					cls._instance = instance
+		return instance
+
+
+class ThreadSafeSingleton(metaclass=SingletonMeta):
+	pass
+
+
+class MultitonMeta(type):
+	"""
+	One instance per key, built from the constructor arguments. Instances are held weakly: once no one references an instance its key is evicted and the next call builds a fresh one.
+	"""
+
+	def __init__(cls, name, bases, namespace):
+		super().__init__(name, bases, namespace)
+		cls._instances = weakref.WeakValueDictionary()
+		cls._instances_lock = threading.Lock()
+
+	def __call__(cls, *args, **kwargs):
+		key = cls.instance_key(*args, **kwargs)
+		instance = cls._instances.get(key)
+		if instance is None:
+			with cls._instances_lock:
+				instance = cls._instances.get(key)
+				if instance is None:
+					instance = super().__call__(*args, **kwargs)
+					cls._instances[key] = instance
+		return instance
+
+
+class Multiton(metaclass=MultitonMeta):
+	@classmethod
+	def instance_key(cls, *args, **kwargs):
+		"""
+		Override to key instances on part of the configuration only.
+		"""
+		return args, tuple(sorted(kwargs.items()))
+
+
 class Example:
 	def __new__(cls, *args, **kwargs):
 		print("Inside __new__")
@@ -66,5 +138,65 @@ def main():
 	c = Child()
 	c.greet()
 
+class ConnectionPool(ThreadSafeSingleton):
+	created = 0
+
+	def __init__(self):
+		# Slow on purpose, to widen the window in which a race could happen.
+		time.sleep(0.01)
+		ConnectionPool.created += 1
+
+
+class HostPool(Multiton):
+	created = 0
+
+	def __init__(self, host, port=6379):
+		time.sleep(0.01)
+		self.address = (host, port)
+		HostPool.created += 1
+
+
+def benchmark(threads=32, tasks=1000, calls=1_000_000):
+	"""
+	Create the singleton and multiton from many threads and asyncio tasks at once and check each was built exactly once, then measure the cost of accessing an existing instance.
+	"""
+	barrier = threading.Barrier(threads)
+
+	def contend():
+		barrier.wait()
+		return ConnectionPool(), HostPool("cache", port=6379)
+
+	with ThreadPoolExecutor(threads) as executor:
+		results = list(executor.map(lambda _: contend(), range(threads)))
+	print(f"{threads} threads: ConnectionPool built {ConnectionPool.created}x, HostPool built {HostPool.created}x, one object each: {len({id(r[0]) for r in results}) == 1 and len({id(r[1]) for r in results}) == 1}")
+
+	async def access():
+		await asyncio.sleep(0)
+		return ConnectionPool(), HostPool("cache", port=6379)
+
+	async def contend_async():
+		return await asyncio.gather(*(access() for _ in range(tasks)))
+
+	keep = results[0]
+	asyncio.run(contend_async())
+	print(f"{tasks} tasks: ConnectionPool built {ConnectionPool.created}x, HostPool built {HostPool.created}x")
+
+	locked = threading.Lock()
+
+	def always_locked():
+		with locked:
+			return keep[0]
+
+	for name, access_once in (
+		("Singleton (unlocked)", Singleton),
+		("ThreadSafeSingleton", ConnectionPool),
+		("lock on every access", always_locked),
+		("Multiton", lambda: HostPool("cache", port=6379)),
+	):
+		seconds = timeit.timeit(access_once, number=calls)
+		print(f"{name:<22} {seconds / calls * 1e9:6.0f} ns per access")
+
+
 if __name__ == "__main__":
 	main()
+	benchmark()
@@ -0,0 +1,19 @@
+"""
+Summary statistics shared by the benchmarks and load tests.
+"""
+
+from __future__ import annotations
+
+import math
+
+
+def percentile(samples, p: float) -> float:
+    """
+    Exact nearest-rank percentile of a list of samples, for benchmarks that
+    keep every measurement.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(len(ordered) * p / 100))
+    return ordered[rank - 1]
@@ -0,0 +1,487 @@
+"""
+Dataset statistics in one pass over the rows.
+
+The notebooks explore their data with describe(include='all'), corr(), max(),
+mean(), std(), nunique(), value_counts() and isnull().sum(): each one is a
+separate scan of the whole DataFrame. StreamStats computes all of them from a
+single chunked pass. Every statistic lives in an accumulator that can be
+updated with a chunk and merged with another accumulator, so the same code
+scans a DataFrame, a CSV too big for memory, or row ranges of a cached dataset
+in parallel processes whose results are merged at the end.
+
+The accumulators:
+- Moments: count, mean, variance and covariance of the numeric columns, merged
+  with Chan's parallel form of Welford's update. Each pair of columns keeps
+  its own co-moments over the rows where both are present, like pandas' corr().
+- Frequencies: exact value counts of the other columns. Past `capacity`
+  distinct values it turns into a Misra-Gries summary (the top values and
+  their counts stay correct to within n / capacity) and the distinct count
+  into a HyperLogLog estimate.
+- Sample: a uniform sample of the numeric rows (the ones with the smallest
+  random keys) for quantiles. Below `sample_size` rows it holds every row and
+  the quantiles are exact.
+
+    stats = scan(training_df)
+    stats.describe()
+    stats.corr()
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+import datasets
+
+
+class HyperLogLog:
+    """
+    Distinct count estimate in 2**p one-byte registers, about 1.04 / sqrt(2**p)
+    relative error (0.8% for p=14).
+    """
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, values: np.ndarray):
+        hashes = pd.util.hash_array(np.asarray(values))
+        bits = 64 - self.p
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # Position of the leftmost 1 bit of the remaining bits.
+        exponent = np.frexp(rest.astype(np.float64))[1]
+        rank = np.where(rest == 0, bits + 1, bits - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, (hashes >> np.uint64(bits)).astype(np.intp), rank)
+
+    def merge(self, other: HyperLogLog):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+
+class Frequencies:
+    def __init__(self, capacity: int = 10_000):
+        self.capacity = capacity
+        self.counts: dict = {}
+        self.total = 0
+        self.sketch: HyperLogLog | None = None
+
+    @property
+    def exact(self) -> bool:
+        return self.sketch is None
+
+    def update(self, column: pd.Series):
+        column = column.dropna()
+        counts = column.value_counts(sort=False)
+        counts = counts[counts > 0]
+        if self.sketch is not None:
+            self.sketch.add(counts.index.to_numpy())
+        self._add(zip(counts.index.tolist(), counts.tolist()), int(counts.sum()))
+
+    def merge(self, other: Frequencies):
+        if other.sketch is not None:
+            if self.sketch is None:
+                self._start_sketch()
+            self.sketch.merge(other.sketch)
+        elif self.sketch is not None:
+            self.sketch.add(np.array(list(other.counts), dtype=object))
+        self._add(other.counts.items(), other.total)
+
+    def _add(self, items: Iterable[tuple], total: int):
+        counts = self.counts
+        for value, count in items:
+            counts[value] = counts.get(value, 0) + count
+        self.total += total
+        if len(counts) > self.capacity:
+            if self.sketch is None:
+                self._start_sketch()
+            # Misra-Gries: take the (capacity + 1)th largest count off every
+            # counter and drop the ones that reach zero.
+            cut = sorted(counts.values(), reverse=True)[self.capacity]
+            self.counts = {v: c - cut for v, c in counts.items() if c > cut}
+
+    def _start_sketch(self):
+        # Until now every value seen is a key of counts.
+        self.sketch = HyperLogLog()
+        self.sketch.add(np.array(list(self.counts), dtype=object))
+
+    def nunique(self) -> float:
+        return len(self.counts) if self.sketch is None else self.sketch.estimate()
+
+    def most_common(self, n: int = 10) -> list[tuple]:
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+class Moments:
+    """
+    Pairwise count, means, co-moments and sums of squared deviations of k
+    columns, as k x k matrices: entry [i, j] is about column i over the rows
+    where column j is present too, so the diagonal holds each column's own
+    statistics.
+    """
+
+    def __init__(self, k: int):
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.comoment = np.zeros((k, k))
+
+    def update(self, values: np.ndarray):
+        rows, k = values.shape
+        if not rows:
+            return
+        present = ~np.isnan(values)
+        # Centre on the chunk's column means before summing, so the sums of
+        # squares do not lose precision to large values.
+        if present.all():
+            # No missing values: every pair has all rows, and the masked
+            # products below reduce to column sums.
+            shift = values.mean(axis=0)
+            centred = values - shift
+            n = np.full((k, k), float(rows))
+            sums = np.repeat(centred.sum(axis=0)[:, None], k, axis=1)
+            squares = np.repeat(
+                np.einsum("ij,ij->j", centred, centred)[:, None], k, axis=1
+            )
+        else:
+            with np.errstate(invalid="ignore"):
+                shift = np.nan_to_num(np.nanmean(values, axis=0))
+            centred = np.where(present, values - shift, 0.0)
+            weights = present.astype(np.float64)
+            n = weights.T @ weights
+            sums = centred.T @ weights
+            squares = (centred ** 2).T @ weights
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, sums / n, 0.0)
+        chunk = Moments(k)
+        chunk.n = n
+        chunk.mean = mean + shift[:, None]
+        chunk.m2 = squares - mean * sums
+        chunk.comoment = centred.T @ centred - mean * sums.T
+        self.merge(chunk)
+
+    def merge(self, other: Moments):
+        n = self.n + other.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            share = np.where(n > 0, other.n / n, 0.0)
+        delta = other.mean - self.mean
+        self.m2 = self.m2 + other.m2 + delta ** 2 * weight
+        self.comoment = self.comoment + other.comoment + delta * delta.T * weight
+        self.mean = self.mean + delta * share
+        self.n = n
+
+    def count(self) -> np.ndarray:
+        return np.diag(self.n)
+
+    def means(self) -> np.ndarray:
+        with np.errstate(invalid="ignore"):
+            return np.where(self.count() > 0, np.diag(self.mean), np.nan)
+
+    def var(self, ddof: int = 1) -> np.ndarray:
+        count = self.count()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > ddof, np.diag(self.m2) / (count - ddof), np.nan)
+
+    def corr(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        np.fill_diagonal(corr, np.where(self.count() > 1, 1.0, np.nan))
+        return corr
+
+
+class Sample:
+    def __init__(self, k: int, size: int = 100_000, seed: int | None = None):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.rows = np.empty((0, k))
+
+    def update(self, values: np.ndarray):
+        self._keep(self.rng.random(len(values)), values)
+
+    def merge(self, other: Sample):
+        self._keep(other.keys, other.rows)
+
+    def _keep(self, keys: np.ndarray, rows: np.ndarray):
+        keys = np.concatenate([self.keys, keys])
+        rows = np.concatenate([self.rows, rows])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[: self.size]
+            keys, rows = keys[keep], rows[keep]
+        self.keys, self.rows = keys, rows
+
+    def quantiles(self, q: list[float]) -> np.ndarray:
+        if not len(self.rows):
+            return np.full((len(q), self.rows.shape[1]), np.nan)
+        with np.errstate(invalid="ignore"):
+            return np.nanquantile(self.rows, q, axis=0)
+
+
+class StreamStats:
+    def __init__(
+        self,
+        columns: list[str],
+        numeric: list[str],
+        capacity: int = 10_000,
+        sample_size: int = 100_000,
+        seed: int | None = None,
+    ):
+        self.columns = list(columns)
+        self.numeric = [name for name in self.columns if name in set(numeric)]
+        self.rows = 0
+        self.nulls = dict.fromkeys(self.columns, 0)
+        k = len(self.numeric)
+        self.minimum = np.full(k, np.nan)
+        self.maximum = np.full(k, np.nan)
+        self.moments = Moments(k)
+        self.sample = Sample(k, sample_size, seed)
+        self.frequencies = {
+            name: Frequencies(capacity)
+            for name in self.columns
+            if name not in self.numeric
+        }
+
+    @classmethod
+    def for_frame(cls, frame: pd.DataFrame, **kwargs) -> StreamStats:
+        numeric = frame.select_dtypes(["number", "bool"]).columns
+        return cls(list(frame.columns), list(numeric), **kwargs)
+
+    def update(self, chunk: pd.DataFrame) -> StreamStats:
+        self.rows += len(chunk)
+        for name, nulls in chunk[self.columns].isna().sum().items():
+            self.nulls[name] += int(nulls)
+        if self.numeric:
+            values = chunk[self.numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+            if len(values):
+                self.minimum = np.fmin(self.minimum, np.fmin.reduce(values, axis=0))
+                self.maximum = np.fmax(self.maximum, np.fmax.reduce(values, axis=0))
+            self.moments.update(values)
+            self.sample.update(values)
+        for name, frequencies in self.frequencies.items():
+            frequencies.update(chunk[name])
+        return self
+
+    def merge(self, other: StreamStats) -> StreamStats:
+        self.rows += other.rows
+        for name, nulls in other.nulls.items():
+            self.nulls[name] += nulls
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        self.moments.merge(other.moments)
+        self.sample.merge(other.sample)
+        for name, frequencies in self.frequencies.items():
+            frequencies.merge(other.frequencies[name])
+        return self
+
+    def _numeric(self, values) -> pd.Series:
+        return pd.Series(values, index=self.numeric, dtype=np.float64)
+
+    def count(self) -> pd.Series:
+        return pd.Series(
+            {name: self.rows - nulls for name, nulls in self.nulls.items()}
+        )
+
+    def isnull(self) -> pd.Series:
+        return pd.Series(self.nulls)
+
+    def min(self) -> pd.Series:
+        return self._numeric(self.minimum)
+
+    def max(self) -> pd.Series:
+        return self._numeric(self.maximum)
+
+    def mean(self) -> pd.Series:
+        return self._numeric(self.moments.means())
+
+    def std(self, ddof: int = 1) -> pd.Series:
+        return self._numeric(np.sqrt(self.moments.var(ddof)))
+
+    def corr(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            self.moments.corr(), index=self.numeric, columns=self.numeric
+        )
+
+    def quantile(self, q: list[float]) -> pd.DataFrame:
+        return pd.DataFrame(self.sample.quantiles(q), index=q, columns=self.numeric)
+
+    def nunique(self) -> pd.Series:
+        """
+        Distinct non-null values of the non-numeric columns; a float means
+        the count is a HyperLogLog estimate.
+        """
+        return pd.Series({name: f.nunique() for name, f in self.frequencies.items()})
+
+    def value_counts(self, column: str, n: int = 10) -> pd.Series:
+        return pd.Series(dict(self.frequencies[column].most_common(n)), name="count")
+
+    def describe(self) -> pd.DataFrame:
+        """
+        The table of describe(include='all').
+        """
+        table = pd.DataFrame(index=self.columns, dtype=object)
+        table["count"] = self.count()
+        for name, frequencies in self.frequencies.items():
+            top = frequencies.most_common(1)
+            table.loc[name, "unique"] = frequencies.nunique()
+            if top:
+                table.loc[name, "top"], table.loc[name, "freq"] = top[0]
+        if self.numeric:
+            quantiles = self.quantile([0.25, 0.5, 0.75])
+            table.loc[self.numeric, "mean"] = self.mean()
+            table.loc[self.numeric, "std"] = self.std()
+            table.loc[self.numeric, "min"] = self.min()
+            for q, label in zip(quantiles.index, ("25%", "50%", "75%")):
+                table.loc[self.numeric, label] = quantiles.loc[q]
+            table.loc[self.numeric, "max"] = self.max()
+        return table.T
+
+
+def iter_chunks(frame: pd.DataFrame, chunk_rows: int) -> Iterable[pd.DataFrame]:
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start : start + chunk_rows]
+
+
+def scan(frame: pd.DataFrame, chunk_rows: int = 1_000_000, **kwargs) -> StreamStats:
+    stats = StreamStats.for_frame(frame, **kwargs)
+    for chunk in iter_chunks(frame, chunk_rows):
+        stats.update(chunk)
+    return stats
+
+
+def scan_csv(
+    path: str, chunk_rows: int = 1_000_000, dtype=None, usecols=None, **kwargs
+) -> StreamStats:
+    """
+    Stream a CSV through pandas' chunked reader, holding one chunk at a time.
+    """
+    stats = None
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=dtype, usecols=usecols):
+        stats = stats or StreamStats.for_frame(chunk, **kwargs)
+        stats.update(chunk)
+    return stats
+
+
+def _scan_rows(
+    directory: str, start: int, stop: int, chunk_rows: int, kwargs: dict
+) -> StreamStats:
+    # Each worker maps the cached columns itself, so no rows are pickled.
+    frame = datasets.load_frame(directory).iloc[start:stop]
+    return scan(frame, chunk_rows, **kwargs)
+
+
+def scan_cache(
+    directory: str, workers: int = 4, chunk_rows: int = 1_000_000, **kwargs
+) -> StreamStats:
+    """
+    Scan a dataset cache directory (see datasets.load_dataset) with `workers`
+    processes, each over a contiguous range of rows, and merge their results.
+    """
+    rows = len(datasets.load_frame(directory))
+    bounds = np.linspace(0, rows, workers + 1).astype(int)
+    if "seed" in kwargs:
+        seeds = [kwargs["seed"] + n for n in range(workers)]
+    else:
+        seeds = [None] * workers
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(
+                _scan_rows, directory, start, stop, chunk_rows, dict(kwargs, seed=seed)
+            )
+            for start, stop, seed in zip(bounds[:-1], bounds[1:], seeds)
+        ]
+        results = [future.result() for future in futures]
+    stats = results[0]
+    for other in results[1:]:
+        stats.merge(other)
+    return stats
+
+
+def pandas_scans(frame: pd.DataFrame) -> dict:
+    """
+    The taxi and rice notebooks' exploration, one pandas call per statistic.
+    """
+    return {
+        "describe": frame.describe(include="all"),
+        "corr": frame.corr(numeric_only=True),
+        "max": frame.max(numeric_only=True),
+        "min": frame.min(numeric_only=True),
+        "mean": frame.mean(numeric_only=True),
+        "std": frame.std(numeric_only=True),
+        "nunique": frame["COMPANY"].nunique(),
+        "top payment": frame["PAYMENT_TYPE"].value_counts().idxmax(),
+        "nulls": frame.isnull().sum(),
+    }
+
+
+def stream_scans(stats: StreamStats) -> dict:
+    return {
+        "describe": stats.describe(),
+        "corr": stats.corr(),
+        "max": stats.max(),
+        "mean": stats.mean(),
+        "std": stats.std(),
+        "nunique": stats.nunique()["COMPANY"],
+        "top payment": stats.value_counts("PAYMENT_TYPE", 1).index[0],
+        "nulls": stats.isnull(),
+    }
+
+
+def benchmark(rows: int = 10_000_000, workers=(1, 2, 4)):
+    """
+    Explore a `rows` row taxi-shaped frame with pandas' separate scans and with
+    one streaming pass, then scan it from a dataset cache in parallel.
+    """
+    import os
+    import tempfile
+
+    frame = datasets.taxi_frame(rows, np.random.default_rng(0))[
+        list(datasets.TAXI_SCHEMA)
+    ]
+    frame = frame.astype(datasets.TAXI_SCHEMA)
+
+    start = time.perf_counter()
+    expected = pandas_scans(frame)
+    multi_scan = time.perf_counter() - start
+    print(f"pandas, one scan per statistic  {multi_scan:6.2f}s")
+
+    start = time.perf_counter()
+    got = stream_scans(scan(frame, seed=0))
+    single_pass = time.perf_counter() - start
+    print(
+        f"streaming, one pass             {single_pass:6.2f}s "
+        f"({multi_scan / single_pass:.1f}x)"
+    )
+
+    error = np.nanmax(np.abs(got["corr"].to_numpy() - expected["corr"].to_numpy()))
+    print(
+        f"max corr difference {error:.1e}, "
+        f"max FARE {got['max']['FARE']} / {expected['max']['FARE']}, "
+        f"companies {got['nunique']} / {expected['nunique']}, "
+        f"top payment {got['top payment']} / {expected['top payment']}"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = os.path.join(directory, "taxi")
+        datasets.save_frame(frame, cache)
+        del frame, expected, got
+        for count in workers:
+            start = time.perf_counter()
+            stream_scans(scan_cache(cache, count, seed=0))
+            elapsed = time.perf_counter() - start
+            print(f"cache scan, {count} worker(s)        {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,378 @@
+"""
+Hyperparameter sweeps over ExperimentSettings grids, trained in parallel.
+
+The notebooks try settings by hand, one experiment after another: settings_1,
+settings_2 and settings_3 in the taxi notebook, baseline and all features in
+the rice one. run_sweep() takes the whole grid at once:
+- grid() expands lists of learning rates, batch sizes, epochs and feature sets
+  into one ExperimentSettings per combination
+- every run trains in a worker of a process pool. Workers start with their
+  BLAS thread pools capped (threads_per_worker), so N workers do not each start
+  one thread per core and fight over the CPUs
+- the data is written once to a dataset cache (see datasets.py) and every
+  worker memory-maps it, instead of each task pickling its own copy
+- a run whose loss goes non-finite, or stays above `divergence` times its best
+  loss for `patience` epochs in a row, stops early and is marked as diverged.
+  (RMSprop bounds its step size, so a learning rate that is too high tends to
+  make the loss jump around rather than overflow.)
+- every epoch of every run ends up in one results table
+
+The model is the notebooks' create_model() written in NumPy, a single Dense
+layer trained with RMSprop, on mean squared error for regression and on binary
+cross-entropy through a sigmoid for classification. Keras is not a dependency
+of this repo, and for a one-layer model the Python-level training loop is what
+costs time either way.
+
+    settings = grid(learning_rate=[0.001, 0.01], batch_size=[50, 500],
+                    number_epochs=[20], input_features=[["TRIP_MILES"]])
+    results = run_sweep(training_df, "FARE", settings, workers=4)
+
+For the rice classifier, `positive` picks the class the model predicts:
+
+    run_sweep(rice_df, "Class", settings, classifier=True, positive="Cammeo")
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import datasets
+
+# Environment variables that size the thread pools of the BLAS libraries NumPy
+# may be built against. They are read when NumPy is first imported.
+THREAD_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+]
+
+
+@dataclasses.dataclass(frozen=True)
+class ExperimentSettings:
+    """
+    The fields of ml_edu.experiment.ExperimentSettings the notebooks use.
+    """
+
+    learning_rate: float
+    number_epochs: int
+    batch_size: int
+    input_features: tuple[str, ...]
+    classification_threshold: float | None = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "input_features", tuple(self.input_features))
+
+    @property
+    def name(self) -> str:
+        return (
+            f"lr={self.learning_rate:g} bs={self.batch_size} "
+            f"epochs={self.number_epochs} {'+'.join(self.input_features)}"
+        )
+
+
+@dataclasses.dataclass
+class Experiment:
+    name: str
+    settings: ExperimentSettings
+    epochs: list[int]
+    metrics_history: pd.DataFrame
+    model: DenseModel | None = None
+    status: str = "completed"
+    seconds: float = 0.0
+
+
+def grid(**params: list) -> list[ExperimentSettings]:
+    """
+    One ExperimentSettings per combination of the given values.
+    """
+    names = list(params)
+    return [
+        ExperimentSettings(**dict(zip(names, values)))
+        for values in itertools.product(*(params[name] for name in names))
+    ]
+
+
+class DenseModel:
+    """
+    A single Dense unit over the input features, trained with RMSprop (Keras'
+    defaults: rho=0.9, epsilon=1e-7, Glorot uniform weights, zero bias).
+    """
+
+    def __init__(
+        self, inputs: int, learning_rate: float, classifier: bool, seed: int = 0
+    ):
+        rng = np.random.default_rng(seed)
+        limit = np.sqrt(6 / (inputs + 1))
+        self.weights = rng.uniform(-limit, limit, inputs)
+        self.bias = 0.0
+        self.learning_rate = learning_rate
+        self.classifier = classifier
+        self.rho, self.epsilon = 0.9, 1e-7
+        self._squares = np.zeros(inputs)
+        self._bias_square = 0.0
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        z = x @ self.weights + self.bias
+        if self.classifier:
+            return 1 / (1 + np.exp(-np.clip(z, -500, 500)))
+        return z
+
+    def step(self, x: np.ndarray, y: np.ndarray):
+        error = self.predict(x) - y
+        # d(loss)/dz: 2 (p - y) / n for mean squared error, (p - y) / n for
+        # binary cross-entropy through the sigmoid.
+        grad_z = error / len(y) if self.classifier else 2 * error / len(y)
+        grad_w = x.T @ grad_z
+        grad_b = grad_z.sum()
+        rho, lr, eps = self.rho, self.learning_rate, self.epsilon
+        self._squares = rho * self._squares + (1 - rho) * grad_w ** 2
+        self._bias_square = rho * self._bias_square + (1 - rho) * grad_b ** 2
+        self.weights -= lr * grad_w / (np.sqrt(self._squares) + eps)
+        self.bias -= lr * grad_b / (np.sqrt(self._bias_square) + eps)
+
+    def evaluate(self, x: np.ndarray, y: np.ndarray, threshold: float | None) -> dict:
+        p = self.predict(x)
+        if not self.classifier:
+            mse = float(np.mean((p - y) ** 2))
+            return {"loss": mse, "rmse": float(np.sqrt(mse))}
+        q = np.clip(p, 1e-7, 1 - 1e-7)
+        loss = float(-np.mean(y * np.log(q) + (1 - y) * np.log(1 - q)))
+        predicted = p > (0.5 if threshold is None else threshold)
+        actual = y > 0.5
+        true_positives = np.count_nonzero(predicted & actual)
+        return {
+            "loss": loss,
+            "accuracy": float(np.mean(predicted == actual)),
+            "precision": true_positives / max(np.count_nonzero(predicted), 1),
+            "recall": true_positives / max(np.count_nonzero(actual), 1),
+        }
+
+
+def train(
+    settings: ExperimentSettings,
+    features: dict[str, np.ndarray],
+    labels: np.ndarray,
+    classifier: bool,
+    divergence: float = 10.0,
+    patience: int = 3,
+    seed: int = 0,
+) -> Experiment:
+    start = time.perf_counter()
+    x = np.column_stack(
+        [
+            np.asarray(features[name], dtype=np.float64)
+            for name in settings.input_features
+        ]
+    )
+    y = _numeric(labels)
+    model = DenseModel(x.shape[1], settings.learning_rate, classifier, seed)
+    rng = np.random.default_rng(seed)
+    history, status = [], "completed"
+    best, worse = np.inf, 0
+    for epoch in range(settings.number_epochs):
+        order = rng.permutation(len(y))
+        with np.errstate(over="ignore", invalid="ignore"):
+            for begin in range(0, len(y), settings.batch_size):
+                batch = order[begin : begin + settings.batch_size]
+                model.step(x[batch], y[batch])
+            metrics = model.evaluate(x, y, settings.classification_threshold)
+        history.append(metrics)
+        loss = metrics["loss"]
+        worse = worse + 1 if loss > divergence * best else 0
+        if not np.isfinite(loss) or worse >= patience:
+            status = "diverged"
+            break
+        best = min(best, loss)
+    return Experiment(
+        name=settings.name,
+        settings=settings,
+        epochs=list(range(len(history))),
+        metrics_history=pd.DataFrame(history),
+        model=model,
+        status=status,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def _numeric(labels) -> np.ndarray:
+    try:
+        return np.asarray(labels, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(
+            "labels must be numbers; pass positive= to run_sweep() to turn class "
+            "labels into 1 for the positive class and 0 for the others"
+        ) from None
+
+
+def label_values(labels: pd.Series, positive=None) -> np.ndarray:
+    """
+    The label column as numbers. With `positive`, 1 where the label equals
+    `positive` and 0 elsewhere, as in preprocessing.Dataset.from_frame().
+    """
+    if positive is None:
+        return _numeric(labels.to_numpy())
+    if isinstance(labels.dtype, pd.CategoricalDtype):
+        # Compare the integer codes instead of the label strings.
+        matches = labels.cat.codes.to_numpy() == labels.cat.categories.get_loc(positive)
+    else:
+        matches = labels.to_numpy() == positive
+    return matches.astype(np.float32)
+
+
+# Set in each worker by _load, so tasks only carry their settings.
+_data: tuple[pd.DataFrame, str, bool] | None = None
+
+
+def _load(directory: str, label: str, classifier: bool):
+    global _data
+    _data = (datasets.load_frame(directory), label, classifier)
+
+
+def _train(settings: ExperimentSettings, options: dict) -> Experiment:
+    frame, label, classifier = _data
+    features = {name: frame[name].to_numpy() for name in settings.input_features}
+    return train(settings, features, frame[label].to_numpy(), classifier, **options)
+
+
+@contextlib.contextmanager
+def capped_threads(threads: int):
+    """
+    Set the BLAS thread variables while worker processes are started. They are
+    spawned, not forked, so they import NumPy fresh and read them; this process
+    keeps the thread pools it already has.
+    """
+    saved = {name: os.environ.get(name) for name in THREAD_VARIABLES}
+    os.environ.update({name: str(threads) for name in THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def results_table(experiments: list[Experiment]) -> pd.DataFrame:
+    """
+    One row per epoch of every experiment, with its settings.
+    """
+    tables = []
+    for experiment in experiments:
+        table = experiment.metrics_history.copy()
+        table.insert(0, "epoch", experiment.epochs)
+        settings = experiment.settings
+        for n, (column, value) in enumerate(
+            [
+                ("experiment", experiment.name),
+                ("learning_rate", settings.learning_rate),
+                ("batch_size", settings.batch_size),
+                ("number_epochs", settings.number_epochs),
+                ("input_features", "+".join(settings.input_features)),
+                ("status", experiment.status),
+            ]
+        ):
+            table.insert(n, column, value)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
+def run_sweep(
+    frame: pd.DataFrame,
+    label: str,
+    settings: list[ExperimentSettings],
+    workers: int = 4,
+    threads_per_worker: int = 1,
+    classifier: bool = False,
+    positive=None,
+    divergence: float = 10.0,
+    patience: int = 3,
+    seed: int = 0,
+) -> tuple[pd.DataFrame, list[Experiment]]:
+    """
+    Train every settings' model on `frame` and return the results table and
+    the experiments, in the order of `settings`. workers=0 trains in this
+    process. For classifiers whose label is a class name, `positive` is the
+    class that counts as 1 (see label_values()).
+    """
+    options = dict(divergence=divergence, patience=patience, seed=seed)
+    labels = label_values(frame[label], positive)
+    if not workers:
+        experiments = [
+            train(
+                s,
+                {name: frame[name].to_numpy() for name in s.input_features},
+                labels,
+                classifier,
+                **options,
+            )
+            for s in settings
+        ]
+        return results_table(experiments), experiments
+
+    columns = sorted({name for s in settings for name in s.input_features} - {label})
+    directory = tempfile.mkdtemp(prefix="sweep-")
+    try:
+        cache = os.path.join(directory, "data")
+        datasets.save_frame(frame[columns].assign(**{label: labels}), cache)
+        with capped_threads(threads_per_worker), ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load,
+            initargs=(cache, label, classifier),
+        ) as pool:
+            futures = {
+                pool.submit(_train, s, options): n for n, s in enumerate(settings)
+            }
+            experiments = [None] * len(settings)
+            for future in as_completed(futures):
+                experiments[futures[future]] = future.result()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results_table(experiments), experiments
+
+
+def benchmark(rows: int = 100_000, workers=(1, 2, 4, 8)):
+    """
+    Sweep 16 taxi regression settings, the largest learning rates of which
+    diverge, with 1, 2, 4 and 8 workers of one thread each.
+    """
+    frame = datasets.taxi_frame(rows, np.random.default_rng(0))
+    frame["TRIP_MINUTES"] = frame["TRIP_SECONDS"] / 60
+    settings = grid(
+        learning_rate=[0.001, 0.01, 1.0, 10.0],
+        batch_size=[50, 500],
+        number_epochs=[20],
+        input_features=[["TRIP_MILES"], ["TRIP_MILES", "TRIP_MINUTES"]],
+    )
+    print(f"{len(settings)} runs on {rows} rows, {os.cpu_count()} CPU(s)")
+    baseline = None
+    for count in workers:
+        start = time.perf_counter()
+        table, experiments = run_sweep(frame, "FARE", settings, workers=count)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        diverged = sum(e.status == "diverged" for e in experiments)
+        print(
+            f"{count} worker(s) {elapsed:6.2f}s ({baseline / elapsed:.2f}x)  "
+            f"{len(table)} epochs recorded, {diverged} runs stopped early"
+        )
+    final = table.groupby("experiment", sort=False).last()
+    print(final[["status", "rmse"]].sort_values("rmse").head(5))
+
+
+if __name__ == "__main__":
+    benchmark()
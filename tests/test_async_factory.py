@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from af_example import DarkButton, DarkCheckbox
+from async_factory import (
+    AsyncDarkThemeFactory,
+    build_family,
+    product_names,
+    warm_families,
+)
+
+
+class Resource:
+    def __init__(self, name, closed):
+        self.name = name
+        self._closed = closed
+
+    async def aclose(self):
+        self._closed.append(self.name)
+
+
+class Factory:
+    """
+    Products "fast" and "slow"; `fail` names a product whose setup raises and
+    `cancel` one whose setup is cancelled.
+    """
+
+    def __init__(self, closed, fail=None, cancel=None):
+        self.closed = closed
+        self.fail = fail
+        self.cancel = cancel
+
+    async def _make(self, name, delay):
+        await asyncio.sleep(delay)
+        if name == self.fail:
+            raise RuntimeError(f"{name} failed")
+        if name == self.cancel:
+            asyncio.current_task().cancel()
+            await asyncio.sleep(0)
+        return Resource(name, self.closed)
+
+    async def create_fast(self):
+        return await self._make("fast", 0.01)
+
+    async def create_slow(self):
+        return await self._make("slow", 0.05)
+
+
+def test_builds_every_product_concurrently():
+    family = asyncio.run(
+        asyncio.wait_for(
+            build_family(AsyncDarkThemeFactory(button=0.1, checkbox=0.1)), 0.15
+        )
+    )
+    assert isinstance(family["button"], DarkButton)
+    assert isinstance(family["checkbox"], DarkCheckbox)
+
+
+def test_product_names():
+    assert product_names(Factory([])) == ["fast", "slow"]
+
+
+def test_failure_closes_built_products():
+    closed = []
+    with pytest.raises(RuntimeError, match="slow failed"):
+        asyncio.run(build_family(Factory(closed, fail="slow")))
+    assert closed == ["fast"]
+
+
+def test_failure_cancels_products_still_building():
+    closed = []
+    with pytest.raises(RuntimeError, match="fast failed"):
+        asyncio.run(build_family(Factory(closed, fail="fast")))
+    assert closed == []
+
+
+def test_cancelled_product_closes_built_products():
+    closed = []
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(build_family(Factory(closed, cancel="slow")))
+    assert closed == ["fast"]
+
+
+def test_cancelling_the_build_closes_built_products():
+    closed = []
+
+    async def main():
+        build = asyncio.ensure_future(build_family(Factory(closed)))
+        await asyncio.sleep(0.03)
+        build.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await build
+
+    asyncio.run(main())
+    assert closed == ["fast"]
+
+
+def test_warm_families_closes_the_families_that_were_built():
+    closed = []
+    factories = {"good": Factory(closed), "bad": Factory([], fail="slow")}
+    with pytest.raises(RuntimeError):
+        asyncio.run(warm_families(factories))
+    assert sorted(closed) == ["fast", "slow"]
@@ -0,0 +1,84 @@
+import asyncio
+
+import aioredis
+import pytest
+
+from autopipeline import AutoPipeline, FakeRedisServer
+
+
+async def _with_redis(test):
+    server = await asyncio.start_server(FakeRedisServer().handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    redis = await aioredis.create_redis(f"redis://127.0.0.1:{port}")
+    try:
+        return await test(redis)
+    finally:
+        redis.close()
+        await redis.wait_closed()
+        server.close()
+        await server.wait_closed()
+
+
+def test_replies_are_delivered_per_command():
+    async def test(redis):
+        writer = AutoPipeline(redis)
+        replies = await asyncio.gather(*(writer.incr("hits") for _ in range(10)))
+        assert sorted(replies) == list(range(1, 11))
+        assert writer.batches_sent == 1
+
+    asyncio.run(_with_redis(test))
+
+
+def test_bad_argument_fails_only_its_own_command():
+    async def test(redis):
+        writer = AutoPipeline(redis)
+        results = await asyncio.gather(
+            writer.incr("a"),
+            writer.set("b", {"not": "encodable"}),
+            writer.set("c", None),
+            writer.incr("a"),
+            return_exceptions=True,
+        )
+        assert results[0] == 1 and results[3] == 2
+        assert isinstance(results[1], TypeError)
+        assert isinstance(results[2], TypeError)
+        # The connection is still in step with the server.
+        assert await redis.get("a") == b"2"
+        assert await redis.get("b") is None
+
+    asyncio.run(_with_redis(test))
+
+
+def test_failing_command_fails_only_its_caller():
+    async def test(redis):
+        writer = AutoPipeline(redis)
+        await redis.set("text", "abc")
+        results = await asyncio.gather(
+            writer.incr("text"), writer.incr("n"), return_exceptions=True
+        )
+        assert isinstance(results[0], aioredis.ReplyError)
+        assert results[1] == 1
+
+    asyncio.run(_with_redis(test))
+
+
+def test_cancelled_commands_are_not_sent():
+    async def test(redis):
+        writer = AutoPipeline(redis)
+        cancelled = writer.execute(b"INCR", "n")
+        kept = writer.execute(b"INCR", "m")
+        cancelled.cancel()
+        assert await kept == 1
+        assert await redis.get("n") is None
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+    asyncio.run(_with_redis(test))
+
+
+def test_missing_aioredis_internals_fail_clearly(monkeypatch):
+    from aioredis.connection import RedisConnection
+
+    monkeypatch.delattr(RedisConnection, "_buffered")
+    with pytest.raises(RuntimeError, match="RedisConnection._buffered"):
+        AutoPipeline(object())
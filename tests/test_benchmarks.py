@@ -0,0 +1,11 @@
+from benchmarks import compare
+
+
+def test_compare_reports_only_regressions_past_the_threshold():
+    baseline = {
+        "results": {"calls": {"a": 1.0, "b": 1.0, "c": 0.0}, "gone": {"x": 1.0}}
+    }
+    current = {"results": {"calls": {"a": 1.05, "b": 1.5, "c": 9.0, "new": 1.0}}}
+    regressions = compare(current, baseline, threshold=0.1)
+    assert [(group, name) for group, name, _ in regressions] == [("calls", "b")]
+    assert regressions[0][2] == 0.5
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from broadcast import Client, Hub
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def send(self, payload):
+        self.sent.append(payload)
+
+    async def close(self, code, reason):
+        self.closed = code
+
+
+def test_drop_oldest_keeps_the_newest_messages():
+    client = Client(FakeSocket(), buffer=2, policy="drop-oldest")
+    for n in range(4):
+        assert client.offer(n, key=object())
+    assert list(client.pending.values()) == [2, 3]
+    assert client.dropped == 2
+
+
+def test_coalesce_replaces_in_place():
+    client = Client(FakeSocket(), buffer=2, policy="coalesce")
+    client.offer("a1", "a")
+    client.offer("b1", "b")
+    client.offer("a2", "a")
+    assert list(client.pending.items()) == [("a", "a2"), ("b", "b1")]
+    assert client.coalesced == 1 and client.dropped == 0
+
+
+def test_disconnect_policy_refuses_when_full():
+    client = Client(FakeSocket(), buffer=1, policy="disconnect")
+    assert client.offer(1, object())
+    assert not client.offer(2, object())
+
+
+def test_hub_publishes_and_disconnects_slow_clients():
+    async def main():
+        hub = Hub(buffer=1, policy="disconnect")
+        fast, slow = Client(FakeSocket(), 1, hub.policy), Client(
+            FakeSocket(), 1, hub.policy
+        )
+        hub.clients |= {fast, slow}
+        writer = asyncio.ensure_future(fast.write())
+        assert hub.publish({"n": 1}) == 2
+        await asyncio.sleep(0)
+        hub.publish("two")
+        await asyncio.sleep(0)
+        writer.cancel()
+        assert fast.websocket.sent == ['{"n": 1}', "two"]
+        assert hub.clients == {fast}
+        assert slow.websocket.closed == 1008
+        assert hub.stats()["disconnected"] == 1
+
+    asyncio.run(main())
+
+
+def test_hub_rejects_unknown_policy():
+    with pytest.raises(ValueError, match="drop-oldest"):
+        Hub(policy="block")
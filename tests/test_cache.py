@@ -0,0 +1,230 @@
+import asyncio
+
+from cache import LRU, MISSING, Cache, FakeRedis
+
+
+def test_concurrent_gets_compute_once():
+    async def main():
+        cache = Cache(FakeRedis(latency=0.001))
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"id": 1}
+
+        values = await asyncio.gather(
+            *(cache.get_or_compute("user:1", compute) for _ in range(50))
+        )
+        assert calls == 1
+        assert values == [{"id": 1}] * 50
+
+    asyncio.run(main())
+
+
+def test_concurrent_caches_share_one_computation():
+    # Two Cache instances stand in for two processes sharing one Redis.
+    async def main():
+        redis = FakeRedis()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.1)
+            return "value"
+
+        values = await asyncio.gather(
+            Cache(redis).get_or_compute("key", compute),
+            Cache(redis).get_or_compute("key", compute),
+        )
+        assert values == ["value", "value"]
+        assert calls == 1
+
+    asyncio.run(main())
+
+
+def test_values_expire_after_ttl():
+    async def main():
+        cache = Cache(FakeRedis(), ttl=0.05, local_ttl=0.01)
+        values = iter(["first", "second"])
+
+        async def compute():
+            return next(values)
+
+        assert await cache.get_or_compute("key", compute) == "first"
+        assert await cache.get_or_compute("key", compute) == "first"
+        await asyncio.sleep(0.1)
+        assert await cache.get_or_compute("key", compute) == "second"
+
+    asyncio.run(main())
+
+
+def test_negative_results_expire_after_negative_ttl():
+    async def main():
+        cache = Cache(FakeRedis(), negative_ttl=0.05, local_size=0)
+        values = iter([None, "found"])
+
+        async def compute():
+            return next(values)
+
+        assert await cache.get_or_compute("key", compute) is None
+        # Cached: the second value is not computed yet.
+        assert await cache.get_or_compute("key", compute) is None
+        await asyncio.sleep(0.1)
+        assert await cache.get_or_compute("key", compute) == "found"
+
+    asyncio.run(main())
+
+
+def test_zero_negative_ttl_disables_negative_caching():
+    async def main():
+        redis = FakeRedis()
+        cache = Cache(redis, negative_ttl=0)
+        values = iter([None, "found"])
+
+        async def compute():
+            return next(values)
+
+        assert await cache.get_or_compute("key", compute) is None
+        assert await redis.get("cache:key") is None
+        assert await cache.get_or_compute("key", compute) == "found"
+
+    asyncio.run(main())
+
+
+def test_lock_held_by_another_caller_is_not_released():
+    async def main():
+        redis = FakeRedis()
+        cache = Cache(redis, lock_timeout=0.05)
+
+        async def compute():
+            # Outlives the lock, which another process then takes.
+            await asyncio.sleep(0.1)
+            assert await redis.set(
+                "lock:cache:key", b"other", exist=redis.SET_IF_NOT_EXIST
+            )
+            return "value"
+
+        assert await cache.get_or_compute("key", compute) == "value"
+        assert await redis.get("lock:cache:key") == b"other"
+
+    asyncio.run(main())
+
+
+def test_lock_is_released_after_compute():
+    async def main():
+        redis = FakeRedis()
+        cache = Cache(redis)
+
+        async def compute():
+            return "value"
+
+        await cache.get_or_compute("key", compute)
+        assert await redis.get("lock:cache:key") is None
+
+    asyncio.run(main())
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRU(max_size=2)
+    lru.set("a", 1, ttl=60)
+    lru.set("b", 2, ttl=60)
+    assert lru.get("a") == 1
+    lru.set("c", 3, ttl=60)
+    assert lru.get("b") is MISSING
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+
+
+def test_lru_entries_expire():
+    lru = LRU()
+    lru.set("a", 1, ttl=-1)
+    assert lru.get("a") is MISSING
+
+
+def test_cancelled_caller_hands_the_computation_to_a_waiter():
+    async def main():
+        cache = Cache(FakeRedis())
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "value"
+
+        first = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        third = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "value"
+        assert await third == "value"
+        assert first.cancelled()
+        assert calls == 2
+
+    asyncio.run(main())
+
+
+def test_failures_reach_every_waiter():
+    async def main():
+        cache = Cache(FakeRedis())
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise LookupError("down")
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("key", compute) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert [type(result) for result in results] == [LookupError] * 3
+
+    asyncio.run(main())
+
+
+def test_lock_winner_rechecks_redis_before_computing():
+    class LateRedis(FakeRedis):
+        # The first lookup misses, as if the value landed just after it.
+        misses = 1
+
+        async def get(self, key):
+            if key.startswith("cache:") and self.misses:
+                self.misses -= 1
+                return None
+            return await super().get(key)
+
+    async def main():
+        redis = LateRedis()
+        await Cache(redis).get_or_compute("key", _stored)
+
+        async def compute():
+            raise AssertionError("computed a stored value")
+
+        redis.misses = 1
+        assert await Cache(redis).get_or_compute("key", compute) == "stored"
+
+    asyncio.run(main())
+
+
+async def _stored():
+    return "stored"
+
+
+def test_zero_ttl_is_not_the_default():
+    async def main():
+        redis = FakeRedis()
+        cache = Cache(redis, local_size=0)
+        values = iter(["first", "second"])
+
+        async def compute():
+            return next(values)
+
+        assert await cache.get_or_compute("key", compute, ttl=0) == "first"
+        assert await redis.get("cache:key") is None
+        assert await cache.get_or_compute("key", compute, ttl=0) == "second"
+
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+import asyncio
+import hashlib
+
+from cpu_executor import HybridExecutor, make_lines, parse_record
+
+
+def test_parse_record():
+    record = parse_record("2021-06-01 | info | Cache hit. cache HIT")
+    assert record == {
+        "timestamp": "2021-06-01",
+        "level": "INFO",
+        "words": {"cache": 2, "hit": 2},
+    }
+
+
+def test_map_chunked_keeps_input_order():
+    lines = make_lines(250)
+    executor = HybridExecutor(max_workers=2)
+
+    async def main():
+        return await executor.map_chunked(parse_record, lines, chunk_size=40)
+
+    try:
+        assert asyncio.run(main()) == [parse_record(line) for line in lines]
+    finally:
+        executor.shutdown()
+
+
+def test_run_cpu_and_run_blocking():
+    executor = HybridExecutor(max_workers=1, max_threads=2)
+
+    async def main():
+        return await asyncio.gather(
+            executor.run_cpu(pow, 3, 4),
+            executor.run_blocking(hashlib.sha256, b"data"),
+        )
+
+    try:
+        power, digest = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert power == 81
+    assert digest.hexdigest() == hashlib.sha256(b"data").hexdigest()
+
+
+def test_pools_start_lazily_and_restart_after_shutdown():
+    executor = HybridExecutor(max_workers=1)
+    assert executor._processes is None and executor._threads is None
+    threads = executor.threads
+    assert executor.threads is threads
+    executor.shutdown()
+    assert executor._threads is None
+    assert executor.threads is not threads
+    executor.shutdown()
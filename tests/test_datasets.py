@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import datasets
+
+
+@pytest.fixture
+def rice_csv(tmp_path):
+    path = tmp_path / "rice.csv"
+    datasets.rice_frame(500, np.random.default_rng(0)).to_csv(path, index=False)
+    return path
+
+
+def test_load_rice_parses_into_the_schema_dtypes(rice_csv):
+    frame = datasets.load_rice(str(rice_csv))
+    assert list(frame.columns) == list(datasets.RICE_SCHEMA)
+    assert {
+        name: str(dtype) for name, dtype in frame.dtypes.items()
+    } == datasets.RICE_SCHEMA
+    expected = pd.read_csv(rice_csv)
+    for name in frame.columns:
+        if name == "Class":
+            assert frame[name].tolist() == expected[name].tolist()
+        else:
+            assert np.allclose(frame[name], expected[name], rtol=1e-6)
+
+
+def test_second_load_maps_the_cache(rice_csv, monkeypatch):
+    first = datasets.load_rice(str(rice_csv))
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("the CSV was parsed again")
+
+    monkeypatch.setattr(datasets, "read_csv", no_parsing)
+    second = datasets.load_rice(str(rice_csv))
+    pd.testing.assert_frame_equal(first, second)
+    with pytest.raises(ValueError):
+        # Read-only maps by default.
+        second["Area"].to_numpy()[0] = 1
+
+
+def test_edited_csv_is_parsed_again(rice_csv):
+    first = datasets.load_rice(str(rice_csv))
+    frame = pd.read_csv(rice_csv)
+    frame.loc[0, "Area"] += 1
+    frame.to_csv(rice_csv, index=False)
+    second = datasets.load_rice(str(rice_csv))
+    assert second["Area"].iloc[0] == first["Area"].iloc[0] + 1
+
+
+def test_downcast_without_schema(tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"x": [1.5, 2.5], "n": [1, 2], "label": ["a", "b"]}).to_csv(
+        path, index=False
+    )
+    frame = datasets.load_dataset(str(path), cache_dir=str(tmp_path / "cache"))
+    assert [str(dtype) for dtype in frame.dtypes] == ["float32", "int32", "category"]
+
+
+def test_save_frame_keeps_an_existing_cache(tmp_path):
+    frame = datasets.downcast(pd.DataFrame({"x": [1.0, 2.0]}))
+    directory = str(tmp_path / "entry")
+    datasets.save_frame(frame, directory)
+    datasets.save_frame(datasets.downcast(pd.DataFrame({"x": [3.0, 4.0]})), directory)
+    assert datasets.load_frame(directory)["x"].tolist() == [1.0, 2.0]
+    assert [p.name for p in tmp_path.iterdir()] == ["entry"]
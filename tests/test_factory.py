@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from factory import (
+    AsyncProductPool,
+    ConcreteProduct1,
+    PooledCreator1,
+    ProductPool,
+)
+
+
+def test_pool_reuses_products():
+    pool = ProductPool(ConcreteProduct1, max_size=2)
+    with pool.product() as first:
+        pass
+    with pool.product() as second:
+        assert second is first
+    assert pool.created == 1
+    assert pool.in_use == 0
+
+
+def test_pool_never_exceeds_max_size():
+    pool = ProductPool(ConcreteProduct1, max_size=2)
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+    pool.release(first)
+    assert pool.acquire(timeout=0.01) is first
+    assert pool.created == 2
+    pool.release(second)
+
+
+def test_timeout_is_a_deadline_across_wakeups():
+    pool = ProductPool(ConcreteProduct1, max_size=1)
+    held = pool.acquire()
+    stop = threading.Event()
+
+    def wake():
+        # Wakeups that find no product free, as when another borrower wins the
+        # race for a released one.
+        while not stop.wait(0.01):
+            with pool._available:
+                pool._available.notify_all()
+
+    waker = threading.Thread(target=wake)
+    waker.start()
+    start = time.monotonic()
+    try:
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0.1)
+    finally:
+        stop.set()
+        waker.join()
+    assert time.monotonic() - start < 0.5
+    pool.release(held)
+
+
+def test_failing_factory_frees_its_slot():
+    calls = []
+
+    def factory():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("setup failed")
+        return ConcreteProduct1()
+
+    pool = ProductPool(factory, max_size=1)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    assert isinstance(pool.acquire(timeout=0.01), ConcreteProduct1)
+
+
+def test_pooled_creator_operates_on_pooled_products():
+    creator = PooledCreator1(max_size=2)
+    assert "ConcreteProduct1" in creator.some_operation()
+    assert creator.pool.created == 1
+
+
+class ResetProduct(ConcreteProduct1):
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+def test_async_pool_caps_products_and_waits_for_a_release():
+    async def main():
+        pool = AsyncProductPool(ResetProduct, max_size=2)
+        first, second = await pool.acquire(), await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        assert pool.created == 2
+        pool.release(first)
+        assert await asyncio.wait_for(waiter, 1) is first
+        assert first.resets == 1
+        assert pool.high_water_mark == 2
+        pool.release(first)
+        pool.release(second)
+        assert pool.in_use == 0
+
+    asyncio.run(main())
+
+
+def test_async_pool_reuses_and_resets_products():
+    async def main():
+        pool = AsyncProductPool(ResetProduct, max_size=2)
+        async with pool.product() as first:
+            pass
+        async with pool.product() as second:
+            assert second is first
+        assert first.resets == 2
+        assert pool.created == 1
+
+    asyncio.run(main())
+
+
+def test_async_pool_release_before_acquire_is_an_error():
+    pool = AsyncProductPool(ResetProduct)
+    with pytest.raises(RuntimeError, match="matching acquire"):
+        pool.release(ResetProduct())
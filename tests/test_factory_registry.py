@@ -0,0 +1,50 @@
+import json
+import sys
+
+import pytest
+
+from af_example import DarkThemeFactory, LightThemeFactory
+from factory_registry import FactoryRegistry, themes
+
+
+def test_register_decorator():
+    registry = FactoryRegistry("theme")
+
+    @registry.register("light")
+    class Factory(LightThemeFactory):
+        pass
+
+    assert isinstance(registry.get("light"), Factory)
+    assert registry.get("light") is registry.get("light")
+    assert "light" in registry and registry.names() == ["light"]
+
+
+def test_string_targets_are_imported_on_first_use(tmp_path, monkeypatch):
+    (tmp_path / "lazy_theme.py").write_text(
+        "from af_example import DarkThemeFactory\n"
+        "class LazyFactory(DarkThemeFactory):\n"
+        "    pass\n"
+    )
+    config = tmp_path / "themes.json"
+    config.write_text(json.dumps({"lazy": "lazy_theme:LazyFactory"}))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazy_theme", raising=False)
+    registry = FactoryRegistry("theme")
+    registry.load_config(str(config))
+    assert "lazy_theme" not in sys.modules
+    factory = registry.get("lazy")
+    assert type(factory).__name__ == "LazyFactory"
+    assert "lazy_theme" in sys.modules
+
+
+def test_re_adding_a_family_replaces_it():
+    registry = FactoryRegistry("theme")
+    registry.add("theme", LightThemeFactory)
+    assert isinstance(registry.get("theme"), LightThemeFactory)
+    registry.add("theme", DarkThemeFactory)
+    assert isinstance(registry.get("theme"), DarkThemeFactory)
+
+
+def test_unknown_family_lists_the_known_ones():
+    with pytest.raises(LookupError, match="known: dark, light"):
+        themes.get("sepia")
@@ -0,0 +1,50 @@
+import asyncio
+
+from aiohttp.test_utils import TestServer
+
+from fetch import FetchClient, FetchResult, make_app
+
+
+async def _with_server(test, **kwargs):
+    server = TestServer(make_app(**kwargs))
+    await server.start_server()
+    try:
+        return await test(f"http://127.0.0.1:{server.port}")
+    finally:
+        await server.close()
+
+
+def test_fetch_all_streams_every_body():
+    async def test(base):
+        urls = [f"{base}/item/{n}" for n in range(30)]
+        chunks = []
+        async with FetchClient(limit_per_host=5, chunk_size=100) as client:
+            results = await client.fetch_all(urls, concurrency=10)
+            one = await client.fetch(urls[0], on_chunk=chunks.append)
+        assert [result.url for result in results] == urls
+        assert all(result.ok and result.size == 1_000 for result in results)
+        assert b"".join(chunks) == b"x" * 1_000
+
+    asyncio.run(_with_server(test, payload_size=1_000))
+
+
+def test_failures_are_reported_not_raised():
+    async def test(base):
+        async with FetchClient() as client:
+            timed_out = await client.fetch(f"{base}/item/1", timeout=0.01)
+            missing = await client.fetch(f"{base}/nothing")
+        assert not timed_out.ok and "TimeoutError" in timed_out.error
+        assert missing.status == 404 and not missing.ok
+
+    asyncio.run(_with_server(test, delay=0.5))
+
+
+def test_session_needs_start():
+    client = FetchClient()
+    try:
+        client.session
+    except RuntimeError as error:
+        assert "async with" in str(error)
+    else:
+        raise AssertionError("expected RuntimeError")
+    assert FetchResult("u", 200, 0, 0.0).ok
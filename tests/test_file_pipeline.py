@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from cpu_executor import HybridExecutor
+from file_pipeline import parse_line, process_file, process_file_naive
+
+LOG = (
+    b"10.0.0.1 GET /a 200 100\n"
+    b"10.0.0.2 POST /b 500 20\n"
+    b"10.0.0.3 GET /c OK 30\n"
+    b"10.0.0.4 GET /d 404 -\n"
+    b"10.0.0.5 GET /\xff 200 40\n"
+    b"not a log line\n"
+    b"10.0.0.6 PUT /e 503 7"
+)
+
+
+def test_parse_line():
+    assert parse_line(b"10.0.0.1 GET /a 200 100") == ("GET", "/a", 200, 100)
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        b"10.0.0.3 GET /c OK 30",
+        b"10.0.0.4 GET /d 404 -",
+        b"10.0.0.5 GET /\xff 200 40",
+        b"10.0.0.5 \xfe /e 200 40",
+        b"not a log line",
+        b"",
+    ],
+)
+def test_malformed_lines_are_skipped(line):
+    assert parse_line(line) is None
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1024])
+def test_pipeline_matches_naive_reader(tmp_path, chunk_size):
+    source = tmp_path / "access.log"
+    source.write_bytes(LOG)
+    expected = process_file_naive(str(source), str(tmp_path / "naive.out"))
+    result = asyncio.run(
+        process_file(str(source), str(tmp_path / "pipeline.out"), chunk_size=chunk_size)
+    )
+    assert result == expected
+    assert result[0] == {200: 1, 500: 1, 503: 1}
+    output = (tmp_path / "pipeline.out").read_bytes()
+    assert output == (tmp_path / "naive.out").read_bytes()
+    assert output.startswith(b"10.0.0.2 POST /b 500 20\n10.0.0.6 PUT /e 503 7\n")
+
+
+def parse_slowly(line: bytes):
+    # Early batches take longest, so workers finish them last.
+    if b" /a " in line or b" /b " in line:
+        time.sleep(0.2)
+    return parse_line(line)
+
+
+def test_parallel_workers_keep_file_order(tmp_path):
+    source = tmp_path / "access.log"
+    source.write_bytes(LOG)
+    expected = process_file_naive(str(source), str(tmp_path / "naive.out"))
+    executor = HybridExecutor(max_workers=4)
+    try:
+        result = asyncio.run(
+            process_file(
+                str(source),
+                str(tmp_path / "pipeline.out"),
+                parse=parse_slowly,
+                workers=4,
+                chunk_size=16,
+                executor=executor,
+            )
+        )
+    finally:
+        executor.shutdown()
+    assert result == expected
+    output = (tmp_path / "pipeline.out").read_bytes()
+    assert output == (tmp_path / "naive.out").read_bytes()
@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+import pytest
+
+from af_car import DarkCarFactory, WhiteCarFactory
+from fleet import DARK, DRIVING, SEDAN, SUV, WHITE, Fleet, Vehicle, step_objects
+
+
+@pytest.fixture
+def fleet():
+    return Fleet.from_factories({WhiteCarFactory(): (3, 2), DarkCarFactory(): (1, 4)})
+
+
+def test_fleet_is_built_from_factories(fleet):
+    assert len(fleet) == 10
+    assert fleet.count(kind=SUV, colour=WHITE) == 3
+    assert fleet.count(kind=SEDAN, colour=DARK) == 4
+    assert fleet[0].drive() == WhiteCarFactory().create_suv().drive()
+    assert fleet[-1].drive() == DarkCarFactory().create_sedan().drive()
+    assert fleet[0].product is fleet[1].product
+    with pytest.raises(IndexError):
+        fleet[10]
+
+
+def test_step_moves_driving_vehicles_only(fleet):
+    start = [fleet[n].position for n in range(len(fleet))]
+    parked = np.zeros(len(fleet), dtype=bool)
+    parked[0] = True
+    fleet.park(parked)
+    fleet.step(dt=2.0)
+    assert fleet[0].position == start[0] and fleet[0].odometer == 0
+    for n in range(1, len(fleet)):
+        record = fleet[n].record
+        assert record["state"] == DRIVING
+        assert fleet[n].odometer == pytest.approx(2 * record["speed"])
+        (x0, y0), (x1, y1) = start[n], fleet[n].position
+        assert math.hypot(x1 - x0, y1 - y0) == pytest.approx(
+            fleet[n].odometer, rel=1e-3
+        )
+
+
+def test_vectorized_step_matches_objects(fleet):
+    vehicles = [
+        Vehicle(
+            view.product,
+            *view.position,
+            float(view.record["heading"]),
+            float(view.record["speed"])
+        )
+        for view in (fleet[n] for n in range(len(fleet)))
+    ]
+    fleet.step(dt=1.0)
+    step_objects(vehicles, 1.0, math.cos, math.sin)
+    for n, vehicle in enumerate(vehicles):
+        assert fleet[n].position == pytest.approx((vehicle.x, vehicle.y), abs=0.01)
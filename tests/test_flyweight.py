@@ -0,0 +1,34 @@
+from af_example import LightThemeFactory
+from factory import ConcreteCreator1
+from flyweight import flyweight, intern, intern_product, is_stateless
+
+
+class Stateful:
+    def __init__(self):
+        self.value = 0
+
+
+def test_flyweight_factory_shares_stateless_products():
+    factory = flyweight(LightThemeFactory)()
+    assert factory.create_button() is factory.create_button()
+    assert factory.create_button() is not factory.create_checkbox()
+    assert type(factory.create_button()) is type(LightThemeFactory().create_button())
+    assert flyweight(LightThemeFactory) is type(factory)
+
+
+def test_flyweight_creator():
+    creator = flyweight(ConcreteCreator1)()
+    assert creator.factory_method() is creator.factory_method()
+    assert "ConcreteProduct1" in creator.some_operation()
+
+
+def test_stateful_products_are_never_shared():
+    product = Stateful()
+    assert not is_stateless(product)
+    assert intern_product(product) is product
+    assert intern_product(Stateful()) is not product
+
+
+def test_intern_by_class_and_arguments():
+    assert intern(frozenset, (1, 2)) is intern(frozenset, (1, 2))
+    assert intern(frozenset, (1, 2)) is not intern(frozenset, (1, 3))
@@ -0,0 +1,67 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from inference import Classifier, MicroBatcher
+from preprocessing import ZScore
+
+
+@pytest.fixture
+def classifier():
+    scaler = ZScore(mean={"a": 1.0, "b": 2.0}, std={"a": 2.0, "b": 4.0})
+    return Classifier(
+        ["a", "b"], [1.0, -1.0], 0.5, scaler, threshold=0.4, classes=("no", "yes")
+    )
+
+
+def test_predict_standardizes_then_applies_the_unit(classifier):
+    rows = np.array([[1.0, 2.0], [5.0, 2.0]], dtype=np.float32)
+    expected = 1 / (1 + np.exp(-np.array([0.5, 2.5])))
+    np.testing.assert_allclose(classifier.predict(rows), expected, rtol=1e-6)
+    assert classifier.label(0.41) == "yes"
+    assert classifier.label(0.4) == "no"
+    assert classifier.row({"b": "2", "a": 1}).tolist() == [1.0, 2.0]
+
+
+def test_save_and_load_round_trip(classifier, tmp_path):
+    path = str(tmp_path / "model.json")
+    classifier.save(path)
+    loaded = Classifier.load(path)
+    rows = np.random.default_rng(0).normal(size=(10, 2)).astype(np.float32)
+    np.testing.assert_array_equal(loaded.predict(rows), classifier.predict(rows))
+    assert loaded.classes == ("no", "yes") and loaded.threshold == 0.4
+
+
+def test_micro_batcher_batches_concurrent_rows(classifier):
+    async def main():
+        batcher = MicroBatcher(classifier.predict, max_batch=16, max_wait=0.05)
+        batcher.start()
+        try:
+            rows = [np.array([n, 0], dtype=np.float32) for n in range(40)]
+            results = await asyncio.gather(*(batcher.submit(row) for row in rows))
+        finally:
+            await batcher.stop()
+        np.testing.assert_allclose(
+            results, classifier.predict(np.stack(rows)), rtol=1e-6
+        )
+        assert batcher.rows == 40
+        assert batcher.batches == 3
+
+    asyncio.run(main())
+
+
+def test_micro_batcher_fails_the_batch_on_error():
+    def predict(rows):
+        raise RuntimeError("model down")
+
+    async def main():
+        batcher = MicroBatcher(predict)
+        batcher.start()
+        try:
+            with pytest.raises(RuntimeError, match="model down"):
+                await batcher.submit(np.zeros(2, dtype=np.float32))
+        finally:
+            await batcher.stop()
+
+    asyncio.run(main())
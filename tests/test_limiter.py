@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from limiter import (
+    AIMDLimiter,
+    FixedLimiter,
+    GradientLimiter,
+    Overloaded,
+    Retry,
+    TokenBucket,
+    compose,
+)
+
+
+async def _ok():
+    return "ok"
+
+
+def _raising(error):
+    async def job():
+        raise error
+
+    return job
+
+
+def test_limiter_caps_jobs_in_flight():
+    limiter = FixedLimiter(3)
+    running = peak = 0
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def main():
+        await asyncio.gather(*(limiter.run(job) for _ in range(20)))
+
+    asyncio.run(main())
+    assert peak == 3
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.parametrize(
+    "error", [Overloaded(503), asyncio.TimeoutError(), ConnectionResetError()]
+)
+def test_overload_errors_shrink_the_limit(error):
+    limiter = AIMDLimiter(limit=10, backoff=0.5)
+    with pytest.raises(type(error)):
+        asyncio.run(limiter.run(_raising(error)))
+    assert limiter.limit == 5
+
+
+def test_application_errors_leave_the_limit_alone():
+    limiter = AIMDLimiter(limit=10, backoff=0.5)
+    with pytest.raises(KeyError):
+        asyncio.run(limiter.run(_raising(KeyError("missing"))))
+    assert limiter.limit >= 10
+    assert limiter.in_flight == 0
+
+
+def test_errors_choose_what_counts_as_overload():
+    limiter = AIMDLimiter(limit=10, backoff=0.5, errors=(KeyError,))
+    with pytest.raises(KeyError):
+        asyncio.run(limiter.run(_raising(KeyError("missing"))))
+    assert limiter.limit == 5
+
+
+def test_gradient_limiter_backs_off_on_overload():
+    limiter = GradientLimiter(limit=100, smoothing=1.0)
+
+    async def main():
+        # One window of requests, all of them turned away.
+        for _ in range(100):
+            with pytest.raises(Overloaded):
+                await limiter.run(_raising(Overloaded(503)))
+
+    asyncio.run(main())
+    # limit * 0.5 + sqrt(limit)
+    assert limiter.limit == 60
+
+
+def test_cancelled_waiter_passes_its_slot_on():
+    limiter = FixedLimiter(1)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+
+        holder = asyncio.ensure_future(limiter.run(hold))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(limiter.run(_ok))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await holder
+        assert await asyncio.wait_for(limiter.run(_ok), 1) == "ok"
+
+    asyncio.run(main())
+    assert limiter.in_flight == 0
+
+
+def test_token_bucket_paces_jobs():
+    bucket = TokenBucket(rate=100, burst=1)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(bucket.run(_ok) for _ in range(6)))
+        return loop.time() - start
+
+    assert asyncio.run(main()) >= 0.045
+
+
+def test_token_bucket_refunds_cancelled_reservations():
+    bucket = TokenBucket(rate=10, burst=1)
+
+    async def main():
+        await bucket.acquire()
+        waiters = [asyncio.ensure_future(bucket.acquire()) for _ in range(5)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(main())
+    # Only the token taken by the first acquire() is missing.
+    assert bucket.tokens == pytest.approx(0, abs=0.05)
+
+
+def test_retry_retries_overloads_only():
+    attempts = []
+
+    async def flaky():
+        attempts.append(None)
+        if len(attempts) < 3:
+            raise Overloaded(429)
+        return "ok"
+
+    retry = Retry(attempts=3, base=0.001, seed=0)
+    assert asyncio.run(retry.run(flaky)) == "ok"
+    assert retry.retries == 2
+    with pytest.raises(KeyError):
+        asyncio.run(retry.run(_raising(KeyError("missing"))))
+    assert retry.retries == 2
+
+
+def test_compose_runs_the_first_policy_outermost():
+    calls = []
+
+    class Record:
+        def __init__(self, name):
+            self.name = name
+
+        async def run(self, job):
+            calls.append(self.name)
+            return await job()
+
+    assert asyncio.run(compose(Record("a"), Record("b")).run(_ok)) == "ok"
+    assert calls == ["a", "b"]
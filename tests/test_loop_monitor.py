@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import pytest
+
+from loop_monitor import LagHistogram, LoopMonitor, running_task
+
+
+def test_histogram_percentiles_within_bucket_growth():
+    histogram = LagHistogram(growth=1.1)
+    for n in range(1, 1001):
+        histogram.record(n / 1000)
+    assert histogram.count == 1000
+    assert histogram.max == 1.0
+    assert histogram.percentile(50) == pytest.approx(0.5, rel=0.1)
+    assert histogram.percentile(100) == 1.0
+
+
+def test_monitor_reports_a_blocking_call():
+    async def main():
+        monitor = LoopMonitor(interval=0.01, threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(main())
+    assert len(monitor.slow_callbacks) == 1
+    slow = monitor.slow_callbacks[0]
+    assert slow.duration == pytest.approx(0.3, abs=0.1)
+    assert "time.sleep(0.3)" in slow.stack
+    assert monitor.lag.max >= 0.2
+    assert slow.task.startswith("Task-")
+    assert "main" in slow.task
+
+
+def test_running_task_without_asyncio_internals(monkeypatch):
+    async def main():
+        loop = asyncio.get_running_loop()
+        named = running_task(loop)
+        monkeypatch.delattr(asyncio.tasks, "_current_tasks", raising=False)
+        return named, running_task(loop)
+
+    named, fallback = asyncio.run(main())
+    assert named.endswith("<locals>.main)")
+    assert fallback == "<callback>"
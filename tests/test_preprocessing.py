@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import datasets
+from preprocessing import (
+    RICE_FEATURES,
+    Dataset,
+    ZScore,
+    copy_free_pipeline,
+    notebook_pipeline,
+    shuffle_split,
+)
+
+
+@pytest.fixture
+def rice():
+    return datasets.rice_frame(1_000, np.random.default_rng(0))
+
+
+def test_from_frame_maps_the_positive_class(rice):
+    data = Dataset.from_frame(rice, RICE_FEATURES, "Class", positive="Cammeo")
+    assert np.array_equal(data.labels == 1, rice["Class"].to_numpy() == "Cammeo")
+    assert np.array_equal(data.column("Area"), rice["Area"].to_numpy())
+    assert data.matrix.shape == (1_000, len(RICE_FEATURES))
+
+
+def test_shuffle_split_sizes_and_shared_block(rice):
+    data = Dataset.from_frame(rice, RICE_FEATURES, "Class", positive="Cammeo")
+    total = data.labels.sum()
+    train, validation, test = shuffle_split(data, seed=1)
+    assert [len(train), len(validation), len(test)] == [800, 100, 100]
+    assert np.shares_memory(train.block, data.block)
+    # Rows moved together: the labels are the same multiset.
+    assert data.labels.sum() == total
+
+
+def test_zscore_normalizes_and_round_trips(rice):
+    data = Dataset.from_frame(rice, RICE_FEATURES, "Class", positive="Cammeo")
+    scaler = ZScore().fit(data)
+    raw = {"Area": data.column("Area").copy()}
+    scaler.transform(data)
+    assert abs(float(data.column("Area").mean())) < 1e-3
+    assert float(data.column("Area").std(ddof=1)) == pytest.approx(1, abs=1e-3)
+    restored = ZScore.from_json(scaler.to_json())
+    assert np.allclose(
+        restored.transform_inputs(raw)["Area"], data.column("Area"), atol=1e-5
+    )
+
+
+def test_pipelines_produce_the_same_splits(rice):
+    features = ["Eccentricity", "Major_Axis_Length", "Area"]
+    notebook = notebook_pipeline(rice, features)
+    copy_free = copy_free_pipeline(rice, features)
+    assert [len(labels) for _, labels in notebook] == [
+        len(labels) for _, labels in copy_free
+    ]
+    for (_, expected), (inputs, labels) in zip(notebook, copy_free):
+        assert set(inputs) == set(features)
+        assert set(np.unique(labels)) <= {0.0, 1.0}
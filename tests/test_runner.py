@@ -0,0 +1,89 @@
+import asyncio
+import gc
+import itertools
+
+import pytest
+
+from runner import BoundedRunner
+
+
+async def _value(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _fail(message, delay=0.0):
+    await asyncio.sleep(delay)
+    raise RuntimeError(message)
+
+
+def test_results_in_input_order_with_bounded_concurrency():
+    running = 0
+    peak = 0
+
+    async def job(n):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001 * (n % 3))
+        running -= 1
+        return n * n
+
+    results = asyncio.run(BoundedRunner(limit=4).run(job(n) for n in range(20)))
+    assert [result.value for result in results] == [n * n for n in range(20)]
+    assert peak == 4
+
+
+def test_first_failure_cancels_the_group():
+    cancelled = []
+
+    async def slow(n):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+
+    jobs = [_fail("boom", 0.01)] + [slow(n) for n in range(3)]
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(BoundedRunner(limit=4).run(jobs))
+    assert sorted(cancelled) == [0, 1, 2]
+
+
+def test_simultaneous_failures_are_all_retrieved():
+    unretrieved = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: unretrieved.append(context)
+        )
+        jobs = [_fail(f"boom {n}") for n in range(5)]
+        with pytest.raises(RuntimeError):
+            await BoundedRunner(limit=5).run(jobs)
+
+    asyncio.run(main())
+    # Tasks whose exception was never fetched report it when collected.
+    gc.collect()
+    assert unretrieved == []
+
+
+def test_infinite_source_is_closed_not_drained():
+    closed = []
+
+    def jobs():
+        try:
+            for n in itertools.count():
+                yield lambda n=n: _fail("stop") if n == 3 else _value(n)
+        finally:
+            closed.append(True)
+
+    with pytest.raises(RuntimeError, match="stop"):
+        asyncio.run(asyncio.wait_for(BoundedRunner(limit=2).run(jobs()), 5))
+    assert closed == [True]
+
+
+def test_unscheduled_coroutines_are_closed():
+    jobs = [_fail("stop")] + [_value(n, 1) for n in range(5)]
+    with pytest.raises(RuntimeError):
+        asyncio.run(BoundedRunner(limit=1).run(jobs))
+    assert all(job.cr_frame is None for job in jobs[1:])
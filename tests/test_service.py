@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from service import flask_app, quart_app
+
+
+@pytest.fixture
+def flask_client():
+    return flask_app.test_client()
+
+
+def quart_get(path):
+    async def get():
+        response = await quart_app.test_client().get(path)
+        return response.status_code, await response.get_json()
+
+    return asyncio.run(get())
+
+
+def test_flask_health(flask_client):
+    response = flask_client.get("/health")
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok"}
+
+
+def test_flask_query_and_fanout(flask_client):
+    assert flask_client.get("/query?ms=1").get_json() == {"rows": 1, "waited": 0.001}
+    assert flask_client.get("/fanout?ms=1&n=4").get_json() == {
+        "rows": 4,
+        "waited": 0.004,
+    }
+
+
+@pytest.mark.parametrize("query", ["ms=abc", "ms=-5", "ms=1&n=x", "n=-1"])
+def test_flask_rejects_bad_arguments(flask_client, query):
+    assert flask_client.get(f"/query?{query}").status_code == 400
+    assert flask_client.get(f"/fanout?{query}").status_code == 400
+
+
+def test_quart_health():
+    assert quart_get("/health") == (200, {"status": "ok"})
+
+
+def test_quart_query_and_fanout():
+    assert quart_get("/query?ms=1") == (200, {"rows": 1, "waited": 0.001})
+    # Concurrent queries: the fan-out waits as long as one of them.
+    assert quart_get("/fanout?ms=1&n=4") == (200, {"rows": 4, "waited": 0.001})
+
+
+@pytest.mark.parametrize("query", ["ms=abc", "ms=-5", "ms=1&n=x", "n=-1"])
+def test_quart_rejects_bad_arguments(query):
+    assert quart_get(f"/query?{query}")[0] == 400
+    assert quart_get(f"/fanout?{query}")[0] == 400
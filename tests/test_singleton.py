@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from singleton import Multiton, SingletonMeta, ThreadSafeSingleton
+
+
+def test_thread_safe_singleton_is_built_once_under_contention():
+    class Pool(ThreadSafeSingleton):
+        created = 0
+
+        def __init__(self):
+            Pool.created += 1
+
+    with ThreadPoolExecutor(16) as executor:
+        instances = list(executor.map(lambda _: Pool(), range(200)))
+    assert Pool.created == 1
+    assert all(instance is instances[0] for instance in instances)
+
+
+def test_each_class_has_its_own_instance():
+    class A(metaclass=SingletonMeta):
+        pass
+
+    class B(metaclass=SingletonMeta):
+        pass
+
+    assert A() is A() and B() is B()
+    assert A() is not B()
+
+
+def test_multiton_one_instance_per_key_held_weakly():
+    class Host(Multiton):
+        def __init__(self, host, port=6379):
+            self.address = (host, port)
+
+    first = Host("a")
+    assert Host("a") is first
+    assert Host("a", port=1) is not first
+    assert Host("b") is not first
+    del first
+    # Nothing references the instances any more, so their keys are gone.
+    assert len(Host._instances) == 0
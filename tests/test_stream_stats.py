@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import datasets
+from stream_stats import StreamStats, iter_chunks, scan, scan_cache, scan_csv
+
+
+@pytest.fixture(scope="module")
+def taxi():
+    frame = datasets.taxi_frame(5_000, np.random.default_rng(0))
+    frame.loc[::50, "TIPS"] = np.nan
+    return frame
+
+
+def _assert_matches_pandas(stats, frame):
+    numeric = frame.select_dtypes("number")
+    pd.testing.assert_series_equal(stats.mean(), numeric.mean(), check_names=False)
+    pd.testing.assert_series_equal(stats.std(), numeric.std(), check_names=False)
+    pd.testing.assert_series_equal(
+        stats.max(), numeric.max().astype(np.float64), check_names=False
+    )
+    pd.testing.assert_frame_equal(stats.corr(), numeric.corr(), atol=1e-9)
+    assert stats.isnull().to_dict() == frame.isnull().sum().to_dict()
+    assert stats.nunique()["COMPANY"] == frame["COMPANY"].nunique()
+    top = frame["PAYMENT_TYPE"].value_counts()
+    assert stats.value_counts("PAYMENT_TYPE", 1).to_dict() == {
+        top.index[0]: top.iloc[0]
+    }
+
+
+def test_chunked_scan_matches_pandas(taxi):
+    _assert_matches_pandas(scan(taxi, chunk_rows=777), taxi)
+
+
+def test_merged_scans_match_a_single_scan(taxi):
+    halves = [scan(part) for part in iter_chunks(taxi, 2_000)]
+    merged = halves[0]
+    for other in halves[1:]:
+        merged.merge(other)
+    _assert_matches_pandas(merged, taxi)
+
+
+def test_quantiles_are_exact_below_the_sample_size(taxi):
+    stats = scan(taxi, sample_size=10_000)
+    expected = taxi.select_dtypes("number").quantile([0.25, 0.5, 0.75])
+    pd.testing.assert_frame_equal(
+        stats.quantile([0.25, 0.5, 0.75]), expected, rtol=1e-3
+    )
+
+
+def test_frequencies_switch_to_estimates_past_capacity():
+    frame = pd.DataFrame({"id": [f"user{n}" for n in range(5_000)] + ["hot"] * 3_000})
+    stats = scan(frame, capacity=100)
+    assert stats.nunique()["id"] == pytest.approx(5_001, rel=0.05)
+    assert stats.value_counts("id", 1).index[0] == "hot"
+
+
+def test_describe_has_pandas_rows(taxi):
+    table = scan(taxi).describe()
+    assert list(table.index[:1]) == ["count"]
+    assert {"mean", "std", "min", "25%", "50%", "75%", "max", "unique", "top"} <= set(
+        table.index
+    )
+
+
+def test_scan_csv_and_cache(taxi, tmp_path):
+    path = tmp_path / "taxi.csv"
+    taxi.to_csv(path, index=False)
+    from_csv = scan_csv(str(path), chunk_rows=1_000)
+    assert from_csv.rows == len(taxi)
+    pd.testing.assert_series_equal(from_csv.mean(), scan(taxi).mean(), rtol=1e-9)
+
+    cache = tmp_path / "cache"
+    datasets.save_frame(datasets.read_csv(str(path), datasets.TAXI_SCHEMA), str(cache))
+    stats = scan_cache(str(cache), workers=2, seed=0)
+    frame = datasets.load_frame(str(cache))
+    assert stats.rows == len(taxi)
+    pd.testing.assert_series_equal(
+        stats.mean(), frame.select_dtypes("number").mean(), check_names=False, rtol=1e-6
+    )
+
+
+def test_empty_stats():
+    stats = StreamStats(["a"], ["a"])
+    assert stats.rows == 0
+    assert np.isnan(stats.mean()["a"])
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import datasets
+from sweep import ExperimentSettings, grid, label_values, run_sweep, train
+
+
+@pytest.fixture(scope="module")
+def rice():
+    return datasets.rice_frame(2_000, np.random.default_rng(0))
+
+
+def test_grid_expands_every_combination():
+    settings = grid(
+        learning_rate=[0.001, 0.01],
+        batch_size=[50, 500],
+        number_epochs=[5],
+        input_features=[["Area"]],
+    )
+    assert len(settings) == 4
+    assert settings[0].input_features == ("Area",)
+
+
+def test_label_values_maps_the_positive_class(rice):
+    labels = label_values(rice["Class"], positive="Cammeo")
+    assert set(np.unique(labels)) == {0.0, 1.0}
+    assert np.array_equal(labels == 1, rice["Class"].to_numpy() == "Cammeo")
+    plain = label_values(rice["Class"].astype(str), positive="Osmancik")
+    assert np.array_equal(plain, 1 - labels)
+
+
+def test_class_name_labels_without_positive_are_rejected(rice):
+    settings = ExperimentSettings(0.01, 1, 100, ["Area"])
+    with pytest.raises(ValueError, match="positive="):
+        train(
+            settings, {"Area": rice["Area"].to_numpy()}, rice["Class"].to_numpy(), True
+        )
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_classification_sweep(rice, workers):
+    settings = grid(
+        learning_rate=[0.01],
+        batch_size=[100],
+        number_epochs=[10],
+        input_features=[["Eccentricity", "Major_Axis_Length"]],
+        classification_threshold=[0.5],
+    )
+    frame = rice.copy()
+    for name in settings[0].input_features:
+        column = frame[name]
+        frame[name] = (column - column.mean()) / column.std()
+    table, experiments = run_sweep(
+        frame, "Class", settings, workers=workers, classifier=True, positive="Cammeo"
+    )
+    assert [e.status for e in experiments] == ["completed"]
+    final = table.iloc[-1]
+    assert final["accuracy"] > 0.8
+    assert final["loss"] < table.iloc[0]["loss"]
+
+
+def test_regression_sweep_marks_divergent_runs():
+    frame = datasets.taxi_frame(2_000, np.random.default_rng(0))
+    settings = grid(
+        learning_rate=[0.01, 1000.0],
+        batch_size=[50],
+        number_epochs=[20],
+        input_features=[["TRIP_MILES"]],
+    )
+    table, experiments = run_sweep(frame, "FARE", settings, workers=0)
+    assert experiments[0].status == "completed"
+    assert experiments[1].status == "diverged"
+    assert set(table["experiment"]) == {e.name for e in experiments}
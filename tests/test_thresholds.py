@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from thresholds import ThresholdSweep, evaluate, make_predictions
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_at_matches_per_threshold_evaluation(dtype):
+    scores, labels = make_predictions(5_000)
+    scores = scores.astype(dtype)
+    sweep = ThresholdSweep.from_scores(scores, labels)
+    for threshold in (0.0, 0.2, 0.35, 0.5, float(scores[7]), 0.99, 1.0):
+        assert sweep.at(threshold) == evaluate(scores, labels, threshold)
+
+
+@pytest.mark.parametrize("objective", ["f1", "accuracy", "youden"])
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_best_threshold_uses_the_same_rule_as_at(objective, dtype):
+    scores, labels = make_predictions(5_000)
+    scores = scores.astype(dtype)
+    sweep = ThresholdSweep.from_scores(scores, labels)
+    best = sweep.best(objective)
+    assert sweep.at(best["threshold"]) == best
+    assert evaluate(scores, labels, best["threshold"]) == best
+
+
+def test_best_threshold_with_ties():
+    scores = np.array([0.9, 0.8, 0.8, 0.3, 0.3], dtype=np.float32)
+    labels = np.array([True, True, True, False, False])
+    sweep = ThresholdSweep.from_scores(scores, labels)
+    best = sweep.best("f1")
+    assert best["f1"] == 1.0
+    assert sweep.at(best["threshold"]) == best
+
+
+def test_best_threshold_when_everything_is_positive():
+    scores = np.array([0.9, 0.5, 0.2])
+    sweep = ThresholdSweep.from_scores(scores, np.ones(3, dtype=bool))
+    best = sweep.best("f1")
+    assert best["tp"] == 3
+    assert sweep.at(best["threshold"]) == best
+
+
+def test_binned_best_threshold_uses_the_same_rule_as_at():
+    scores, labels = make_predictions(5_000)
+    batches = (
+        (scores[i : i + 1000], labels[i : i + 1000]) for i in range(0, 5000, 1000)
+    )
+    sweep = ThresholdSweep.from_batches(batches, bins=1000)
+    best = sweep.best("f1")
+    assert sweep.at(best["threshold"]) == best
+    exact = ThresholdSweep.from_scores(scores, labels).best("f1")
+    assert best["f1"] == pytest.approx(exact["f1"], abs=0.01)
+
+
+def test_from_scores_rejects_empty_input():
+    with pytest.raises(ValueError):
+        ThresholdSweep.from_scores(
+            np.array([], dtype=np.float32), np.array([], dtype=bool)
+        )
+
+
+def test_roc_auc_of_a_perfect_ranking():
+    sweep = ThresholdSweep.from_scores(np.array([0.9, 0.8, 0.2, 0.1]), [1, 1, 0, 0])
+    assert sweep.roc_auc() == 1.0
+    assert sweep.average_precision() == 1.0
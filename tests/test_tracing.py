@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from tracing import Tracer, critical_path, traced
+
+
+@traced
+async def leaf(delay):
+    await asyncio.sleep(delay)
+
+
+@traced(name="parent")
+async def parent():
+    await asyncio.gather(asyncio.ensure_future(leaf(0.01)), leaf(0.03))
+
+
+def test_spans_nest_under_their_parents():
+    async def main():
+        async with Tracer() as tracer:
+            await parent()
+        return tracer
+
+    tracer = asyncio.run(main())
+    spans = {span.id: span for span in tracer.spans()}
+    by_name = {}
+    for span in spans.values():
+        by_name.setdefault((span.name, span.category), []).append(span)
+    (root,) = by_name["parent", "coroutine"]
+    assert root.parent is None
+    # Each call is a coroutine span, and gather() wraps each in a task span.
+    assert len(by_name["leaf", "coroutine"]) == 2
+    assert len(by_name["leaf", "task"]) == 2
+    for span in by_name["leaf", "coroutine"]:
+        # Directly under parent, or under the task that runs it.
+        ancestor = spans[span.parent]
+        while ancestor.id != root.id:
+            ancestor = spans[ancestor.parent]
+    path = [span.name for _, span in critical_path(tracer.spans())]
+    assert path[0] == "parent" and path[-1] == "leaf"
+    events = json.loads(json.dumps(tracer.chrome_trace()))["traceEvents"]
+    assert {event["name"] for event in events} >= {"parent", "leaf"}
+
+
+def test_task_names_are_kept():
+    async def main():
+        async with Tracer() as tracer:
+            task = asyncio.get_running_loop().create_task(leaf(0), name="worker")
+            direct = tracer._create_task(
+                asyncio.get_running_loop(), leaf(0), name="direct"
+            )
+            await asyncio.gather(task, direct)
+        return task.get_name(), direct.get_name()
+
+    assert asyncio.run(main()) == ("worker", "direct")
+
+
+def test_task_factory_arguments_reach_the_previous_factory():
+    received = []
+
+    def factory(loop, coro, **kwargs):
+        received.append(kwargs)
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.set_task_factory(factory)
+        async with Tracer() as tracer:
+            await tracer._create_task(loop, leaf(0), name="worker")
+        loop.set_task_factory(None)
+
+    asyncio.run(main())
+    assert received[-1]["name"] == "worker"
+    assert "context" in received[-1]
+
+
+def test_sampling_drops_whole_trees():
+    async def main():
+        async with Tracer(sample_rate=0.0) as tracer:
+            await parent()
+        return tracer
+
+    assert asyncio.run(main()).spans() == []
+
+
+def test_ring_buffer_keeps_the_newest_spans():
+    async def main():
+        async with Tracer(capacity=4) as tracer:
+            for n in range(10):
+                await leaf(0)
+        return tracer
+
+    tracer = asyncio.run(main())
+    assert len(tracer.spans()) == 4
+    assert tracer.dropped == 6
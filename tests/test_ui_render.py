@@ -0,0 +1,58 @@
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+import ui_render
+from af_example import DarkThemeFactory, LightThemeFactory
+from ui_render import UIRenderer, Widget, build_form, print_per_widget
+
+
+def test_renderer_matches_print_per_widget():
+    tree = build_form(20)
+    for factory in (LightThemeFactory(), DarkThemeFactory()):
+        printed = io.StringIO()
+        with redirect_stdout(printed):
+            print_per_widget(factory, tree)
+        assert UIRenderer(factory).render(tree) == printed.getvalue()
+
+
+def test_render_indents_children_and_shows_props():
+    tree = Widget("panel", children=[Widget("button", label="OK")])
+    button = LightThemeFactory().create_button().paint()
+    assert (
+        UIRenderer(LightThemeFactory()).render(tree)
+        == f"[panel]\n  {button} (label=OK)\n"
+    )
+
+
+def test_theme_switch_renders_with_the_new_theme():
+    tree = build_form(3)
+    renderer = UIRenderer(LightThemeFactory())
+    light = renderer.render(tree)
+    renderer.use_theme(DarkThemeFactory())
+    assert renderer.render(tree) == UIRenderer(DarkThemeFactory()).render(tree)
+    renderer.use_theme(LightThemeFactory())
+    assert renderer.render(tree) == light
+
+
+def test_chunked_write_matches_single_write():
+    tree = build_form(50)
+    renderer = UIRenderer(DarkThemeFactory())
+    whole, chunked = io.StringIO(), io.StringIO()
+    renderer.write(tree, whole)
+    renderer.write(tree, chunked, chunk_lines=7)
+    assert chunked.getvalue() == whole.getvalue()
+
+
+def test_deep_trees_do_not_recurse():
+    tree = Widget("leaf")
+    for _ in range(5_000):
+        tree = Widget("panel", children=[tree])
+    assert UIRenderer(LightThemeFactory()).render(tree).count("\n") == 5_001
+
+
+def test_benchmark_refuses_to_time_different_output(monkeypatch):
+    monkeypatch.setattr(ui_render, "print_per_widget", lambda factory, tree: None)
+    with pytest.raises(RuntimeError, match="output differ"):
+        ui_render.benchmark(widgets=10)
@@ -0,0 +1,332 @@
+"""
+Classification metrics for every threshold at once.
+
+Trying another classification_threshold in the rice notebook means new
+BinaryAccuracy/Precision/Recall metrics and another evaluation pass, for each
+threshold tried. ThresholdSweep gets the confusion matrix of every candidate
+threshold from one pass: with the scores in descending order, the true and
+false positives of "score >= t" are cumulative sums of the labels. Accuracy,
+precision, recall, F1, the ROC and PR curves and their areas all follow from
+those two arrays, and best() picks the threshold that maximizes an objective.
+
+Two ways to build one:
+- from_scores() sorts the scores once and keeps every distinct score as a
+  candidate threshold: exact, and about 25 bytes per prediction while sorting.
+- from_batches() histograms batches of scores in [0, 1] into `bins` buckets
+  and uses the bucket edges as thresholds. It never holds more than a batch and
+  the histogram, so it works for any number of predictions, at a threshold
+  resolution of 1 / bins.
+
+    sweep = ThresholdSweep.from_scores(predictions, test_labels)
+    sweep.best("f1")           # {"threshold": 0.41, "f1": 0.93, ...}
+    sweep.at(0.35)["recall"]   # what a 0.35 threshold would give
+
+at(t) uses Keras' rule, a prediction is positive when score > t, so its numbers
+match keras.metrics.BinaryAccuracy(threshold=t) and friends. best() returns a
+threshold under the same rule, so at(best()["threshold"]) == best().
+"""
+
+from __future__ import annotations
+
+import time
+import tracemalloc
+from typing import Callable, Iterable
+
+import numpy as np
+
+OBJECTIVES: dict[str, Callable] = {
+    "accuracy": lambda tp, fp, fn, tn: (tp + tn) / (tp + fp + fn + tn),
+    "f1": lambda tp, fp, fn, tn: _ratio(2 * tp, 2 * tp + fp + fn),
+    "youden": lambda tp, fp, fn, tn: _ratio(tp, tp + fn) - _ratio(fp, fp + tn),
+}
+
+
+def _ratio(numerator, denominator):
+    # 0 where the denominator is 0, like Keras' precision with no positives.
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(
+        numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0
+    )
+
+
+def summary(threshold: float, tp: int, fp: int, fn: int, tn: int) -> dict:
+    total = tp + fp + fn + tn
+    return {
+        "threshold": threshold,
+        "accuracy": (tp + tn) / total if total else 0.0,
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "f1": 2 * tp / (2 * tp + fp + fn) if tp + fp + fn else 0.0,
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "tn": tn,
+    }
+
+
+def _rank_float32(
+    scores: np.ndarray, labels: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scores in descending order and their labels. Rather than argsort, each
+    score's bits are mapped to an unsigned integer with the same order, the
+    label is appended as the lowest bit, and the keys are sorted in place: one
+    plain integer sort with no index array.
+    """
+    keys = scores.view(np.uint32).astype(np.uint64)
+    negative = keys >= 0x80000000
+    keys[negative] ^= 0xFFFFFFFF
+    keys[~negative] |= 0x80000000
+    del negative
+    keys <<= np.uint64(1)
+    keys |= labels
+    keys.sort()
+    keys = keys[::-1]
+    hits = (keys & np.uint64(1)).astype(bool)
+    bits = (keys >> np.uint64(1)).astype(np.uint32)
+    del keys
+    negative = bits < 0x80000000
+    bits[negative] ^= 0xFFFFFFFF
+    bits[~negative] ^= 0x80000000
+    return bits.view(np.float32), hits
+
+
+class ThresholdSweep:
+    """
+    Confusion counts for descending thresholds: a prediction is positive at
+    thresholds[i] when its score >= thresholds[i], and tp[i] / fp[i] count the
+    positives and negatives that passes.
+    """
+
+    def __init__(
+        self,
+        thresholds: np.ndarray,
+        tp: np.ndarray,
+        fp: np.ndarray,
+        positives: int,
+        negatives: int,
+    ):
+        self.thresholds = thresholds
+        self.tp = tp
+        self.fp = fp
+        self.positives = positives
+        self.negatives = negatives
+
+    @classmethod
+    def from_scores(cls, scores: np.ndarray, labels: np.ndarray) -> ThresholdSweep:
+        scores = np.asarray(scores)
+        labels = np.asarray(labels, dtype=bool)
+        if not len(scores):
+            raise ValueError("from_scores() needs at least one score")
+        if scores.dtype == np.float32:
+            ranked, hits = _rank_float32(scores, labels)
+        else:
+            order = np.argsort(scores)[::-1]
+            ranked, hits = scores[order], labels[order]
+            del order
+        # Last index of each run of equal scores: ties share one threshold.
+        ends = np.append(np.flatnonzero(ranked[1:] != ranked[:-1]), len(ranked) - 1)
+        counts = np.cumsum(hits, dtype=np.int64 if len(hits) >= 2 ** 31 else np.int32)
+        tp = counts[ends].astype(np.int64)
+        fp = ends + 1 - tp
+        positives = int(counts[-1]) if len(counts) else 0
+        return cls(ranked[ends], tp, fp, positives, len(ranked) - positives)
+
+    @classmethod
+    def from_batches(
+        cls, batches: Iterable[tuple[np.ndarray, np.ndarray]], bins: int = 100_000
+    ) -> ThresholdSweep:
+        """
+        Histogram (scores, labels) batches, scores in [0, 1]; thresholds are
+        the bucket edges k / bins.
+        """
+        hits = np.zeros(bins, dtype=np.int64)
+        misses = np.zeros(bins, dtype=np.int64)
+        for scores, labels in batches:
+            buckets = np.clip((np.asarray(scores) * bins).astype(np.int64), 0, bins - 1)
+            labels = np.asarray(labels, dtype=bool)
+            hits += np.bincount(buckets[labels], minlength=bins)
+            misses += np.bincount(buckets[~labels], minlength=bins)
+        tp = np.cumsum(hits[::-1])
+        fp = np.cumsum(misses[::-1])
+        thresholds = np.arange(bins - 1, -1, -1) / bins
+        return cls(thresholds, tp, fp, int(tp[-1]), int(fp[-1]))
+
+    def __len__(self) -> int:
+        return len(self.thresholds)
+
+    def counts(self, index=slice(None)) -> tuple:
+        tp, fp = self.tp[index], self.fp[index]
+        return tp, fp, self.positives - tp, self.negatives - fp
+
+    def metric(self, name: str, index=slice(None)) -> np.ndarray:
+        tp, fp, fn, tn = self.counts(index)
+        if name == "precision":
+            return _ratio(tp, tp + fp)
+        if name in ("recall", "tpr"):
+            return _ratio(tp, tp + fn)
+        if name == "fpr":
+            return _ratio(fp, fp + tn)
+        return OBJECTIVES[name](tp, fp, fn, tn)
+
+    def at(self, threshold: float) -> dict:
+        """
+        Metrics of "positive when score > threshold".
+        """
+        # Thresholds are descending; count those strictly above `threshold`,
+        # compared in the scores' dtype as `scores > threshold` would.
+        limit = np.asarray(threshold, dtype=self.thresholds.dtype)
+        above = len(self) - np.searchsorted(self.thresholds[::-1], limit, side="right")
+        if above == 0:
+            tp = fp = 0
+        else:
+            tp, fp = int(self.tp[above - 1]), int(self.fp[above - 1])
+        fn, tn = self.positives - tp, self.negatives - fp
+        return summary(threshold, tp, fp, fn, tn)
+
+    def best(self, objective: str | Callable = "f1", block: int = 1 << 22) -> dict:
+        """
+        The threshold maximizing `objective`, an OBJECTIVES name or a function
+        of (tp, fp, fn, tn) arrays. Evaluated in blocks of thresholds, so no
+        more than `block` scores are held at once.
+
+        Like at(), the returned threshold means "positive when score >
+        threshold": "score >= thresholds[i]" is reported as the next lower
+        threshold, which no score falls between.
+        """
+        score = OBJECTIVES[objective] if isinstance(objective, str) else objective
+        best_index, best_value = 0, -np.inf
+        for start in range(0, len(self), block):
+            values = score(*self.counts(slice(start, start + block)))
+            index = int(np.argmax(values))
+            if values[index] > best_value:
+                best_index, best_value = start + index, float(values[index])
+        if best_index + 1 < len(self):
+            threshold = self.thresholds[best_index + 1]
+        else:
+            threshold = np.nextafter(self.thresholds[best_index], -np.inf)
+        tp, fp, fn, tn = (int(v) for v in self.counts(best_index))
+        return summary(float(threshold), tp, fp, fn, tn)
+
+    def _points(self, max_points: int | None) -> np.ndarray:
+        if max_points is None or len(self) <= max_points:
+            return np.arange(len(self))
+        return np.unique(np.linspace(0, len(self) - 1, max_points).astype(np.int64))
+
+    def roc_curve(
+        self, max_points: int | None = 10_000
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (fpr, tpr, thresholds), starting from (0, 0). Long curves are thinned to
+        about `max_points` points for plotting.
+        """
+        index = self._points(max_points)
+        fpr = np.concatenate([[0.0], self.metric("fpr", index)])
+        tpr = np.concatenate([[0.0], self.metric("tpr", index)])
+        return fpr, tpr, np.concatenate([[np.inf], self.thresholds[index]])
+
+    def pr_curve(
+        self, max_points: int | None = 10_000
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (recall, precision, thresholds).
+        """
+        index = self._points(max_points)
+        return (
+            self.metric("recall", index),
+            self.metric("precision", index),
+            self.thresholds[index],
+        )
+
+    def roc_auc(self) -> float:
+        fpr = np.concatenate([[0.0], self.metric("fpr")])
+        tpr = np.concatenate([[0.0], self.metric("tpr")])
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def average_precision(self) -> float:
+        recall = np.concatenate([[0.0], self.metric("recall")])
+        return float(np.sum(np.diff(recall) * self.metric("precision")))
+
+
+def evaluate(scores: np.ndarray, labels: np.ndarray, threshold: float) -> dict:
+    """
+    One threshold the way the notebook's Keras metrics do it: threshold every
+    score and count.
+    """
+    predicted = scores > threshold
+    tp = int(np.count_nonzero(predicted & labels))
+    fp = int(np.count_nonzero(predicted)) - tp
+    fn = int(np.count_nonzero(labels)) - tp
+    tn = len(labels) - tp - fp - fn
+    return summary(threshold, tp, fp, fn, tn)
+
+
+def make_predictions(count: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scores of a decent classifier: 43% positives, sigmoid of a noisy margin.
+    """
+    rng = np.random.default_rng(seed)
+    labels = rng.random(count) < 0.43
+    margin = np.where(labels, 1.5, -1.5).astype(np.float32)
+    margin += rng.standard_normal(count, dtype=np.float32) * np.float32(1.2)
+    return 1 / (1 + np.exp(-margin)), labels
+
+
+def _peak(func: Callable) -> tuple[object, float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark(count: int = 20_000_000, candidates: int = 100):
+    """
+    Find the best-F1 threshold of `count` predictions by re-evaluating
+    `candidates` thresholds one at a time (like Keras' AUC num_thresholds=100),
+    and with the exact and the binned sweeps, which consider every threshold.
+    Peak memory is what each approach allocates on top of the predictions.
+    """
+    scores, labels = make_predictions(count)
+    grid = np.linspace(0, 1, candidates, endpoint=False)
+
+    def per_threshold():
+        results = [evaluate(scores, labels, t) for t in grid]
+        return max(results, key=lambda result: result["f1"])
+
+    def exact():
+        return ThresholdSweep.from_scores(scores, labels).best("f1")
+
+    def binned(batch: int = 1_000_000):
+        batches = (
+            (scores[i : i + batch], labels[i : i + batch])
+            for i in range(0, count, batch)
+        )
+        return ThresholdSweep.from_batches(batches).best("f1")
+
+    print(f"{count} predictions, {labels.mean():.0%} positive")
+    for name, func, tried in (
+        ("per-threshold", per_threshold, candidates),
+        ("sweep, exact", exact, None),
+        ("sweep, binned", binned, 100_000),
+    ):
+        result, elapsed, peak = _peak(func)
+        tried = f"{tried} thresholds" if tried else "every score"
+        print(
+            f"{name:<14} {elapsed:6.2f}s  peak +{peak / 2 ** 20:5.0f} MiB  {tried:<18} "
+            f"best F1 {result['f1']:.5f} at {result['threshold']:.5f}"
+        )
+
+    sweep = ThresholdSweep.from_scores(scores, labels)
+    for threshold in (0.35, 0.5):
+        assert sweep.at(threshold) == evaluate(scores, labels, threshold)
+    print(
+        f"ROC AUC {sweep.roc_auc():.4f}, "
+        f"average precision {sweep.average_precision():.4f}"
+    )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,478 @@
+"""
+Spans for tasks and coroutines, exported as a Chrome trace.
+
+A single `datetime.now() - start` around asyncio.run() says that
+gather(sleep_for_three_then_five(), sleep_for_five()) took eight seconds, not
+which coroutines overlapped, which one the gather was waiting for, or where the
+time went. Tracer records a span for every task and for every coroutine
+decorated with @traced:
+- the current span lives in a context variable. Tasks copy the context they
+  are created in, so a task started by gather() is linked to the span that
+  called gather(), and a coroutine awaited inside it to the task.
+- finished spans go into a fixed-size ring buffer of plain tuples. Once it is
+  full the oldest spans are overwritten, so a tracer can be left running.
+- with sample_rate < 1 only that fraction of root spans is recorded, together
+  with everything below them. The rest cost a context variable lookup.
+- chrome_trace() writes the spans in the Trace Event Format. Load it in
+  chrome://tracing or ui.perfetto.dev: every task gets a track of its own,
+  with arrows from the span that started it.
+- critical_path() follows the spans each span was waiting on at its end.
+
+    @traced
+    async def fetch(url): ...
+
+    async with Tracer() as tracer:
+        await asyncio.gather(fetch(a), fetch(b))
+    tracer.export("trace.json")
+
+Tasks are traced through the loop's task factory, so only tasks created while
+the tracer is installed get spans.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Callable, NamedTuple
+
+import click
+
+# (span id, track) of the span the running code is in. Tracks are what Chrome
+# shows as threads: one per task.
+_current: contextvars.ContextVar[tuple[int, int] | None] = contextvars.ContextVar(
+    "tracing_span", default=None
+)
+# Below a root span that was not sampled.
+_UNSAMPLED = (0, 0)
+_active: Tracer | None = None
+
+
+class Span(NamedTuple):
+    id: int
+    parent: int | None
+    name: str
+    category: str
+    track: int
+    start: int
+    end: int
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) / 1e9
+
+
+class Tracer:
+    def __init__(
+        self, capacity: int = 100_000, sample_rate: float = 1.0, seed: int | None = None
+    ):
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self._random = random.Random(seed).random
+        self._ids = itertools.count(1)
+        self._buffer: list[tuple | None] = [None] * capacity
+        self._count = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._previous_factory = None
+
+    async def __aenter__(self) -> Tracer:
+        self.install()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.uninstall()
+
+    def install(self):
+        """
+        Trace the running loop's new tasks and make this the tracer @traced
+        records to.
+        """
+        global _active
+        self._loop = asyncio.get_running_loop()
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._create_task)
+        _active = self
+
+    def uninstall(self):
+        global _active
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+            self._loop = None
+        if _active is self:
+            _active = None
+
+    def _begin(self, parent: tuple[int, int] | None) -> tuple[int, int]:
+        # The (span id, track) of a new span under `parent`, or _UNSAMPLED.
+        if parent is None:
+            if self.sample_rate < 1 and self._random() >= self.sample_rate:
+                return _UNSAMPLED
+            span_id = next(self._ids)
+            return span_id, span_id
+        if parent is _UNSAMPLED:
+            return _UNSAMPLED
+        return next(self._ids), parent[1]
+
+    def _record(self, record: tuple):
+        self._buffer[self._count % self.capacity] = record
+        self._count += 1
+
+    def _create_task(self, loop, coro, context=None, **kwargs):
+        # A copy either way: the span is set in the task's context only. Newer
+        # Pythons also pass name= and eager_start=, which go on to the task.
+        context = context.copy() if context is not None else contextvars.copy_context()
+        parent = context.get(_current)
+        span = _UNSAMPLED if parent is _UNSAMPLED else self._begin(parent)
+        if span is not _UNSAMPLED:
+            # A task starts a track of its own.
+            span = (span[0], span[0])
+        if span is not parent:
+            context.run(_current.set, span)
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, context=context, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, context=context, **kwargs)
+        if span is not _UNSAMPLED:
+            name = getattr(coro, "__qualname__", None) or task.get_name()
+            start = time.perf_counter_ns()
+            parent_id = parent[0] if parent else None
+            task.add_done_callback(
+                lambda _: self._record(
+                    (
+                        span[0],
+                        parent_id,
+                        name,
+                        "task",
+                        span[1],
+                        start,
+                        time.perf_counter_ns(),
+                    )
+                )
+            )
+        return task
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "span"):
+        """
+        Record the enclosed block as a span. Works in coroutines too: the span
+        is current for everything awaited inside the block.
+        """
+        parent = _current.get()
+        span = self._begin(parent)
+        token = _current.set(span)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            _current.reset(token)
+            if span is not _UNSAMPLED:
+                self._record(
+                    (
+                        span[0],
+                        parent and parent[0],
+                        name,
+                        category,
+                        span[1],
+                        start,
+                        time.perf_counter_ns(),
+                    )
+                )
+
+    @property
+    def dropped(self) -> int:
+        """
+        Spans overwritten because the ring buffer was full.
+        """
+        return max(0, self._count - self.capacity)
+
+    def spans(self) -> list[Span]:
+        """
+        The spans in the buffer, in the order they finished.
+        """
+        if self._count <= self.capacity:
+            records = self._buffer[: self._count]
+        else:
+            split = self._count % self.capacity
+            records = self._buffer[split:] + self._buffer[:split]
+        return [Span(*record) for record in records]
+
+    def chrome_trace(self) -> dict:
+        """
+        The spans as Trace Event Format complete events, with flow arrows from
+        each task's parent span to the task.
+        """
+        spans = self.spans()
+        if not spans:
+            return {"traceEvents": []}
+        origin = min(span.start for span in spans)
+        pid = os.getpid()
+        by_id = {span.id: span for span in spans}
+        events = []
+        names = {}
+        for span in sorted(spans, key=lambda span: (span.start, -span.end)):
+            names.setdefault(span.track, span.name)
+            ts = (span.start - origin) / 1000
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": ts,
+                    "dur": (span.end - span.start) / 1000,
+                    "pid": pid,
+                    "tid": span.track,
+                    "args": {"id": span.id, "parent": span.parent},
+                }
+            )
+            parent = by_id.get(span.parent)
+            if parent is not None and parent.track != span.track:
+                flow = {
+                    "name": "start",
+                    "cat": "task",
+                    "id": span.id,
+                    "pid": pid,
+                    "ts": ts,
+                }
+                events.append(dict(flow, ph="s", tid=parent.track))
+                events.append(dict(flow, ph="f", bp="e", tid=span.track))
+        for track, name in names.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": track,
+                    "args": {"name": name},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.chrome_trace(), file)
+
+
+def traced(func: Callable | None = None, *, name: str | None = None):
+    """
+    Record every call of a coroutine function as a span, when a tracer is
+    installed: @traced or @traced(name="...").
+    """
+
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            tracer = _active
+            if tracer is None:
+                return await func(*args, **kwargs)
+            parent = _current.get()
+            if parent is _UNSAMPLED:
+                return await func(*args, **kwargs)
+            span = tracer._begin(parent)
+            token = _current.set(span)
+            start = time.perf_counter_ns()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _current.reset(token)
+                if span is not _UNSAMPLED:
+                    tracer._record(
+                        (
+                            span[0],
+                            parent and parent[0],
+                            label,
+                            "coroutine",
+                            span[1],
+                            start,
+                            time.perf_counter_ns(),
+                        )
+                    )
+
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def critical_path(
+    spans: list[Span], root: Span | None = None
+) -> list[tuple[int, Span]]:
+    """
+    (depth, span) of the spans that determined when `root` (by default the
+    longest root span) finished: the child that ended last, the child that
+    ended last before that one started, and so on, recursively.
+    """
+    children = defaultdict(list)
+    ids = {span.id for span in spans}
+    for span in spans:
+        children[span.parent].append(span)
+    if root is None:
+        roots = [span for span in spans if span.parent not in ids]
+        if not roots:
+            return []
+        root = max(roots, key=lambda span: span.end - span.start)
+    path = []
+
+    def walk(span: Span, depth: int):
+        path.append((depth, span))
+        waited_on = []
+        until = span.end
+        for child in sorted(
+            children[span.id], key=lambda child: child.end, reverse=True
+        ):
+            if child.end <= until:
+                waited_on.append(child)
+                until = child.start
+        for child in reversed(waited_on):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return path
+
+
+def print_tree(spans: list[Span]):
+    """
+    Every span under its parent, with its start, duration and, for spans off
+    the critical path, its slack: how much longer it could have taken without
+    delaying its parent.
+    """
+    if not spans:
+        return
+    by_id = {span.id: span for span in spans}
+    children = defaultdict(list)
+    for span in spans:
+        children[span.parent if span.parent in by_id else None].append(span)
+    critical = {span.id for _, span in critical_path(spans)}
+    origin = min(span.start for span in spans)
+
+    def show(span: Span, depth: int):
+        label = f"{'  ' * depth}{span.name} ({span.category})"
+        line = f"{label:<48} +{(span.start - origin) / 1e9:7.3f}s {span.duration:8.3f}s"
+        parent = by_id.get(span.parent)
+        if span.id in critical:
+            click.secho(f"{line}  critical", fg="red")
+        else:
+            slack = (parent.end - span.end) / 1e9 if parent else 0.0
+            click.echo(f"{line}  slack {slack:.3f}s")
+        for child in sorted(children[span.id], key=lambda child: child.start):
+            show(child, depth + 1)
+
+    for root in sorted(children[None], key=lambda span: span.start):
+        show(root, 0)
+
+
+async def traced_workload(tasks: int = 1_000, depth: int = 3, rounds: int = 10):
+    """
+    `tasks` tasks, each calling a chain of `depth` @traced coroutines `rounds`
+    times: tasks * (1 + depth * rounds) spans, each around a single yield to
+    the loop, so the tracing cost is as large a share of the time as it gets.
+    """
+
+    @traced
+    async def step(level: int):
+        if level:
+            await step(level - 1)
+        else:
+            await asyncio.sleep(0)
+
+    async def worker():
+        for _ in range(rounds):
+            await step(depth - 1)
+
+    await asyncio.gather(*(worker() for _ in range(tasks)))
+
+
+def benchmark(sample_rate: float, repeat: int = 7) -> dict[str, float]:
+    """
+    Best-of-`repeat` times of traced_workload() without a tracer, with every
+    span recorded and with `sample_rate` of the root spans sampled.
+    """
+
+    async def run(tracer_options: dict | None):
+        if tracer_options is None:
+            await traced_workload()
+            return
+        async with Tracer(**tracer_options):
+            await traced_workload()
+
+    modes = {"off": None, "all": {}, "sampled": {"sample_rate": sample_rate, "seed": 0}}
+    best = dict.fromkeys(modes, math.inf)
+    # Round robin, so a slow patch of the machine does not hit one mode only.
+    for _ in range(repeat):
+        for mode, options in modes.items():
+            start = time.perf_counter()
+            asyncio.run(run(options))
+            best[mode] = min(best[mode], time.perf_counter() - start)
+    return best
+
+
+@click.command()
+@click.option(
+    "--output", default="trace.json", help="Where to write the practice.py trace."
+)
+@click.option(
+    "--sample-rate", default=0.01, help="Sampling rate to measure the overhead of."
+)
+@click.option(
+    "--budget",
+    default=1000,
+    help="Allowed cost per span in ns at the sampling rate; exit 1 above it.",
+)
+@click.option(
+    "--demo/--no-demo", default=True, help="Trace practice.py's gather() first."
+)
+def main(output, sample_rate, budget, demo):
+    """
+    Trace practice.py's gather(sleep_for_three_then_five(), sleep_for_five())
+    into a Chrome trace, then measure what tracing costs per span.
+    """
+    if demo:
+        # practice.py imports this file as `tracing`, not as __main__, and
+        # @traced records to that module's tracer.
+        import tracing
+        from practice import sleep_for_five, sleep_for_three_then_five
+
+        async def gathered():
+            async with tracing.Tracer() as tracer:
+                with tracer.span("main"):
+                    await asyncio.gather(sleep_for_three_then_five(), sleep_for_five())
+            return tracer
+
+        tracer = asyncio.run(gathered())
+        print_tree(tracer.spans())
+        tracer.export(output)
+        click.echo(f"wrote {output}: open it in ui.perfetto.dev or chrome://tracing")
+
+    # Each span of the workload wraps a single trip through the loop, so the
+    # percentages are a worst case. The cost per span is what carries over: a
+    # span around a 1ms query costs a thousandth of that in percent.
+    times = benchmark(sample_rate)
+    spans = 1_000 * (1 + 3 * 10)
+    costs = {}
+    for mode in ("all", "sampled"):
+        costs[mode] = (times[mode] - times["off"]) / spans * 1e9
+        label = "every span" if mode == "all" else f"{sample_rate:.0%} sampled"
+        click.echo(
+            f"{label:<12} {times[mode]:.3f}s vs {times['off']:.3f}s untraced "
+            f"({(times[mode] / times['off'] - 1) * 100:+.0f}%): "
+            f"{costs[mode]:.0f}ns per span"
+        )
+    if costs["sampled"] > budget:
+        click.secho(
+            f"{costs['sampled']:.0f}ns per span is over the {budget}ns budget", fg="red"
+        )
+        raise SystemExit(1)
+    click.secho(
+        f"{costs['sampled']:.0f}ns per span, within the {budget}ns budget", fg="green"
+    )
+
+
+if __name__ == "__main__":
+    main()
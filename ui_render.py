@@ -0,0 +1,200 @@
+"""
+Rendering a widget tree with ThemeFactory products.
+
+create_ui() prints every paint() result as it goes: one print() call, and so
+one write to the terminal, per widget. For a UI with thousands of widgets most
+of the time goes into those writes and into building the same strings again.
+
+UIRenderer renders a tree of Widget nodes in one pass instead:
+- Widgets only describe what to draw (their kind, "button" or "checkbox", and
+  their props). Products come from whichever theme factory is rendering, so the
+  same tree can be rendered with another theme without being rebuilt.
+- The rendered line of a widget is memoized per (theme, kind, props, depth),
+  so identical widgets are painted and indented once.
+- Output is joined into a single string and written once, or yielded in chunks
+  by iter_render() for trees too big to hold as one string.
+
+    tree = Widget("panel", children=[Widget("button", label="OK")])
+    UIRenderer(DarkThemeFactory()).write(tree)
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Iterator, TextIO
+
+from af_example import DarkThemeFactory, LightThemeFactory, ThemeFactory
+
+
+class Widget:
+    """
+    A node of the UI tree. Kinds with a create_<kind>() method on the theme
+    factory are painted by the theme's product; any other kind (a panel, a
+    row...) only groups its children.
+    """
+
+    __slots__ = ("kind", "props", "children")
+
+    def __init__(self, kind: str, children: list[Widget] | None = None, **props):
+        self.kind = kind
+        self.props = tuple(sorted(props.items()))
+        self.children = children or []
+
+
+class UIRenderer:
+    def __init__(self, factory: ThemeFactory, indent: str = "  "):
+        self.indent = indent
+        self._lines: dict[tuple, str] = {}
+        self.use_theme(factory)
+
+    def use_theme(self, factory: ThemeFactory):
+        """
+        Switch theme. Memoized lines of other themes are kept, so switching
+        back and forth does not repaint.
+        """
+        self.factory = factory
+        self._theme = type(factory)
+
+    def line(self, widget: Widget, depth: int = 0) -> str:
+        """
+        The widget's output line, indented for `depth`.
+        """
+        key = (self._theme, widget.kind, widget.props, depth)
+        line = self._lines.get(key)
+        if line is None:
+            create = getattr(self.factory, f"create_{widget.kind}", None)
+            text = create().paint() if create is not None else f"[{widget.kind}]"
+            if widget.props:
+                text += " (" + ", ".join(f"{k}={v}" for k, v in widget.props) + ")"
+            line = self._lines[key] = self.indent * depth + text + "\n"
+        return line
+
+    def iter_lines(self, tree: Widget) -> Iterator[str]:
+        # An explicit stack rather than recursion, so deep trees do not hit
+        # the recursion limit.
+        line = self.line
+        stack = [(tree, 0)]
+        while stack:
+            widget, depth = stack.pop()
+            yield line(widget, depth)
+            if widget.children:
+                depth += 1
+                stack.extend([(child, depth) for child in reversed(widget.children)])
+
+    def render(self, tree: Widget) -> str:
+        return "".join(self.iter_lines(tree))
+
+    def iter_render(self, tree: Widget, chunk_lines: int = 4096) -> Iterator[str]:
+        """
+        Yield the output in chunks of `chunk_lines` lines.
+        """
+        chunk: list[str] = []
+        for line in self.iter_lines(tree):
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+
+    def write(
+        self, tree: Widget, stream: TextIO | None = None, chunk_lines: int | None = None
+    ):
+        """
+        Write the rendered tree with a single write, or one write per chunk
+        when `chunk_lines` is given.
+        """
+        stream = stream or sys.stdout
+        if chunk_lines is None:
+            stream.write(self.render(tree))
+        else:
+            for chunk in self.iter_render(tree, chunk_lines):
+                stream.write(chunk)
+        stream.flush()
+
+
+def build_form(rows: int) -> Widget:
+    """
+    A form of `rows` rows, each with a checkbox and a button: 2 * rows + 1
+    widgets plus the rows themselves.
+    """
+    return Widget(
+        "form",
+        children=[
+            Widget(
+                "row",
+                children=[
+                    Widget("checkbox", label=f"option {n % 10}"),
+                    Widget("button", label="Apply" if n % 2 else "Reset"),
+                ],
+            )
+            for n in range(rows)
+        ],
+    )
+
+
+def print_per_widget(factory: ThemeFactory, tree: Widget, indent: str = "  "):
+    """
+    The create_ui() way: build a product and print() its line for every
+    widget. The output is the same as UIRenderer's, built again for every
+    widget and written one line at a time.
+    """
+    stack = [(tree, 0)]
+    while stack:
+        widget, depth = stack.pop()
+        create = getattr(factory, f"create_{widget.kind}", None)
+        text = create().paint() if create is not None else f"[{widget.kind}]"
+        if widget.props:
+            text += " (" + ", ".join(f"{k}={v}" for k, v in widget.props) + ")"
+        print(indent * depth + text)
+        stack.extend([(child, depth + 1) for child in reversed(widget.children)])
+
+
+def benchmark(widgets: int = 100_000):
+    """
+    Render a form of `widgets` buttons and checkboxes to /dev/null with a
+    print() per widget and with the renderer, then switch its theme.
+    """
+    tree = build_form(widgets // 2)
+    for factory in (LightThemeFactory(), DarkThemeFactory()):
+        expected = io.StringIO()
+        with redirect_stdout(expected):
+            print_per_widget(factory, tree)
+        if UIRenderer(factory).render(tree) != expected.getvalue():
+            # Not an assert: the timings below mean nothing if this fails,
+            # and python -O would skip the check.
+            raise RuntimeError(
+                f"renderer and print() output differ for {type(factory).__name__}"
+            )
+
+    # Unbuffered at the Python level so every print() is a real write, as
+    # on an interactive terminal.
+    with open(os.devnull, "wb", buffering=0) as raw:
+        devnull = io.TextIOWrapper(raw, write_through=True)
+        start = time.perf_counter()
+        with redirect_stdout(devnull):
+            print_per_widget(LightThemeFactory(), tree)
+        per_widget = time.perf_counter() - start
+
+        renderer = UIRenderer(LightThemeFactory())
+        start = time.perf_counter()
+        renderer.write(tree, devnull)
+        engine = time.perf_counter() - start
+
+        renderer.use_theme(DarkThemeFactory())
+        start = time.perf_counter()
+        renderer.write(tree, devnull)
+        switched = time.perf_counter() - start
+
+    print(f"print per widget   {per_widget:.3f}s")
+    print(f"renderer           {engine:.3f}s ({per_widget / engine:.1f}x faster)")
+    print(f"after theme switch {switched:.3f}s")
+
+
+if __name__ == "__main__":
+    UIRenderer(LightThemeFactory()).write(build_form(2))
+    benchmark()